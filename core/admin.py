@@ -1,42 +1,217 @@
-from django.contrib import admin
-from .models import Empresa, Servicio, Profesional, OrdenServicio
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.urls import reverse
+from . import asignacion, transiciones
+from .models import Empresa, Servicio, Profesional, OrdenServicio, OrdenServicioArchivada, OrdenTransicion, Job
+from .pagination import ConteoEstimadoPaginator
+from .rut import filtro_rut
+
+
+class ListadoEscalableMixin:
+    """
+    Changelist sin COUNT(*) exacto por página: ConteoEstimadoPaginator acota
+    el conteo y no se calcula el total sin filtros ("N de M").
+
+    changelist_query_budget: máximo de consultas del GET al changelist
+    (core.middleware), constante sin importar el número de filas.
+    """
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
+    changelist_query_budget = 6
+
+
+class AutocompletarFilter(admin.SimpleListFilter):
+    """
+    Filtro por FK que no lista todos los valores: muestra solo el
+    seleccionado y un buscador (static/autocompletar.js) que consulta
+    `url_name` (core.api.AutocompletarView).
+    """
+    template = 'admin/core/filtro_autocompletar.html'
+    related_model = None
+    campos = ()  # columnas que usa __str__ del modelo relacionado
+    url_name = None
+
+    @property
+    def url(self):
+        return reverse(self.url_name)
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return []
+        return [(str(obj.pk), str(obj)) for obj in self.related_model._default_manager.only('id', *self.campos).filter(pk=value)]
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            raise IncorrectLookupParameters(value)
+        return queryset.filter(**{f'{self.parameter_name}_id': value})
+
+    def choices(self, changelist):
+        # La primera opción (sin filtro) también es la URL base del buscador.
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Todas',
+        }
+        for pk, display in self.lookup_choices:
+            yield {
+                'selected': True,
+                'query_string': changelist.get_query_string({self.parameter_name: pk}),
+                'display': display,
+            }
+
+
+class EmpresaFilter(AutocompletarFilter):
+    title = 'empresa'
+    parameter_name = 'empresa'
+    related_model = Empresa
+    campos = ('razon_social', 'rut')
+    url_name = 'autocompletar_empresa'
+
+
+class RutSearchMixin:
+    """
+    Si el término de búsqueda parece un RUT/RUN, filtra por el campo normalizado
+    indexado (`rut_search_field`) en lugar de los LIKE de search_fields.
+    """
+    rut_search_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        por_rut = filtro_rut(self.rut_search_field, search_term) if self.rut_search_field else None
+        if por_rut is not None:
+            return queryset.filter(por_rut), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Empresa)
-class EmpresaAdmin(admin.ModelAdmin):
+class EmpresaAdmin(ListadoEscalableMixin, RutSearchMixin, admin.ModelAdmin):
     list_display = ('rut', 'razon_social', 'giro', 'telefono', 'email', 'comuna')
     search_fields = ('rut', 'razon_social', 'email')
+    rut_search_field = 'rut_normalizado'
     ordering = ('razon_social',)
 
 
 @admin.register(Servicio)
-class ServicioAdmin(admin.ModelAdmin):
+class ServicioAdmin(ListadoEscalableMixin, admin.ModelAdmin):
     list_display = ('nombre', 'categoria', 'duracion_estimada_horas', 'activo')
     list_filter = ('categoria', 'activo')
     search_fields = ('nombre', 'descripcion')
 
 
 @admin.register(Profesional)
-class ProfesionalAdmin(admin.ModelAdmin):
-    list_display = ('run', 'nombres', 'apellidos', 'especialidad', 'email')
+class ProfesionalAdmin(ListadoEscalableMixin, RutSearchMixin, admin.ModelAdmin):
+    # ordenes_abiertas/horas_pendientes son columnas (core.cargas): ordenar por ellas no agrega por fila.
+    list_display = ('run', 'nombres', 'apellidos', 'especialidad', 'email', 'ordenes_abiertas', 'horas_pendientes')
     search_fields = ('run', 'nombres', 'apellidos', 'email')
+    rut_search_field = 'run_normalizado'
 
 
+def transicionar_seleccion(modeladmin, request, queryset, estado):
+    # Valida contra la máquina de estados, registra OrdenTransicion y mantiene las estadísticas.
+    ids = list(queryset.values_list('pk', flat=True))
+    resultado = transiciones.transicionar_a(ids, estado, request.user)
+    nivel = messages.WARNING if resultado.rechazadas else messages.SUCCESS
+    modeladmin.message_user(request, resultado.mensaje(), nivel)
+
+
+@admin.action(description='Marcar seleccionadas como en ejecución')
 def marcar_en_ejecucion(modeladmin, request, queryset):
-    queryset.update(estado='en_ejecucion')
-    marcar_en_ejecucion.short_description = 'Marcar seleccionadas como en ejecución'
+    transicionar_seleccion(modeladmin, request, queryset, 'en_ejecucion')
 
 
+@admin.action(description='Marcar seleccionadas como finalizada')
 def marcar_finalizada(modeladmin, request, queryset):
-    queryset.update(estado='finalizada')
-    marcar_finalizada.short_description = 'Marcar seleccionadas como finalizada'
+    transicionar_seleccion(modeladmin, request, queryset, 'finalizada')
+
+
+@admin.action(description='Marcar seleccionadas como cancelada')
+def marcar_cancelada(modeladmin, request, queryset):
+    transicionar_seleccion(modeladmin, request, queryset, 'cancelada')
+
+
+@admin.action(description='Asignar profesional automáticamente (especialidad y carga)')
+def asignar_automaticamente(modeladmin, request, queryset):
+    # Solo las seleccionadas que están nuevas y sin profesional.
+    resultado = asignacion.asignar(queryset)
+    nivel = messages.WARNING if resultado.sin_candidato else messages.SUCCESS
+    modeladmin.message_user(request, resultado.mensaje(), nivel)
 
 
 @admin.register(OrdenServicio)
-class OrdenServicioAdmin(admin.ModelAdmin):
+class OrdenServicioAdmin(ListadoEscalableMixin, RutSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'empresa', 'fecha_creacion', 'estado', 'prioridad', 'profesional_asignado')
-    list_filter = ('estado', 'prioridad', 'empresa')
+    list_select_related = ('empresa', 'profesional_asignado')
+    list_filter = ('estado', 'prioridad', EmpresaFilter)
+    # El formulario tampoco carga todas las empresas/profesionales/servicios como <option>.
+    autocomplete_fields = ('empresa', 'servicios_seleccionados', 'profesional_asignado')
     search_fields = ('empresa__razon_social', 'descripcion_requerimiento')
+    rut_search_field = 'empresa__rut_normalizado'
     ordering = ('-fecha_creacion',)
     readonly_fields = ('fecha_creacion',)
-    actions = [marcar_en_ejecucion, marcar_finalizada]
+    actions = [marcar_en_ejecucion, marcar_finalizada, marcar_cancelada, asignar_automaticamente]
+
+    class Media:
+        js = ('autocompletar.js',)  # EmpresaFilter
+
+
+@admin.register(OrdenServicioArchivada)
+class OrdenServicioArchivadaAdmin(ListadoEscalableMixin, RutSearchMixin, admin.ModelAdmin):
+    """Órdenes movidas por core.archivo: solo lectura (el changelist de órdenes no las incluye)."""
+    list_display = ('id', 'empresa', 'fecha_creacion', 'estado', 'prioridad', 'profesional_asignado', 'fecha_archivo')
+    list_select_related = ('empresa', 'profesional_asignado')
+    list_filter = ('estado', 'prioridad', EmpresaFilter)
+    search_fields = ('empresa__razon_social', 'descripcion_requerimiento')
+    rut_search_field = 'empresa__rut_normalizado'
+    ordering = ('-fecha_creacion',)
+
+    class Media:
+        js = ('autocompletar.js',)  # EmpresaFilter
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrdenTransicion)
+class OrdenTransicionAdmin(ListadoEscalableMixin, admin.ModelAdmin):
+    """Historial de solo lectura (el registro es de solo inserción)."""
+    list_display = ('fecha', 'orden_id', 'estado_anterior', 'estado_nuevo', 'usuario')
+    list_filter = ('estado_nuevo',)
+    list_select_related = ('usuario',)
+    search_fields = ('=orden__id',)
+    date_hierarchy = 'fecha'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(ListadoEscalableMixin, admin.ModelAdmin):
+    """Cola de core.jobs: solo lectura (los jobs se crean con jobs.encolar() y los ejecuta run_worker)."""
+    list_display = ('id', 'tipo', 'estado', 'progreso', 'intentos', 'usuario', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    list_select_related = ('usuario',)
+    search_fields = ('=id', 'tipo')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,427 @@
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views import View
+
+from . import jobs, transiciones
+from .models import Empresa, Servicio, Profesional, OrdenServicio, OrdenServicioArchivada
+from .rut import filtro_rut
+from .search import search
+from .views import EmpresaListView, ServicioListView, ProfesionalListView, OrdenServicioListView, JobsDelUsuarioMixin
+
+"""
+API JSON de solo lectura para empresas, servicios, profesionales y órdenes.
+
+Cada endpoint reutiliza la ListView HTML correspondiente (mismos filtros GET,
+búsqueda, paginación por cursor y caché de core.cache), pero en lugar de
+instancias y plantillas lee tuplas con values_list() y las serializa
+directamente.
+
+Parámetros GET adicionales:
+  - fields: campos a incluir, separados por coma (ej: ?fields=id,rut).
+  - embed: relaciones a incluir anidadas (ej: ?embed=empresa,servicios).
+    Las relaciones ForeignKey se leen con JOIN en la misma consulta; las
+    ManyToMany con una consulta adicional por página.
+  - total=1: agrega "total" (COUNT de las filas filtradas; opcional porque
+    en tablas grandes cuesta más que la página).
+
+Respuesta de listado:
+    {"results": [...], "next": "?cursor=...", "previous": null}
+
+Escritura: POST /api/ordenes/transiciones/ (OrdenTransicionApiView) cambia
+el estado de muchas órdenes en una transacción (core.transiciones).
+
+Jobs (core/jobs.py): GET /api/jobs/<id>/ informa estado, progreso y
+resultado; POST /api/jobs/ con {"tipo": "archivar_ordenes", "parametros":
+{...}} encola uno (solo staff) y responde 202 con Location.
+
+Autocompletado para los widgets de OrdenServicioForm:
+/api/autocompletar/<empresas|profesionales|servicios>/?q=...
+    {"results": [{"id": 1, "text": "..."}]}
+"""
+
+
+class ApiError(Exception):
+    """Parámetro inválido: se responde 400 con el mensaje."""
+
+
+class ApiListMixin:
+    """
+    Convierte una ListView de core en endpoint JSON.
+
+    Atributos:
+        api_fields: {nombre_publico: lookup ORM} en orden de salida.
+        api_embeds: {relacion: {nombre_publico: lookup ORM}} (ForeignKey, con JOIN).
+        api_embeds_m2m: {relacion: (metodo, subcampos)}; metodo(pks) retorna un
+            values_list (pk_dueño, *subcampos) para las filas de una página.
+    """
+    api_fields = {}
+    api_embeds = {}
+    api_embeds_m2m = {}
+    fields_param = 'fields'
+    embed_param = 'embed'
+    total_param = 'total'
+
+    def lista_parametro(self, nombre, permitidos, por_defecto):
+        valor = self.request.GET.get(nombre, '').strip()
+        if not valor:
+            return list(por_defecto)
+        elegidos = [item.strip() for item in valor.split(',') if item.strip()]
+        invalidos = [item for item in elegidos if item not in permitidos]
+        if invalidos:
+            raise ApiError(f"{nombre}: valores inválidos {', '.join(invalidos)} (permitidos: {', '.join(permitidos)})")
+        return list(dict.fromkeys(elegidos))
+
+    def parametros(self):
+        """(campos, embeds) pedidos en ?fields= y ?embed=; ApiError si son inválidos."""
+        campos = self.lista_parametro(self.fields_param, list(self.api_fields), self.api_fields)
+        embeds = self.lista_parametro(self.embed_param, [*self.api_embeds, *self.api_embeds_m2m], ())
+        return campos, embeds
+
+    def pide_total(self):
+        return self.request.GET.get(self.total_param) == '1'
+
+    def valores(self, queryset, campos, embeds):
+        """
+        values_list con los campos pedidos, las relaciones embebidas y las
+        columnas de orden que necesita el cursor (sin repetir las ya pedidas).
+        """
+        self._pedidos = (campos, embeds)
+        lookups = [self.api_fields[campo] for campo in campos]
+        self._embebidas = []
+        for relacion in embeds:
+            if relacion in self.api_embeds:
+                subcampos = self.api_embeds[relacion]
+                self._embebidas.append((relacion, list(subcampos), len(lookups)))
+                lookups.extend(subcampos.values())
+        self._indices_orden = []
+        for campo in self.get_keyset_ordering():
+            nombre = campo.lstrip('-')
+            if nombre not in lookups:
+                lookups.append(nombre)
+            self._indices_orden.append(lookups.index(nombre))
+        return queryset.values_list(*lookups)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            campos, embeds = self.parametros()
+        except ApiError as error:
+            return self.error(error)
+        queryset = self.get_queryset()
+        valores = self.valores(queryset, campos, embeds)
+
+        if 'pk' in kwargs:
+            try:
+                filas = [valores.get(pk=kwargs['pk'])]
+            except self.model.DoesNotExist:
+                raise Http404('No existe.')
+            page = total = None
+        else:
+            _, page, filas, _ = self.paginate_queryset(valores, self.paginate_by)
+            total = self.contar(valores) if self.pide_total() else None
+
+        resultados = self.serializar(filas, campos)
+        pks = self.pks(filas)
+        for relacion in embeds:
+            if relacion in self.api_embeds_m2m:
+                metodo, subcampos = self.api_embeds_m2m[relacion]
+                self.embeber(resultados, pks, relacion, subcampos, getattr(self, metodo)(pks))
+        return self.respuesta(self.cuerpo(resultados, page, total))
+
+    def contar(self, valores):
+        """
+        Total de filas filtradas de todos los querysets que se paginan
+        (get_keyset_querysets), en una consulta: COUNT sobre un UNION ALL.
+        """
+        primero, *resto = [qs.order_by().values_list('pk') for qs in self.get_keyset_querysets(valores)]
+        return primero.union(*resto, all=True).count() if resto else primero.count()
+
+    def _row_values(self, fila):
+        return [fila[indice] for indice in self._indices_orden]
+
+    def pks(self, filas):
+        # La última columna de orden es siempre la clave primaria ('id').
+        indice_pk = self._indices_orden[-1]
+        return [fila[indice_pk] for fila in filas]
+
+    def serializar(self, filas, campos):
+        ancho = len(campos)
+        resultados = []
+        for fila in filas:
+            item = dict(zip(campos, fila[:ancho]))
+            for relacion, subcampos, inicio in self._embebidas:
+                valores = fila[inicio:inicio + len(subcampos)]
+                # LEFT JOIN sin fila relacionada (ej: orden sin profesional): null.
+                item[relacion] = dict(zip(subcampos, valores)) if valores[0] is not None else None
+            resultados.append(item)
+        return resultados
+
+    def embeber(self, resultados, pks, relacion, subcampos, filas_relacionadas):
+        por_pk = {}
+        for pk, *valores in filas_relacionadas:
+            por_pk.setdefault(pk, []).append(dict(zip(subcampos, valores)))
+        for item, pk in zip(resultados, pks):
+            item[relacion] = por_pk.get(pk, [])
+
+    def cuerpo(self, resultados, page, total=None):
+        if page is None:
+            return resultados[0]
+        cuerpo = {
+            'results': resultados,
+            'next': f'?{page.next_querystring}' if page.has_next() else None,
+            'previous': f'?{page.previous_querystring}' if page.has_previous() else None,
+        }
+        if total is not None:
+            cuerpo['total'] = total
+        return cuerpo
+
+    def respuesta(self, datos):
+        return JsonResponse(datos, encoder=DjangoJSONEncoder, safe=False, json_dumps_params={'ensure_ascii': False})
+
+    def error(self, error):
+        return JsonResponse({'error': str(error)}, status=400)
+
+
+class EmpresaApiView(ApiListMixin, EmpresaListView):
+    query_budget = 4
+    api_fields = {
+        'id': 'id',
+        'rut': 'rut',
+        'razon_social': 'razon_social',
+        'giro': 'giro',
+        'telefono': 'telefono',
+        'email': 'email',
+        'direccion': 'direccion',
+        'comuna': 'comuna',
+        'fecha_modificacion': 'fecha_modificacion',
+    }
+
+
+class ServicioApiView(ApiListMixin, ServicioListView):
+    query_budget = 4
+    api_fields = {
+        'id': 'id',
+        'nombre': 'nombre',
+        'descripcion': 'descripcion',
+        'categoria': 'categoria',
+        'duracion_estimada_horas': 'duracion_estimada_horas',
+        'activo': 'activo',
+        'fecha_modificacion': 'fecha_modificacion',
+    }
+
+
+class ProfesionalApiView(ApiListMixin, ProfesionalListView):
+    query_budget = 4
+    api_fields = {
+        'id': 'id',
+        'run': 'run',
+        'nombres': 'nombres',
+        'apellidos': 'apellidos',
+        'especialidad': 'especialidad',
+        'email': 'email',
+        'ordenes_abiertas': 'ordenes_abiertas',
+        'horas_pendientes': 'horas_pendientes',
+        'fecha_modificacion': 'fecha_modificacion',
+    }
+
+
+class OrdenServicioApiView(ApiListMixin, OrdenServicioListView):
+    """
+    Órdenes: ?embed=empresa,profesional_asignado,servicios. Con ?archivadas=1
+    incluye las archivadas (mismos campos; los ids no se repiten entre tablas).
+    """
+    # Peor caso con sesión: sesión, usuario, página de activas y de archivadas,
+    # total=1 (un COUNT para ambas tablas) y embed=servicios.
+    query_budget = 6
+    api_fields = {
+        'id': 'id',
+        'fecha_creacion': 'fecha_creacion',
+        'fecha_modificacion': 'fecha_modificacion',
+        'estado': 'estado',
+        'prioridad': 'prioridad',
+        'descripcion_requerimiento': 'descripcion_requerimiento',
+        'empresa_id': 'empresa_id',
+        'profesional_asignado_id': 'profesional_asignado_id',
+    }
+    api_embeds = {
+        'empresa': {
+            'id': 'empresa__id',
+            'rut': 'empresa__rut',
+            'razon_social': 'empresa__razon_social',
+        },
+        'profesional_asignado': {
+            'id': 'profesional_asignado__id',
+            'run': 'profesional_asignado__run',
+            'nombres': 'profesional_asignado__nombres',
+            'apellidos': 'profesional_asignado__apellidos',
+        },
+    }
+    api_embeds_m2m = {'servicios': ('servicios_de', ('id', 'nombre'))}
+
+    def get_keyset_querysets(self, queryset):
+        if not self.incluir_archivadas():
+            return [queryset]
+        # Las filas de la página deben ser tuplas como las de `queryset`.
+        archivadas = self.valores(self.filtrar(OrdenServicioArchivada.objects.all()), *self._pedidos)
+        return [queryset, archivadas]
+
+    def servicios_de(self, pks):
+        """
+        (orden_id, servicio_id, nombre) de una página, en una consulta sobre la
+        tabla intermedia (con archivadas, UNION con la de las archivadas).
+        """
+        through = OrdenServicio.servicios_seleccionados.through
+        servicios = through.objects.filter(ordenservicio_id__in=pks).values_list(
+            'ordenservicio_id', 'servicio_id', 'servicio__nombre',
+        )
+        if self.incluir_archivadas():
+            archivadas = OrdenServicioArchivada.servicios_seleccionados.through.objects.filter(
+                ordenservicioarchivada_id__in=pks,
+            ).values_list('ordenservicioarchivada_id', 'servicio_id', 'servicio__nombre')
+            servicios = servicios.union(archivadas, all=True)
+        return servicios.order_by('ordenservicio_id', 'servicio__nombre')
+
+
+class OrdenTransicionApiView(LoginRequiredMixin, View):
+    """
+    Cambio de estado masivo. Cuerpo JSON, una de dos formas:
+        {"estado": "finalizada", "ids": [1, 2, 3]}
+        {"transiciones": {"finalizada": [1, 2], "cancelada": [3]}}
+    Responde el resultado de core.transiciones.transicionar() (aplicadas,
+    rechazadas, inexistentes, sin_cambio). Requiere sesión y token CSRF.
+    """
+    http_method_names = ['post']
+    raise_exception = True
+    query_budget = None
+
+    def post(self, request, *args, **kwargs):
+        try:
+            pedidas = self.pedidas(request.body)
+            resultado = transiciones.transicionar(pedidas, request.user)
+        except (ApiError, ValueError) as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse(resultado.como_dict(), json_dumps_params={'ensure_ascii': False})
+
+    def pedidas(self, cuerpo):
+        """{orden_id: estado_nuevo} desde el cuerpo JSON; ApiError si el formato no es válido."""
+        try:
+            datos = json.loads(cuerpo or b'{}')
+        except ValueError:
+            raise ApiError('El cuerpo no es JSON válido.')
+        if not isinstance(datos, dict):
+            raise ApiError('Se esperaba un objeto JSON.')
+        if 'transiciones' in datos:
+            grupos = datos['transiciones']
+        elif 'estado' in datos:
+            grupos = {datos['estado']: datos.get('ids')}
+        else:
+            raise ApiError('Indique "estado" e "ids", o "transiciones".')
+        if not isinstance(grupos, dict):
+            raise ApiError('"transiciones" debe ser un objeto {estado: [ids]}.')
+        pedidas = {}
+        for estado, ids in grupos.items():
+            if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+                raise ApiError(f'{estado}: se esperaba una lista de ids enteros.')
+            pedidas.update(dict.fromkeys(ids, estado))
+        return pedidas
+
+
+class JobApiView(JobsDelUsuarioMixin, View):
+    """GET /api/jobs/<id>/: estado del job. POST /api/jobs/: encola uno (staff)."""
+    raise_exception = True
+    query_budget = 3
+
+    def get(self, request, *args, **kwargs):
+        if 'pk' not in kwargs:
+            raise Http404
+        job = self.get_queryset().filter(pk=kwargs['pk']).first()
+        if job is None:
+            raise Http404
+        return self.respuesta(job)
+
+    def post(self, request, *args, **kwargs):
+        if 'pk' in kwargs or not request.user.is_staff:
+            return JsonResponse({'error': 'Solo el staff puede encolar jobs.'}, status=403)
+        try:
+            datos = json.loads(request.body or b'{}')
+            if not isinstance(datos, dict) or not isinstance(datos.get('parametros', {}), dict):
+                raise ApiError('Se esperaba {"tipo": "...", "parametros": {...}}.')
+            job = jobs.encolar(datos.get('tipo'), datos.get('parametros'), usuario=request.user)
+        except (ApiError, ValueError) as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        respuesta = self.respuesta(job, status=202)
+        respuesta['Location'] = reverse('api_job_detail', args=[job.pk])
+        return respuesta
+
+    def respuesta(self, job, status=200):
+        return JsonResponse(
+            job.como_dict(), status=status, encoder=DjangoJSONEncoder, json_dumps_params={'ensure_ascii': False},
+        )
+
+
+class AutocompletarView(LoginRequiredMixin, View):
+    """
+    Hasta `limite` coincidencias de ?q= como {"id", "text"} (text = str(obj)).
+
+    Búsqueda indexada por prefijo: RUT/RUN con el rango de core.rut o
+    palabras con FTS5 ('biob tra' -> '"biob"* "tra"*'), ordenadas por
+    relevancia. Sin q responde una lista vacía.
+    """
+    model = None
+    campos = ()  # columnas que usa __str__ (se leen con only())
+    search_fields = ()
+    rut_field = None
+    limite = 20
+    raise_exception = True
+    query_budget = 3
+
+    def get_queryset(self):
+        return self.model._default_manager.only('id', *self.campos)
+
+    def get(self, request, *args, **kwargs):
+        q = request.GET.get('q', '').strip()
+        resultados = []
+        if q:
+            resultados = [{'id': obj.pk, 'text': str(obj)} for obj in self.buscar(q)[:self.limite]]
+        return JsonResponse({'results': resultados}, json_dumps_params={'ensure_ascii': False})
+
+    def buscar(self, q):
+        qs = self.get_queryset()
+        por_rut = filtro_rut(self.rut_field, q) if self.rut_field else None
+        if por_rut is not None:
+            return qs.filter(por_rut).order_by(self.rut_field)
+        qs, ranked = search(qs, q, self.search_fields)
+        return qs.order_by('search_rank', 'id') if ranked else qs.order_by(self.campos[0], 'id')
+
+
+class EmpresaAutocompletarView(AutocompletarView):
+    model = Empresa
+    campos = ('razon_social', 'rut')
+    search_fields = EmpresaListView.search_fields
+    rut_field = 'rut_normalizado'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminacion_pendiente=None)
+
+
+class ProfesionalAutocompletarView(AutocompletarView):
+    model = Profesional
+    campos = ('nombres', 'apellidos', 'run')
+    search_fields = ProfesionalListView.search_fields
+    rut_field = 'run_normalizado'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminacion_pendiente=None)
+
+
+class ServicioAutocompletarView(AutocompletarView):
+    """Solo servicios activos (los disponibles para nuevas órdenes)."""
+    model = Servicio
+    campos = ('nombre',)
+    search_fields = ServicioListView.search_fields
+
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
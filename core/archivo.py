@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from . import cache, search
+from .models import OrdenServicio, OrdenServicioArchivada, OrdenTransicion, OrdenTransicionArchivada
+
+"""
+Archivo de órdenes cerradas (tabla activa / tabla archivada).
+
+Las órdenes 'finalizada' y 'cancelada' sin cambios desde hace más de
+settings.CORE_ARCHIVO_DIAS días se mueven a OrdenServicioArchivada (mismo
+id), junto con sus servicios (tabla M2M propia) y su historial
+(OrdenTransicionArchivada). Así los índices, listados, búsquedas y conteos
+del admin de OrdenServicio solo recorren las órdenes vigentes.
+
+archivar() trabaja por lotes de `batch_size` órdenes, cada uno en su propia
+transacción: INSERT ... SELECT hacia las tablas archivadas, reindexa la
+búsqueda de ese lote, elimina las filas activas con DELETE directos (sin
+señales) e invalida la caché de vistas al confirmarse. EstadisticaOrden no cambia (las archivadas siguen contando) y la
+carga de los profesionales tampoco (solo cuenta órdenes abiertas).
+
+Uso: python manage.py archivar_ordenes [--dias 365] [--lote 1000] [--dry-run]
+"""
+
+ESTADOS_CERRADOS = ('finalizada', 'cancelada')
+LOTE = 1000
+
+ORDENES = OrdenServicio._meta.db_table
+ORDENES_M2M = OrdenServicio.servicios_seleccionados.through._meta.db_table
+TRANSICIONES = OrdenTransicion._meta.db_table
+ARCHIVADAS = OrdenServicioArchivada._meta.db_table
+ARCHIVADAS_M2M = OrdenServicioArchivada.servicios_seleccionados.through._meta.db_table
+TRANSICIONES_ARCHIVADAS = OrdenTransicionArchivada._meta.db_table
+COLUMNAS = (
+    'id, empresa_id, fecha_creacion, estado, prioridad, descripcion_requerimiento, '
+    'profesional_asignado_id, fecha_modificacion'
+)
+COLUMNAS_TRANSICION = 'orden_id, estado_anterior, estado_nuevo, usuario_id, fecha'
+
+
+@dataclass
+class ResultadoArchivo:
+    ordenes: int = 0
+    servicios: int = 0
+    transiciones: int = 0
+    lotes: int = 0
+
+    def mensaje(self):
+        return (
+            f'{self.ordenes} órdenes archivadas ({self.servicios} servicios, '
+            f'{self.transiciones} cambios de estado) en {self.lotes} lotes.'
+        )
+
+
+def fecha_limite(dias=None):
+    if dias is None:
+        dias = getattr(settings, 'CORE_ARCHIVO_DIAS', 365)
+    return timezone.now() - timedelta(days=dias)
+
+
+def archivables(dias=None, using=DEFAULT_DB_ALIAS):
+    """Órdenes cerradas sin modificar desde hace más de `dias` días."""
+    return OrdenServicio.objects.using(using).filter(
+        estado__in=ESTADOS_CERRADOS, fecha_modificacion__lt=fecha_limite(dias),
+    )
+
+
+def archivar_lote(ids, dias=None, using=DEFAULT_DB_ALIAS):
+    """
+    Mueve a las tablas archivadas las órdenes `ids` que siguen siendo
+    archivables. Retorna (órdenes, servicios, transiciones) movidos.
+    """
+    connection = connections[using]
+    fecha = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        # Se vuelve a filtrar dentro de la transacción: una orden pudo reabrirse entre medio.
+        ids = list(archivables(dias, using).filter(pk__in=ids).values_list('id', flat=True))
+        if not ids:
+            return 0, 0, 0
+        marcadores = ', '.join(['%s'] * len(ids))
+        cursor.execute(
+            f'INSERT INTO {ARCHIVADAS} ({COLUMNAS}, fecha_archivo) '
+            f'SELECT {COLUMNAS}, %s FROM {ORDENES} WHERE id IN ({marcadores})',
+            [fecha, *ids],
+        )
+        cursor.execute(
+            f'INSERT INTO {ARCHIVADAS_M2M} (ordenservicioarchivada_id, servicio_id) '
+            f'SELECT ordenservicio_id, servicio_id FROM {ORDENES_M2M} WHERE ordenservicio_id IN ({marcadores})',
+            ids,
+        )
+        servicios = cursor.rowcount
+        cursor.execute(
+            f'INSERT INTO {TRANSICIONES_ARCHIVADAS} ({COLUMNAS_TRANSICION}) '
+            f'SELECT {COLUMNAS_TRANSICION} FROM {TRANSICIONES} WHERE orden_id IN ({marcadores}) ORDER BY id',
+            ids,
+        )
+        transiciones = cursor.rowcount
+        search.refresh_ids(OrdenServicioArchivada, ids, using)
+        search.remove_ids(OrdenServicio, ids, using)
+        cursor.execute(f'DELETE FROM {TRANSICIONES} WHERE orden_id IN ({marcadores})', ids)
+        cursor.execute(f'DELETE FROM {ORDENES_M2M} WHERE ordenservicio_id IN ({marcadores})', ids)
+        cursor.execute(f'DELETE FROM {ORDENES} WHERE id IN ({marcadores})', ids)
+        # Al confirmar cada lote: un archivo largo no deja páginas cacheadas con órdenes ya movidas.
+        cache.invalidar(OrdenServicio, OrdenServicioArchivada, using=using)
+    return len(ids), servicios, transiciones
+
+
+def archivar(dias=None, batch_size=LOTE, using=DEFAULT_DB_ALIAS, progreso=None):
+    """
+    Archiva todas las órdenes archivables por lotes. `progreso(resultado)`
+    se llama después de cada lote.
+    """
+    resultado = ResultadoArchivo()
+    candidatas = archivables(dias, using).order_by('id').values_list('id', flat=True)
+    ultimo = 0
+    while True:
+        ids = list(candidatas.filter(id__gt=ultimo)[:batch_size])
+        if not ids:
+            break
+        ordenes, servicios, transiciones = archivar_lote(ids, dias, using)
+        ultimo = ids[-1]
+        resultado.ordenes += ordenes
+        resultado.servicios += servicios
+        resultado.transiciones += transiciones
+        resultado.lotes += 1
+        if progreso is not None:
+            progreso(resultado)
+    return resultado
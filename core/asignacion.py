@@ -0,0 +1,142 @@
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from . import cache, cargas, search
+from .models import OrdenServicio, Profesional
+
+"""
+Asignación automática de profesionales a órdenes nuevas.
+
+Una orden 'nueva' sin profesional se asigna a un profesional cuya
+especialidad coincide con la categoría de alguno de sus servicios, el que
+tenga menos horas pendientes (Profesional.horas_pendientes, mantenida por
+core/cargas.py). Las órdenes se procesan por prioridad (alta primero) y
+antigüedad.
+
+Todo se calcula en memoria a partir de tres consultas (profesionales con su
+carga, órdenes pendientes y sus servicios): un min-heap de (carga,
+profesional_id) por especialidad entrega el menos cargado en O(log n) y se
+actualiza con la duración de cada orden asignada. El resultado se aplica
+con un UPDATE por profesional.
+
+Uso: python manage.py asignar_profesionales, o la acción del admin.
+"""
+
+ORDEN_PRIORIDAD = {'alta': 0, 'media': 1, 'baja': 2}
+LOTE = 10000
+
+
+def clave_categoria(texto):
+    return (texto or '').strip().lower()
+
+
+@dataclass
+class ResultadoAsignacion:
+    asignaciones: dict = field(default_factory=dict)  # {orden_id: profesional_id}
+    sin_candidato: list = field(default_factory=list)
+    cargas: dict = field(default_factory=dict)  # {profesional_id: horas} después de asignar
+    actualizadas: int = 0
+
+    def mensaje(self):
+        texto = f'{len(self.asignaciones)} órdenes asignadas'
+        if self.sin_candidato:
+            texto += f', {len(self.sin_candidato)} sin profesional disponible'
+        return texto + '.'
+
+
+def colas_por_especialidad(using=DEFAULT_DB_ALIAS):
+    """
+    {especialidad: heap [(horas_pendientes, profesional_id)]} con todos los
+    profesionales, salvo los que se están eliminando (core.eliminacion).
+    """
+    colas = defaultdict(list)
+    profesionales = Profesional.objects.using(using).filter(eliminacion_pendiente=None)
+    for pk, especialidad, horas in profesionales.values_list('id', 'especialidad', 'horas_pendientes'):
+        categoria = clave_categoria(especialidad)
+        if categoria:
+            colas[categoria].append((horas, pk))
+    for cola in colas.values():
+        heapq.heapify(cola)
+    return colas
+
+
+def pendientes(ordenes=None, using=DEFAULT_DB_ALIAS):
+    """
+    Órdenes nuevas sin profesional (de `ordenes`, si se indica), en orden de
+    atención: [(orden_id, {categorías}, horas)].
+    """
+    qs = OrdenServicio.objects.using(using) if ordenes is None else ordenes
+    qs = qs.filter(estado='nueva', profesional_asignado__isnull=True).order_by()
+    filas = sorted(
+        qs.values_list('prioridad', 'fecha_creacion', 'id'),
+        key=lambda fila: (ORDEN_PRIORIDAD.get(fila[0], len(ORDEN_PRIORIDAD)), fila[1], fila[2]),
+    )
+    categorias, horas = defaultdict(set), defaultdict(int)
+    through = OrdenServicio.servicios_seleccionados.through
+    servicios = (
+        through.objects.using(using).filter(ordenservicio__in=qs.values('id'))
+        .values_list('ordenservicio_id', 'servicio__categoria', 'servicio__duracion_estimada_horas')
+    )
+    for orden_id, categoria, duracion in servicios:
+        if clave_categoria(categoria):
+            categorias[orden_id].add(clave_categoria(categoria))
+        horas[orden_id] += duracion
+    return [(pk, categorias.get(pk, set()), horas.get(pk, 0)) for _, _, pk in filas]
+
+
+def planificar(ordenes, colas, capacidad=None):
+    """
+    Asigna cada orden al profesional menos cargado entre las especialidades
+    de sus servicios. Con `capacidad` (horas) no se supera esa carga por
+    profesional. Modifica `colas`. Retorna ({orden_id: profesional_id}, [sin candidato]).
+    """
+    asignaciones, sin_candidato = {}, []
+    for pk, categorias, horas in ordenes:
+        cola = min((colas[c] for c in categorias if colas.get(c)), key=lambda cola: cola[0], default=None)
+        if cola is None or (capacidad is not None and cola[0][0] + horas > capacidad):
+            sin_candidato.append(pk)
+            continue
+        carga, profesional_id = cola[0]
+        heapq.heapreplace(cola, (carga + horas, profesional_id))
+        asignaciones[pk] = profesional_id
+    return asignaciones, sin_candidato
+
+
+def aplicar(asignaciones, using=DEFAULT_DB_ALIAS):
+    """
+    Guarda {orden_id: profesional_id} con un UPDATE por profesional (solo
+    órdenes que siguen nuevas y sin asignar). Retorna las filas actualizadas.
+    """
+    por_profesional = defaultdict(list)
+    for orden_id, profesional_id in asignaciones.items():
+        por_profesional[profesional_id].append(orden_id)
+    ahora = timezone.now()
+    actualizadas = 0
+    with transaction.atomic(using=using):
+        for profesional_id, ids in por_profesional.items():
+            for inicio in range(0, len(ids), LOTE):
+                actualizadas += (
+                    OrdenServicio.objects.using(using)
+                    .filter(pk__in=ids[inicio:inicio + LOTE], estado='nueva', profesional_asignado__isnull=True)
+                    .update(profesional_asignado_id=profesional_id, fecha_modificacion=ahora)
+                )
+        # El documento de búsqueda de la orden incluye el nombre del profesional.
+        search.refresh_ids(OrdenServicio, list(asignaciones), using)
+        cargas.recalcular(por_profesional, using)
+        cache.invalidar(OrdenServicio, using=using)
+    return actualizadas
+
+
+def asignar(ordenes=None, capacidad=None, guardar=True, using=DEFAULT_DB_ALIAS):
+    """Planifica y (si `guardar`) aplica la asignación de las órdenes pendientes."""
+    colas = colas_por_especialidad(using)
+    asignaciones, sin_candidato = planificar(pendientes(ordenes, using), colas, capacidad)
+    resultado = ResultadoAsignacion(asignaciones, sin_candidato)
+    resultado.cargas = {pk: carga for cola in colas.values() for carga, pk in cola}
+    if guardar and asignaciones:
+        resultado.actualizadas = aplicar(asignaciones, using)
+    return resultado
@@ -0,0 +1,157 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+
+from . import api, views
+from .api import ApiError
+from .cache import resolver
+from .export import afilas_exportacion, agenerar_csv, agenerar_ndjson
+
+"""
+Versiones async de las vistas de lectura de core (listados, detalles,
+búsqueda, exportación y API JSON) para el despliegue ASGI (project/asgi.py).
+
+Heredan de las vistas sync (mismos filtros, plantillas, presupuestos de
+consultas y caché) y solo reemplazan get(): las filas se leen con el ORM
+async (aiterator/aget/acount) y la exportación se transmite con un generador
+async, de modo que una exportación o búsqueda lenta no ocupa un worker
+mientras espera a SQLite.
+
+get_queryset() y get_context_data() pueden consultar la base (detección de
+FTS5, panel de estadísticas); se ejecutan con sync_to_async en el hilo de la
+request. core/urls.py usa estas clases cuando settings.CORE_ASYNC_VIEWS.
+"""
+
+
+class AsyncKeysetListMixin:
+    """get() async para las ListViews con KeysetPaginationMixin."""
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await sync_to_async(self.get_queryset)()
+        page_size = self.get_paginate_by(self.object_list)
+        self._pagina = await self.apaginate_queryset(self.object_list, page_size)
+        context = self.get_context_data()
+        # La plantilla se renderiza después, fuera del event loop (el handler
+        # ASGI llama a response.render() con sync_to_async).
+        return self.render_to_response(context)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self._pagina
+
+
+class AsyncDetailMixin:
+    """get() async para las DetailViews."""
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await sync_to_async(self.get_object)()
+        context = await sync_to_async(self.get_context_data)(object=self.object)
+        return self.render_to_response(context)
+
+
+class AsyncApiMixin:
+    """get() async para los endpoints de core.api."""
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            campos, embeds = self.parametros()
+        except ApiError as error:
+            return self.error(error)
+        queryset = await sync_to_async(self.get_queryset)()
+        valores = self.valores(queryset, campos, embeds)
+
+        if 'pk' in kwargs:
+            try:
+                filas = [await valores.aget(pk=kwargs['pk'])]
+            except self.model.DoesNotExist:
+                raise Http404('No existe.')
+            page = total = None
+        else:
+            _, page, filas, _ = await self.apaginate_queryset(valores, self.paginate_by)
+            total = await sync_to_async(self.contar)(valores) if self.pide_total() else None
+
+        resultados = self.serializar(filas, campos)
+        pks = self.pks(filas)
+        for relacion in embeds:
+            if relacion in self.api_embeds_m2m:
+                metodo, subcampos = self.api_embeds_m2m[relacion]
+                relacionadas = [fila async for fila in getattr(self, metodo)(pks)]
+                self.embeber(resultados, pks, relacion, subcampos, relacionadas)
+        return self.respuesta(self.cuerpo(resultados, page, total))
+
+
+class EmpresaListView(AsyncKeysetListMixin, views.EmpresaListView):
+    pass
+
+
+class EmpresaDetailView(AsyncDetailMixin, views.EmpresaDetailView):
+    pass
+
+
+class ServicioListView(AsyncKeysetListMixin, views.ServicioListView):
+    pass
+
+
+class ServicioDetailView(AsyncDetailMixin, views.ServicioDetailView):
+    pass
+
+
+class ProfesionalListView(AsyncKeysetListMixin, views.ProfesionalListView):
+    pass
+
+
+class ProfesionalDetailView(AsyncDetailMixin, views.ProfesionalDetailView):
+    pass
+
+
+class OrdenServicioListView(AsyncKeysetListMixin, views.OrdenServicioListView):
+    pass
+
+
+class OrdenServicioDetailView(AsyncDetailMixin, views.OrdenServicioDetailView):
+    pass
+
+
+class OrdenServicioArchivadaDetailView(AsyncDetailMixin, views.OrdenServicioArchivadaDetailView):
+    pass
+
+
+class OrdenServicioExportView(views.OrdenServicioExportView):
+    """Exportación con aiterator: el event loop atiende otras requests entre bloques."""
+    formatos = {
+        'csv': (agenerar_csv, 'text/csv; charset=utf-8'),
+        'ndjson': (agenerar_ndjson, 'application/x-ndjson; charset=utf-8'),
+    }
+
+    async def dispatch(self, request, *args, **kwargs):
+        # LoginRequiredMixin lee request.user (sesión en la base): se carga antes, fuera del event loop.
+        await sync_to_async(lambda: request.user.is_authenticated)()
+        return await resolver(super().dispatch(request, *args, **kwargs))
+
+    async def get(self, request, *args, **kwargs):
+        formato = request.GET.get('formato', 'csv')
+        if formato not in self.formatos:
+            formato = 'csv'
+        generar, content_type = self.formatos[formato]
+        queryset = await sync_to_async(self.get_queryset)()
+        # El streaming corre después de la vista: se fija ahora la base de lectura (core.db).
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(generar(afilas_exportacion(queryset, self.chunk_size)), content_type=content_type)
+        nombre = f"ordenes_{timezone.localdate():%Y%m%d}.{formato}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+
+
+class EmpresaApiView(AsyncApiMixin, api.EmpresaApiView):
+    pass
+
+
+class ServicioApiView(AsyncApiMixin, api.ServicioApiView):
+    pass
+
+
+class ProfesionalApiView(AsyncApiMixin, api.ProfesionalApiView):
+    pass
+
+
+class OrdenServicioApiView(AsyncApiMixin, api.OrdenServicioApiView):
+    pass
@@ -0,0 +1,39 @@
+from django.db.backends.sqlite3 import base
+
+"""
+Backend SQLite de producción (ENGINE 'core.backends.sqlite3').
+
+Agrega a django.db.backends.sqlite3 dos opciones que Django incorpora recién
+en 5.1, con los mismos nombres para poder volver al backend estándar:
+
+  - OPTIONS['init_command']: sentencias separadas por ';' que se ejecutan al
+    abrir cada conexión (PRAGMA journal_mode=WAL, synchronous, mmap_size...).
+  - OPTIONS['transaction_mode']: 'IMMEDIATE' abre las transacciones con
+    BEGIN IMMEDIATE. Con el BEGIN diferido por defecto, una transacción que
+    primero lee y luego escribe falla con "database is locked" sin esperar
+    busy_timeout si otra conexión escribió entre medio; IMMEDIATE toma el
+    lock de escritura al inicio y espera su turno.
+"""
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('init_command', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict['OPTIONS'].get('init_command', '')
+        for sentencia in init_command.split(';'):
+            if sentencia.strip():
+                conn.execute(sentencia)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        modo = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if modo is None:
+            return super()._start_transaction_under_autocommit()
+        self.cursor().execute(f'BEGIN {modo}')
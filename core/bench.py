@@ -0,0 +1,371 @@
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections, transaction
+from django.template import engines
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from . import db, transiciones, views
+from .cache import get_cache
+from .middleware import count_queries
+from .models import Empresa, Servicio, Profesional, OrdenServicio
+
+"""
+Escenarios de benchmark para las vistas y querysets de core.
+
+Cada escenario es una request HTTP con el cliente de pruebas de Django o una
+evaluación directa de get_queryset() de una ListView. Por escenario se mide
+latencia (p50/p95/p99), cantidad de consultas SQL y tiempo SQL.
+
+Lo usa `manage.py bench`; también se puede llamar desde tests:
+
+    resultados = ejecutar(construir_escenarios(), iteraciones=20)
+
+bench_plantillas() mide solo el renderizado de la tabla de órdenes con
+1k/10k filas: el bucle original con {% url %} por fila contra
+{% filas %} (core/templatetags/core_filas.py) sin caché, con caché fría y
+con caché caliente.
+
+bench_transiciones() mide core.transiciones.transicionar() sobre lotes de
+órdenes (dentro de una transacción que se revierte).
+
+bench_concurrencia() mide lecturas y escrituras simultáneas desde varios
+hilos (una conexión por hilo), con los errores "database is locked": sirve
+para comparar el perfil SQLite por defecto con DJANGO_DB_PRODUCCION=1.
+"""
+
+# Tabla de orden_list.html antes de {% filas %}: tres {% url %} por fila.
+FILAS_ORIGINAL = """{% for obj in object_list %}
+        <tr>
+            <td>{{ obj.id }}</td>
+            <td>{{ obj.empresa }}</td>
+            <td>{{ obj.fecha_creacion }}</td>
+            <td>{{ obj.get_estado_display }}</td>
+            <td>{{ obj.get_prioridad_display }}</td>
+            <td><a class="btn btn-sm btn-secondary" href="{% url 'orden_detail' obj.pk %}">Ver</a>
+                <a class="btn btn-sm btn-secondary" href="{% url 'orden_update' obj.pk %}">Editar</a>
+                <a class="btn btn-sm btn-danger" href="{% url 'orden_delete' obj.pk %}">Eliminar</a>
+            </td>
+        </tr>
+{% endfor %}"""
+FILAS_RAPIDO = "{% load core_filas %}{% filas object_list 'core/_orden_fila.html' %}"
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    ejecutar: object  # callable sin argumentos
+    tipo: str = 'http'
+
+
+@dataclass
+class Resultado:
+    nombre: str
+    tipo: str
+    latencias_ms: list = field(default_factory=list)
+    consultas: list = field(default_factory=list)
+    sql_ms: list = field(default_factory=list)
+
+    def resumen(self):
+        return {
+            'tipo': self.tipo,
+            'iteraciones': len(self.latencias_ms),
+            'p50_ms': round(percentil(self.latencias_ms, 50), 3),
+            'p95_ms': round(percentil(self.latencias_ms, 95), 3),
+            'p99_ms': round(percentil(self.latencias_ms, 99), 3),
+            'media_ms': round(sum(self.latencias_ms) / len(self.latencias_ms), 3),
+            'consultas': round(sum(self.consultas) / len(self.consultas), 2),
+            'sql_ms': round(sum(self.sql_ms) / len(self.sql_ms), 3),
+        }
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano."""
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+def cursor_pagina(view_class, params, pagina):
+    """Querystring de la página `pagina` (1 = primera) siguiendo los cursores de la vista."""
+    factory = RequestFactory()
+    querystring = ''
+    consulta = dict(params)
+    for _ in range(pagina - 1):
+        request = factory.get('/', consulta)
+        response = view_class.as_view()(request)
+        page = response.context_data['page_obj']
+        if not page.has_next():
+            break
+        querystring = page.next_querystring
+        consulta = dict(request.GET.items())
+        consulta['cursor'] = page.next_cursor
+    return querystring
+
+
+def queryset_de_vista(view_class, params):
+    """Evalúa la primera página de get_queryset() sin renderizar (mide solo el ORM)."""
+    factory = RequestFactory()
+
+    def ejecutar():
+        view = view_class()
+        view.setup(factory.get('/', params))
+        return list(view.keyset_queryset(view.get_queryset())[:view.paginate_by + 1])
+    return ejecutar
+
+
+def construir_escenarios(client=None):
+    """Escenarios para todas las rutas de core/urls.py con datos de muestra de la base actual."""
+    if client is None:
+        client = cliente_autenticado()
+    empresa = Empresa.objects.order_by('id').first()
+    servicio = Servicio.objects.order_by('id').first()
+    profesional = Profesional.objects.order_by('id').first()
+    orden = OrdenServicio.objects.order_by('-id').first()
+    if not (empresa and servicio and profesional and orden):
+        raise ValueError('La base de datos no tiene datos: ejecute manage.py seed primero.')
+    palabra = empresa.razon_social.split()[0]
+
+    def get(nombre_url, *args, query=''):
+        url = reverse(nombre_url, args=args) + (f'?{query}' if query else '')
+
+        def ejecutar():
+            response = client.get(url)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            return response
+        return ejecutar
+
+    def crear_orden():
+        return client.post(reverse('orden_create'), {
+            'empresa': empresa.pk,
+            'estado': 'nueva',
+            'prioridad': 'media',
+            'descripcion_requerimiento': 'Orden de benchmark',
+            'servicios_seleccionados': [servicio.pk],
+        })
+
+    pagina_10 = cursor_pagina(views.OrdenServicioListView, {}, 10)
+    return [
+        Escenario('orden_list', get('orden_list')),
+        Escenario('orden_list página 10', get('orden_list', query=pagina_10)),
+        Escenario('orden_list estado+prioridad', get('orden_list', query='estado=nueva&prioridad=alta')),
+        Escenario('orden_list búsqueda', get('orden_list', query=f'q={palabra}')),
+        Escenario('orden_list empresa por RUT', get('orden_list', query=f'empresa={empresa.rut}')),
+        Escenario('orden_detail', get('orden_detail', orden.pk)),
+        Escenario('orden_create GET', get('orden_create')),
+        Escenario('orden_create POST', crear_orden),
+        Escenario('orden_update GET', get('orden_update', orden.pk)),
+        Escenario('orden_export estado=nueva', get('orden_export', query='estado=nueva')),
+        Escenario('api_orden_list', get('api_orden_list')),
+        Escenario('api_orden_list estado+prioridad', get('api_orden_list', query='estado=nueva&prioridad=alta')),
+        Escenario('api_orden_list embed', get('api_orden_list', query='embed=empresa,profesional_asignado,servicios')),
+        Escenario('api_orden_detail', get('api_orden_detail', orden.pk)),
+        Escenario('empresa_list', get('empresa_list')),
+        Escenario('empresa_list búsqueda', get('empresa_list', query=f'q={palabra}')),
+        Escenario('empresa_detail', get('empresa_detail', empresa.pk)),
+        Escenario('empresa_create GET', get('empresa_create')),
+        Escenario('dashboard', get('dashboard')),
+        Escenario('api_empresa_list', get('api_empresa_list')),
+        Escenario('servicio_list', get('servicio_list')),
+        Escenario('servicio_detail', get('servicio_detail', servicio.pk)),
+        Escenario('profesional_list', get('profesional_list')),
+        Escenario('profesional_detail', get('profesional_detail', profesional.pk)),
+        Escenario('qs ordenes', queryset_de_vista(views.OrdenServicioListView, {}), 'queryset'),
+        Escenario('qs ordenes estado', queryset_de_vista(views.OrdenServicioListView, {'estado': 'finalizada'}), 'queryset'),
+        Escenario('qs ordenes búsqueda', queryset_de_vista(views.OrdenServicioListView, {'q': palabra}), 'queryset'),
+        Escenario('qs empresas', queryset_de_vista(views.EmpresaListView, {}), 'queryset'),
+        Escenario('qs servicios', queryset_de_vista(views.ServicioListView, {}), 'queryset'),
+        Escenario('qs profesionales', queryset_de_vista(views.ProfesionalListView, {}), 'queryset'),
+    ]
+
+
+def cliente_autenticado(username='bench'):
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(username=username, defaults={'is_staff': True, 'is_superuser': True})
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def ejecutar(escenarios, iteraciones=30, calentamiento=3, filtro=None):
+    """Ejecuta cada escenario y retorna {nombre: resumen}."""
+    resultados = {}
+    for escenario in escenarios:
+        if filtro and filtro not in escenario.nombre:
+            continue
+        for _ in range(calentamiento):
+            escenario.ejecutar()
+        resultado = Resultado(escenario.nombre, escenario.tipo)
+        for _ in range(iteraciones):
+            with count_queries() as contador:
+                inicio = time.perf_counter()
+                escenario.ejecutar()
+                duracion = time.perf_counter() - inicio
+            resultado.latencias_ms.append(duracion * 1000)
+            resultado.consultas.append(contador.count)
+            resultado.sql_ms.append(contador.duration * 1000)
+        resultados[escenario.nombre] = resultado.resumen()
+    return resultados
+
+
+def comparar(actual, base, umbral, metrica='p50_ms'):
+    """
+    Compara dos resultados ({nombre: resumen}). Retorna lista de
+    (nombre, valor_base, valor_actual, variacion_%) de los escenarios que
+    empeoraron más que `umbral` por ciento.
+    """
+    regresiones = []
+    for nombre, resumen in actual.items():
+        if nombre not in base:
+            continue
+        anterior = base[nombre][metrica]
+        if anterior <= 0:
+            continue
+        variacion = (resumen[metrica] - anterior) / anterior * 100
+        if variacion > umbral:
+            regresiones.append((nombre, anterior, resumen[metrica], variacion))
+    return regresiones
+
+
+def medir(funcion, iteraciones):
+    latencias = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+
+def bench_plantillas(cantidades=(1000, 10000), iteraciones=5):
+    """
+    {'<n> filas <modo>': {'p50_ms', 'media_ms', 'filas'}} del renderizado de
+    la tabla de órdenes. Los objetos se cargan una vez (no mide el ORM).
+    """
+    engine = engines['django']
+    original = engine.from_string(FILAS_ORIGINAL)
+    rapido = engine.from_string(FILAS_RAPIDO)
+    ordenes = list(OrdenServicio.objects.select_related('empresa').order_by('-id')[:max(cantidades)])
+    resultados = {}
+
+    def registrar(nombre, latencias, filas):
+        resultados[nombre] = {
+            'p50_ms': round(percentil(latencias, 50), 3),
+            'media_ms': round(sum(latencias) / len(latencias), 3),
+            'filas': filas,
+        }
+
+    for cantidad in cantidades:
+        contexto = {'object_list': ordenes[:cantidad]}
+        filas = len(contexto['object_list'])
+        registrar(f'{cantidad} filas {{% url %}}', medir(lambda: original.render(contexto), iteraciones), filas)
+        with override_settings(CORE_CACHE_FILAS=False):
+            registrar(f'{cantidad} filas {{% filas %}}', medir(lambda: rapido.render(contexto), iteraciones), filas)
+        with override_settings(CORE_CACHE_FILAS=True):
+            def en_frio():
+                get_cache().clear()
+                rapido.render(contexto)
+            registrar(f'{cantidad} filas caché fría', medir(en_frio, iteraciones), filas)
+            rapido.render(contexto)
+            registrar(f'{cantidad} filas caché caliente', medir(lambda: rapido.render(contexto), iteraciones), filas)
+    return resultados
+
+
+def bench_transiciones(cantidades=(1000, 10000), iteraciones=3):
+    """
+    {'<n> órdenes': {'p50_ms', 'ordenes_por_s', 'aplicadas'}}: órdenes
+    'nueva' -> 'en_ejecucion' en un solo llamado. Cada iteración se revierte.
+    """
+    resultados = {}
+    for cantidad in cantidades:
+        ids = list(
+            OrdenServicio.objects.filter(estado='nueva').order_by('id').values_list('id', flat=True)[:cantidad]
+        )
+        aplicadas = []
+
+        def transicionar():
+            with transaction.atomic():
+                aplicadas.append(transiciones.transicionar_a(ids, 'en_ejecucion').total_aplicadas)
+                transaction.set_rollback(True)
+        latencias = medir(transicionar, iteraciones)
+        p50 = percentil(latencias, 50)
+        resultados[f'{len(ids)} órdenes'] = {
+            'p50_ms': round(p50, 3),
+            'ordenes_por_s': round(len(ids) / (p50 / 1000)) if p50 else 0,
+            'aplicadas': aplicadas[-1],
+        }
+    return resultados
+
+
+def bench_concurrencia(lectores=8, escritores=2, duracion=5.0, semilla=42):
+    """
+    {'lecturas': {...}, 'escrituras': {...}} con operaciones/s, p50/p95 y
+    errores por tipo.
+
+    Cada lector evalúa la primera página del listado de órdenes y el detalle
+    de una orden dentro de core.db.lectura() (réplica si está configurada).
+    Cada escritor lee y guarda una orden en una transacción (save() con sus
+    señales), el caso en que el BEGIN diferido de SQLite falla con
+    "database is locked". Las órdenes se guardan sin cambiar sus datos.
+    """
+    ids = list(OrdenServicio.objects.order_by('id').values_list('id', flat=True)[:5000])
+    listado = queryset_de_vista(views.OrdenServicioListView, {})
+    latencias = {'lecturas': [], 'escrituras': []}
+    errores = {'lecturas': Counter(), 'escrituras': Counter()}
+    fin = time.perf_counter() + duracion
+    cerrojo = threading.Lock()
+
+    def leer(azar):
+        with db.lectura():
+            listado()
+            OrdenServicio.objects.select_related('empresa', 'profesional_asignado').get(pk=azar.choice(ids))
+
+    def escribir(azar):
+        with transaction.atomic():
+            orden = OrdenServicio.objects.get(pk=azar.choice(ids))
+            orden.save()
+
+    def hilo(tipo, operacion, numero):
+        azar = random.Random(semilla + numero)
+        propias, fallas = [], Counter()
+        try:
+            while time.perf_counter() < fin:
+                inicio = time.perf_counter()
+                try:
+                    operacion(azar)
+                except OperationalError as error:
+                    fallas[str(error)] += 1
+                    continue
+                propias.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            connections.close_all()
+        with cerrojo:
+            latencias[tipo].extend(propias)
+            errores[tipo].update(fallas)
+
+    hilos = [threading.Thread(target=hilo, args=('lecturas', leer, n)) for n in range(lectores)]
+    hilos += [threading.Thread(target=hilo, args=('escrituras', escribir, lectores + n)) for n in range(escritores)]
+    inicio = time.perf_counter()
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join()
+    transcurrido = time.perf_counter() - inicio
+    return {
+        tipo: {
+            'hilos': lectores if tipo == 'lecturas' else escritores,
+            'ops_por_s': round(len(valores) / transcurrido, 1),
+            'p50_ms': round(percentil(valores, 50), 2) if valores else None,
+            'p95_ms': round(percentil(valores, 95), 2) if valores else None,
+            'errores': dict(errores[tipo]),
+        }
+        for tipo, valores in latencias.items()
+    }
@@ -0,0 +1,189 @@
+import hashlib
+import inspect
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+
+from . import metricas
+
+"""
+Caché de páginas de listado y detalle con invalidación por generación.
+
+Cada modelo tiene un contador de generación guardado en la caché. La clave de
+una página incluye la URL, los parámetros GET (filtros, búsqueda, cursor) y la
+generación de cada modelo del que depende la vista (`cache_models`); al
+guardar, eliminar o cambiar el M2M de un modelo se incrementa su generación
+(core/signals.py), lo que deja inalcanzables todas sus páginas sin tener que
+enumerarlas. Las operaciones masivas sin señales (QuerySet.update() de las
+acciones del admin, import_data, seed) llaman a invalidar() explícitamente.
+
+Solo se cachean GET anónimos con respuesta 200: las páginas de usuarios
+autenticados muestran su nombre y los enlaces de edición.
+
+El backend es el alias settings.CORE_CACHE_ALIAS ('default'): LocMemCache
+expulsa por LRU al superar MAX_ENTRIES; FileBasedCache (CACHE_DIR) comparte
+la caché entre procesos y descarta entradas según CULL_FREQUENCY. Los
+contadores de aciertos y fallos también se guardan en la caché
+(estadisticas(), manage.py cache_stats).
+"""
+
+PREFIJO = 'core'
+CLAVE_ACIERTOS = f'{PREFIJO}:cache:aciertos'
+CLAVE_FALLOS = f'{PREFIJO}:cache:fallos'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CORE_CACHE_ALIAS', 'default')]
+
+
+def clave_generacion(model):
+    return f'{PREFIJO}:gen:{model._meta.label_lower}'
+
+
+def generaciones(models):
+    """Generación actual de cada modelo (una sola lectura con get_many)."""
+    cache = get_cache()
+    claves = [clave_generacion(model) for model in models]
+    valores = cache.get_many(claves)
+    faltantes = {clave: nueva_generacion() for clave in claves if clave not in valores}
+    if faltantes:
+        # add() no pisa una generación escrita por otro proceso entre medio.
+        for clave, valor in faltantes.items():
+            if not cache.add(clave, valor, timeout=None):
+                valor = cache.get(clave, valor)
+            valores[clave] = valor
+    return [valores[clave] for clave in claves]
+
+
+def nueva_generacion():
+    # Si la caché pierde el contador (expulsión, reinicio), el valor inicial no
+    # repite generaciones anteriores y no se sirven páginas obsoletas.
+    return time.time_ns()
+
+
+def incrementar(clave):
+    cache = get_cache()
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 1, timeout=None)
+        return 1
+
+
+def invalidar(*models, using=DEFAULT_DB_ALIAS):
+    """Incrementa la generación de los modelos al confirmarse la transacción actual."""
+    def bump():
+        cache = get_cache()
+        for model in models:
+            clave = clave_generacion(model)
+            try:
+                cache.incr(clave)
+            except ValueError:
+                cache.set(clave, nueva_generacion(), timeout=None)
+    transaction.on_commit(bump, using=using)
+
+
+def clave_pagina(request, vista, models):
+    parametros = sorted((clave, valor) for clave in request.GET for valor in request.GET.getlist(clave))
+    huella = hashlib.md5(f'{request.path}?{parametros}'.encode(), usedforsecurity=False).hexdigest()
+    version = '.'.join(str(generacion) for generacion in generaciones(models))
+    return f'{PREFIJO}:vista:{vista}:{version}:{huella}'
+
+
+def estadisticas():
+    """{'aciertos', 'fallos', 'tasa'} acumulados en la caché."""
+    valores = get_cache().get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    aciertos, fallos = valores.get(CLAVE_ACIERTOS, 0), valores.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {'aciertos': aciertos, 'fallos': fallos, 'tasa': aciertos / total if total else 0.0}
+
+
+def reiniciar_estadisticas():
+    get_cache().delete_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+
+
+class CachedViewMixin:
+    """
+    Cachea la respuesta renderizada de la vista para GET anónimos.
+
+    `cache_models`: modelos cuyos cambios invalidan la página (por defecto el
+    modelo de la vista). `cache_timeout`: segundos (None usa
+    settings.CORE_CACHE_TIMEOUT).
+    """
+    cache_models = None
+    cache_timeout = None
+
+    def get_cache_models(self):
+        return self.cache_models or (self.model,)
+
+    def es_cacheable(self, request):
+        # Sin request.user (RequestFactory, vistas llamadas directamente) no se cachea.
+        user = getattr(request, 'user', None)
+        return (
+            request.method in ('GET', 'HEAD')
+            and user is not None
+            and not user.is_authenticated
+            and 'messages' not in request.COOKIES
+        )
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, 'CORE_CACHE_TIMEOUT', 300)
+
+    def respuesta_cacheada(self, request):
+        """(clave, respuesta guardada o None)."""
+        clave = clave_pagina(request, type(self).__name__, self.get_cache_models())
+        guardada = get_cache().get(clave)
+        if guardada is None:
+            incrementar(CLAVE_FALLOS)
+            return clave, None
+        incrementar(CLAVE_ACIERTOS)
+        contenido, content_type = guardada
+        response = HttpResponse(contenido, content_type=content_type)
+        response['X-Cache'] = 'HIT'
+        return clave, response
+
+    def guardar_respuesta(self, clave, response):
+        if response.status_code == 200 and not response.streaming:
+            get_cache().set(clave, (response.content, response['Content-Type']), self.get_cache_timeout())
+        response['X-Cache'] = 'MISS'
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        if not self.es_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        clave, response = self.respuesta_cacheada(request)
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            metricas.renderizar(request, response)
+        self.guardar_respuesta(clave, response)
+        return response
+
+    async def adispatch(self, request, *args, **kwargs):
+        """dispatch de las vistas async (core.async_views)."""
+        # request.user puede leer la sesión de la base: fuera del event loop.
+        if not await sync_to_async(self.es_cacheable)(request):
+            return await resolver(super().dispatch(request, *args, **kwargs))
+        clave, response = self.respuesta_cacheada(request)
+        if response is not None:
+            return response
+        response = await resolver(super().dispatch(request, *args, **kwargs))
+        if hasattr(response, 'render'):
+            await sync_to_async(metricas.renderizar)(request, response)
+        self.guardar_respuesta(clave, response)
+        return response
+
+
+async def resolver(resultado):
+    """Espera `resultado` si es una corrutina (un mixin sync puede responder sin llamar al handler async)."""
+    if inspect.isawaitable(resultado):
+        return await resultado
+    return resultado
@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache
+from .models import CargaProfesional, OrdenServicio, Profesional
+
+"""
+Carga de trabajo por profesional: órdenes abiertas ('nueva' y
+'en_ejecucion') asignadas y la suma de duracion_estimada_horas de sus
+servicios.
+
+Se guarda desnormalizada en CargaProfesional (por estado) y en
+Profesional.ordenes_abiertas / horas_pendientes (totales indexados), para
+que los listados y el admin ordenen por carga sin agregar por fila.
+
+recalcular(ids) rehace la carga de esos profesionales con un GROUP BY sobre
+sus órdenes abiertas. Lo llaman las señales (asignación, cambio de estado,
+servicios de la orden, duración de un servicio) y las operaciones masivas
+(core.transiciones, core.asignacion, import_data, seed).
+"""
+
+ESTADOS_ABIERTOS = ('nueva', 'en_ejecucion')
+TABLA_PROFESIONAL = Profesional._meta.db_table
+
+
+def calcular(profesional_ids=None, using=DEFAULT_DB_ALIAS):
+    """{(profesional_id, estado): (ordenes, horas)} desde OrdenServicio."""
+    qs = OrdenServicio.objects.using(using).filter(estado__in=ESTADOS_ABIERTOS, profesional_asignado__isnull=False)
+    if profesional_ids is not None:
+        qs = qs.filter(profesional_asignado_id__in=profesional_ids)
+    filas = (
+        qs.order_by()
+        .values_list('profesional_asignado_id', 'estado')
+        .annotate(
+            ordenes=Count('id', distinct=True),
+            horas=Coalesce(Sum('servicios_seleccionados__duracion_estimada_horas'), 0),
+        )
+    )
+    return {(profesional_id, estado): (ordenes, horas) for profesional_id, estado, ordenes, horas in filas}
+
+
+def recalcular(profesional_ids=None, using=DEFAULT_DB_ALIAS):
+    """
+    Recalcula la carga de `profesional_ids` (todos si es None). Solo los
+    profesionales cuyos totales cambian reciben nueva fecha_modificacion
+    (versión de sus filas cacheadas en el listado).
+    """
+    if profesional_ids is not None:
+        profesional_ids = {pk for pk in profesional_ids if pk is not None}
+        if not profesional_ids:
+            return
+    profesionales = Profesional.objects.using(using)
+    cargas = CargaProfesional.objects.using(using)
+    if profesional_ids is not None:
+        profesionales = profesionales.filter(pk__in=profesional_ids)
+        cargas = cargas.filter(profesional_id__in=profesional_ids)
+
+    with transaction.atomic(using=using):
+        por_estado = calcular(profesional_ids, using)
+        totales = defaultdict(lambda: (0, 0))
+        for (profesional_id, _), (ordenes, horas) in por_estado.items():
+            total_ordenes, total_horas = totales[profesional_id]
+            totales[profesional_id] = (total_ordenes + ordenes, total_horas + horas)
+
+        cargas.delete()
+        CargaProfesional.objects.using(using).bulk_create([
+            CargaProfesional(profesional_id=profesional_id, estado=estado, ordenes=ordenes, horas=horas)
+            for (profesional_id, estado), (ordenes, horas) in por_estado.items()
+        ])
+        fecha = connections[using].ops.adapt_datetimefield_value(timezone.now())
+        cambios = [
+            (*totales[pk], fecha, pk)
+            for pk, ordenes, horas in profesionales.values_list('id', 'ordenes_abiertas', 'horas_pendientes')
+            if totales[pk] != (ordenes, horas)
+        ]
+        if cambios:
+            with connections[using].cursor() as cursor:
+                cursor.executemany(
+                    f'UPDATE {TABLA_PROFESIONAL} SET ordenes_abiertas = %s, horas_pendientes = %s, '
+                    f'fecha_modificacion = %s WHERE id = %s',
+                    cambios,
+                )
+        cache.invalidar(Profesional, using=using)
+
+
+def profesionales_de(orden_ids, using=DEFAULT_DB_ALIAS, batch_size=500):
+    """Profesionales asignados a las órdenes abiertas `orden_ids`."""
+    orden_ids = list(orden_ids)
+    ids = set()
+    for inicio in range(0, len(orden_ids), batch_size):
+        ids.update(
+            OrdenServicio.objects.using(using)
+            .filter(pk__in=orden_ids[inicio:inicio + batch_size], estado__in=ESTADOS_ABIERTOS)
+            .exclude(profesional_asignado=None)
+            .values_list('profesional_asignado_id', flat=True)
+        )
+    return ids
+
+
+def recalcular_ordenes(orden_ids, using=DEFAULT_DB_ALIAS):
+    """recalcular() de los profesionales de esas órdenes (ej: cambió un servicio)."""
+    recalcular(profesionales_de(orden_ids, using), using)
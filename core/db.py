@@ -0,0 +1,86 @@
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+"""
+Enrutamiento de lecturas a la réplica de solo lectura.
+
+Con el perfil de producción (settings.DB_PRODUCCION) existe el alias
+'replica': el mismo archivo SQLite abierto con mode=ro (o el indicado en
+DJANGO_DB_REPLICA). Con WAL las lecturas no bloquean a los escritores y
+ven lo último confirmado, sin demora de replicación.
+
+Las vistas de solo lectura (listados, detalles, exportación, API,
+dashboard) se envuelven con solo_lectura() en core/urls.py: mientras se
+ejecutan, LecturaRouter envía sus consultas a 'replica'. El resto de las
+vistas y toda escritura usan 'default'. Sin alias 'replica' el router no
+cambia nada.
+"""
+
+ALIAS_REPLICA = 'replica'
+
+_en_lectura = ContextVar('core_en_lectura', default=False)
+
+
+def uri_solo_lectura(nombre):
+    """URI SQLite de solo lectura del archivo `nombre`."""
+    return f'{Path(nombre).resolve().as_uri()}?mode=ro'
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+@contextmanager
+def lectura():
+    """Envía a la réplica las consultas de lectura ejecutadas dentro del bloque."""
+    token = _en_lectura.set(True)
+    try:
+        yield
+    finally:
+        _en_lectura.reset(token)
+
+
+def solo_lectura(vista):
+    """Decorador de vistas (sync o async) que solo leen la base de datos."""
+    if iscoroutinefunction(vista):
+        @functools.wraps(vista)
+        async def envuelta(request, *args, **kwargs):
+            with lectura():
+                return await vista(request, *args, **kwargs)
+    else:
+        @functools.wraps(vista)
+        def envuelta(request, *args, **kwargs):
+            with lectura():
+                return vista(request, *args, **kwargs)
+    return envuelta
+
+
+class LecturaRouter:
+    """settings.DATABASE_ROUTERS: lecturas de vistas solo_lectura() a 'replica'."""
+
+    def db_for_read(self, model, **hints):
+        if _en_lectura.get() and replica_configurada():
+            return ALIAS_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Un objeto leído de la réplica se guarda en 'default'.
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db == ALIAS_REPLICA:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, ALIAS_REPLICA}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == ALIAS_REPLICA else None
@@ -0,0 +1,187 @@
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache, cargas, estadisticas, jobs, search
+from .models import (
+    Empresa, Profesional, OrdenServicio, OrdenServicioArchivada, OrdenTransicion, OrdenTransicionArchivada,
+)
+
+"""
+Eliminación por lotes de empresas y profesionales con muchas órdenes.
+
+Eliminar una empresa borra en cascada todas sus órdenes (y sus servicios e
+historial), y eliminar un profesional deja sin asignar todas las suyas, en
+una sola transacción que bloquea SQLite mientras dura. Sobre
+settings.CORE_ELIMINACION_UMBRAL órdenes, solicitar() solo marca el padre
+con eliminacion_pendiente (desaparece de listados, autocompletado y
+asignación), encola el job 'procesar_eliminaciones' (core/jobs.py) y
+responde de inmediato.
+
+procesar() (el job, o manage.py procesar_eliminaciones) toma los padres
+marcados y trabaja por lotes de `batch_size` órdenes, cada uno en su propia
+transacción:
+  - empresa: DELETE directos del historial, los servicios y las órdenes
+    (activas y archivadas), con sus deltas de EstadisticaOrden, la carga
+    de los profesionales afectados y el índice de búsqueda;
+  - profesional: UPDATE profesional_asignado = NULL, reindexación de las
+    órdenes del lote y su carga.
+Sin dependientes, el padre se elimina con delete() (señales normales). Si el
+proceso se interrumpe, la marca queda y la siguiente pasada continúa.
+"""
+
+LOTE = 1000
+
+# Campo de las órdenes que apunta a cada padre.
+CAMPOS = {Empresa: 'empresa', Profesional: 'profesional_asignado'}
+# (órdenes, historial de estados), activas y archivadas.
+TABLAS_ORDENES = ((OrdenServicio, OrdenTransicion), (OrdenServicioArchivada, OrdenTransicionArchivada))
+
+
+@dataclass
+class ResultadoEliminacion:
+    empresas: int = 0
+    profesionales: int = 0
+    ordenes_eliminadas: int = 0
+    ordenes_desasignadas: int = 0
+    lotes: int = 0
+
+    def mensaje(self):
+        return (
+            f'{self.empresas} empresas y {self.profesionales} profesionales eliminados '
+            f'({self.ordenes_eliminadas} órdenes eliminadas, {self.ordenes_desasignadas} '
+            f'sin profesional) en {self.lotes} lotes.'
+        )
+
+
+def umbral():
+    return getattr(settings, 'CORE_ELIMINACION_UMBRAL', LOTE)
+
+
+def dependientes(obj, using=DEFAULT_DB_ALIAS):
+    """
+    {'activas': n, 'archivadas': m} (órdenes) de la empresa o profesional
+    `obj`, en una consulta (una subconsulta COUNT por tabla).
+    """
+    campo = CAMPOS[type(obj)]
+    conteos = {
+        nombre: Coalesce(Subquery(
+            modelo.objects.filter(**{campo: OuterRef('pk')}).order_by()
+            .values(campo).annotate(n=Count('id')).values('n'),
+            output_field=IntegerField(),
+        ), 0)
+        for nombre, modelo in (('activas', OrdenServicio), ('archivadas', OrdenServicioArchivada))
+    }
+    return type(obj)._default_manager.using(using).filter(pk=obj.pk).values(**conteos).get()
+
+
+def solicitar(obj, using=DEFAULT_DB_ALIAS):
+    """
+    Elimina `obj` (Empresa o Profesional) si tiene hasta umbral() órdenes;
+    si tiene más lo marca y encola procesar(). Retorna True si quedó eliminado.
+    """
+    if sum(dependientes(obj, using).values()) <= umbral():
+        obj.delete(using=using)
+        return True
+    ahora = timezone.now()
+    # update() y no save(): save() reindexaría ahora todas sus órdenes (señales).
+    type(obj)._default_manager.using(using).filter(pk=obj.pk).update(
+        eliminacion_pendiente=ahora, fecha_modificacion=ahora,
+    )
+    obj.eliminacion_pendiente = ahora
+    cache.invalidar(type(obj), using=using)
+    jobs.encolar('procesar_eliminaciones', unico=True, using=using)
+    return False
+
+
+def eliminar_lote_empresa(empresa_id, modelo, transiciones, batch_size=LOTE, using=DEFAULT_DB_ALIAS):
+    """Elimina hasta `batch_size` órdenes de `modelo` de la empresa. Retorna cuántas."""
+    connection = connections[using]
+    m2m = modelo.servicios_seleccionados.through._meta
+    columna_m2m = m2m.get_field(modelo._meta.model_name).column
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        ids = list(
+            modelo.objects.using(using).filter(empresa_id=empresa_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        lote = modelo.objects.using(using).filter(pk__in=ids)
+        deltas = estadisticas.conteos_por_clave(lote)
+        profesionales = set(
+            lote.filter(estado__in=cargas.ESTADOS_ABIERTOS).exclude(profesional_asignado=None)
+            .values_list('profesional_asignado_id', flat=True)
+        ) if modelo is OrdenServicio else set()
+        marcadores = ', '.join(['%s'] * len(ids))
+        search.remove_ids(modelo, ids, using)
+        cursor.execute(f'DELETE FROM {transiciones._meta.db_table} WHERE orden_id IN ({marcadores})', ids)
+        cursor.execute(f'DELETE FROM {m2m.db_table} WHERE {columna_m2m} IN ({marcadores})', ids)
+        cursor.execute(f'DELETE FROM {modelo._meta.db_table} WHERE id IN ({marcadores})', ids)
+        estadisticas.aplicar_deltas(Counter({clave: -n for clave, n in deltas.items()}), using)
+        cargas.recalcular(profesionales, using)
+    return len(ids)
+
+
+def desasignar_lote_profesional(profesional_id, modelo, batch_size=LOTE, using=DEFAULT_DB_ALIAS):
+    """Deja sin profesional hasta `batch_size` órdenes de `modelo`. Retorna cuántas."""
+    with transaction.atomic(using=using):
+        ids = list(
+            modelo.objects.using(using).filter(profesional_asignado_id=profesional_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        modelo.objects.using(using).filter(pk__in=ids).update(
+            profesional_asignado=None, fecha_modificacion=timezone.now(),
+        )
+        # El documento de búsqueda de la orden incluye el nombre del profesional.
+        search.refresh_ids(modelo, ids, using)
+        if modelo is OrdenServicio:
+            cargas.recalcular([profesional_id], using)
+    return len(ids)
+
+
+def eliminar(obj, batch_size=LOTE, using=DEFAULT_DB_ALIAS, resultado=None, progreso=None):
+    """Procesa por lotes las órdenes de `obj` y luego lo elimina."""
+    resultado = resultado or ResultadoEliminacion()
+    for modelo, transiciones in TABLAS_ORDENES:
+        while True:
+            if isinstance(obj, Empresa):
+                n = eliminar_lote_empresa(obj.pk, modelo, transiciones, batch_size, using)
+                resultado.ordenes_eliminadas += n
+            else:
+                n = desasignar_lote_profesional(obj.pk, modelo, batch_size, using)
+                resultado.ordenes_desasignadas += n
+            if not n:
+                break
+            resultado.lotes += 1
+            if progreso is not None:
+                progreso(resultado)
+        cache.invalidar(modelo, using=using)
+    obj.delete(using=using)
+    if isinstance(obj, Empresa):
+        resultado.empresas += 1
+    else:
+        resultado.profesionales += 1
+    return resultado
+
+
+def pendientes(using=DEFAULT_DB_ALIAS):
+    """Empresas y profesionales marcados, en orden de solicitud."""
+    for modelo in CAMPOS:
+        yield from (
+            modelo.objects.using(using).filter(eliminacion_pendiente__isnull=False).order_by('eliminacion_pendiente')
+        )
+
+
+def procesar(batch_size=LOTE, using=DEFAULT_DB_ALIAS, progreso=None):
+    """Elimina todos los padres marcados. `progreso(resultado)` se llama después de cada lote."""
+    resultado = ResultadoEliminacion()
+    for obj in list(pendientes(using)):
+        eliminar(obj, batch_size, using, resultado, progreso)
+    return resultado
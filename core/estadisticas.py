@@ -0,0 +1,122 @@
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import EstadisticaOrden, OrdenServicio, OrdenServicioArchivada
+
+"""
+Mantenimiento incremental de EstadisticaOrden (resumen por empresa, estado,
+prioridad y mes).
+
+Toda modificación de órdenes se traduce en deltas {(empresa_id, mes, estado,
+prioridad): +/-n} que se aplican con un solo INSERT ... ON CONFLICT DO UPDATE
+(executemany). Las señales cubren save()/delete(); las operaciones masivas
+(QuerySet.update(), bulk_create) deben pasar por core.transiciones o
+aplicar_deltas(). Archivar órdenes (core/archivo.py) no cambia el resumen:
+las archivadas siguen contando.
+"""
+
+TABLA = EstadisticaOrden._meta.db_table
+
+
+def mes_de(fecha):
+    """Primer día del mes de `fecha` en la zona horaria local."""
+    return timezone.localtime(fecha).date().replace(day=1)
+
+
+def clave(orden):
+    return (orden.empresa_id, mes_de(orden.fecha_creacion), orden.estado, orden.prioridad)
+
+
+def aplicar_deltas(deltas, using=DEFAULT_DB_ALIAS):
+    """
+    Suma los deltas {(empresa_id, mes, estado, prioridad): n} a la tabla de resumen.
+
+    Los positivos se insertan o suman (upsert); los negativos solo actualizan
+    filas existentes, para no recrear filas de una empresa que se está
+    eliminando en cascada.
+    """
+    connection = connections[using]
+    ops = connection.ops
+    positivos, negativos = [], []
+    for (empresa_id, mes, estado, prioridad), delta in deltas.items():
+        if delta > 0:
+            positivos.append((empresa_id, ops.adapt_datefield_value(mes), estado, prioridad, delta))
+        elif delta < 0:
+            negativos.append((delta, empresa_id, ops.adapt_datefield_value(mes), estado, prioridad))
+    with connection.cursor() as cursor:
+        if positivos:
+            cursor.executemany(
+                f'INSERT INTO {TABLA} (empresa_id, mes, estado, prioridad, cantidad) VALUES (%s, %s, %s, %s, %s) '
+                f'ON CONFLICT (empresa_id, mes, estado, prioridad) '
+                f'DO UPDATE SET cantidad = {TABLA}.cantidad + excluded.cantidad',
+                positivos,
+            )
+        if negativos:
+            cursor.executemany(
+                f'UPDATE {TABLA} SET cantidad = cantidad + %s '
+                f'WHERE empresa_id = %s AND mes = %s AND estado = %s AND prioridad = %s',
+                negativos,
+            )
+
+
+def conteos_por_clave(queryset):
+    """Counter {(empresa_id, mes, estado, prioridad): n} de un queryset de órdenes (una consulta GROUP BY)."""
+    filas = (
+        queryset.order_by()
+        .annotate(mes=TruncMonth('fecha_creacion', output_field=DateField()))
+        .values_list('empresa_id', 'mes', 'estado', 'prioridad')
+        .annotate(n=Count('id'))
+    )
+    return Counter({(empresa_id, mes, estado, prioridad): n for empresa_id, mes, estado, prioridad, n in filas})
+
+
+def registrar_creadas(ordenes):
+    """Suma al resumen órdenes insertadas con bulk_create (con fecha_creacion ya definitiva)."""
+    aplicar_deltas(Counter(clave(orden) for orden in ordenes))
+
+
+def reconstruir():
+    """Recalcula la tabla completa con un GROUP BY sobre OrdenServicio y las órdenes archivadas."""
+    with transaction.atomic():
+        EstadisticaOrden.objects.all().delete()
+        conteos = conteos_por_clave(OrdenServicio.objects.all())
+        conteos.update(conteos_por_clave(OrdenServicioArchivada.objects.all()))
+        aplicar_deltas(conteos)
+
+
+def resumen(queryset=None):
+    """
+    Totales desde la tabla de resumen: por estado, por prioridad y por mes.
+    `queryset` permite restringir (ej: a una empresa).
+    """
+    qs = (queryset if queryset is not None else EstadisticaOrden.objects.all()).filter(cantidad__gt=0)
+    por_estado = dict(qs.order_by().values_list('estado').annotate(total=Sum('cantidad')))
+    por_prioridad = dict(qs.order_by().values_list('prioridad').annotate(total=Sum('cantidad')))
+    return {
+        'total': sum(por_estado.values()),
+        'por_estado': [
+            (etiqueta, por_estado.get(valor, 0)) for valor, etiqueta in OrdenServicio.ESTADO_CHOICES
+        ],
+        'por_prioridad': [
+            (etiqueta, por_prioridad.get(valor, 0)) for valor, etiqueta in OrdenServicio.PRIORIDAD_CHOICES
+        ],
+    }
+
+
+def por_mes(queryset=None, meses=12):
+    """[(mes, total), ...] de los últimos `meses` meses con datos, del más reciente al más antiguo."""
+    qs = (queryset if queryset is not None else EstadisticaOrden.objects.all()).filter(cantidad__gt=0)
+    return list(qs.order_by('-mes').values_list('mes').annotate(total=Sum('cantidad'))[:meses])
+
+
+def top_empresas(cantidad=10):
+    return list(
+        EstadisticaOrden.objects.filter(cantidad__gt=0)
+        .values('empresa_id', 'empresa__razon_social')
+        .annotate(total=Sum('cantidad'))
+        .order_by('-total')[:cantidad]
+    )
@@ -0,0 +1,144 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import OrdenServicio
+
+"""
+Exportación en streaming de órdenes de servicio (CSV y NDJSON).
+
+Las filas se leen con values() + iterator(chunk_size) en lugar de instancias
+del modelo, y los servicios de cada bloque se cargan con una sola consulta
+sobre la tabla intermedia. La memoria usada depende del tamaño del bloque,
+no del total de órdenes. Las variantes a* (aiterator) las usa la exportación
+async (core.async_views). Los servicios se leen de la misma base que
+`queryset` (queryset.db).
+"""
+
+COLUMNAS = (
+    ('id', 'id'),
+    ('fecha_creacion', 'fecha_creacion'),
+    ('estado', 'estado'),
+    ('prioridad', 'prioridad'),
+    ('empresa_rut', 'empresa__rut'),
+    ('empresa_razon_social', 'empresa__razon_social'),
+    ('profesional_run', 'profesional_asignado__run'),
+    ('profesional_nombres', 'profesional_asignado__nombres'),
+    ('profesional_apellidos', 'profesional_asignado__apellidos'),
+    ('descripcion_requerimiento', 'descripcion_requerimiento'),
+)
+ENCABEZADOS = [nombre for nombre, _ in COLUMNAS] + ['servicios']
+SEPARADOR_SERVICIOS = '; '
+
+
+def _bloques(iterable, tamano):
+    iterador = iter(iterable)
+    while bloque := list(islice(iterador, tamano)):
+        yield bloque
+
+
+def consulta_servicios(ids, using=DEFAULT_DB_ALIAS):
+    through = OrdenServicio.servicios_seleccionados.through
+    return (
+        through.objects.using(using).filter(ordenservicio_id__in=ids)
+        .order_by('ordenservicio_id', 'servicio__nombre')
+        .values_list('ordenservicio_id', 'servicio__nombre')
+    )
+
+
+def agrupar_servicios(filas):
+    resultado = {}
+    for orden_id, nombre in filas:
+        resultado.setdefault(orden_id, []).append(nombre)
+    return resultado
+
+
+def servicios_por_orden(ids, using=DEFAULT_DB_ALIAS):
+    """{orden_id: [nombre, ...]} para un bloque de órdenes, en una consulta."""
+    return agrupar_servicios(consulta_servicios(ids, using))
+
+
+def valores_exportacion(queryset):
+    return queryset.order_by('-fecha_creacion', '-id').values(*[campo for _, campo in COLUMNAS])
+
+
+def fila_salida(fila, servicios):
+    salida = {nombre: fila[campo] for nombre, campo in COLUMNAS}
+    salida['fecha_creacion'] = timezone.localtime(salida['fecha_creacion']).isoformat()
+    salida['servicios'] = SEPARADOR_SERVICIOS.join(servicios.get(fila['id'], []))
+    return salida
+
+
+def filas_exportacion(queryset, chunk_size=2000):
+    """Genera un dict por orden (claves = ENCABEZADOS) leyendo en bloques de chunk_size."""
+    for bloque in _bloques(valores_exportacion(queryset).iterator(chunk_size=chunk_size), chunk_size):
+        servicios = servicios_por_orden([fila['id'] for fila in bloque], queryset.db)
+        for fila in bloque:
+            yield fila_salida(fila, servicios)
+
+
+async def afilas_exportacion(queryset, chunk_size=2000):
+    """Versión async de filas_exportacion (aiterator): no bloquea el event loop entre bloques."""
+    bloque = []
+    async for fila in valores_exportacion(queryset).aiterator(chunk_size=chunk_size):
+        bloque.append(fila)
+        if len(bloque) == chunk_size:
+            async for salida in _asalidas(bloque, queryset.db):
+                yield salida
+            bloque = []
+    async for salida in _asalidas(bloque, queryset.db):
+        yield salida
+
+
+async def _asalidas(bloque, using):
+    if not bloque:
+        return
+    servicios = agrupar_servicios([fila async for fila in consulta_servicios([fila['id'] for fila in bloque], using)])
+    for fila in bloque:
+        yield fila_salida(fila, servicios)
+
+
+class _Eco:
+    """Pseudo-buffer para csv.writer: retorna la línea en vez de escribirla."""
+
+    def write(self, valor):
+        return valor
+
+
+def encabezado_csv(writer):
+    return '\ufeff' + writer.writerow(ENCABEZADOS)  # BOM para que Excel detecte UTF-8
+
+
+def linea_csv(writer, fila):
+    return writer.writerow([fila[nombre] if fila[nombre] is not None else '' for nombre in ENCABEZADOS])
+
+
+def linea_ndjson(fila):
+    return json.dumps(fila, ensure_ascii=False) + '\n'
+
+
+def generar_csv(filas):
+    writer = csv.writer(_Eco())
+    yield encabezado_csv(writer)
+    for fila in filas:
+        yield linea_csv(writer, fila)
+
+
+def generar_ndjson(filas):
+    for fila in filas:
+        yield linea_ndjson(fila)
+
+
+async def agenerar_csv(filas):
+    writer = csv.writer(_Eco())
+    yield encabezado_csv(writer)
+    async for fila in filas:
+        yield linea_csv(writer, fila)
+
+
+async def agenerar_ndjson(filas):
+    async for fila in filas:
+        yield linea_ndjson(fila)
@@ -1,14 +1,63 @@
+import re
+
 from django import forms
+from django.urls import reverse
 from .models import Empresa, Servicio, Profesional, OrdenServicio
+from .transiciones import TRANSICIONES, es_valida
 
 """
 Formularios ModelForm para las operaciones CRUD.
 
 Los formularios heredan campos del modelo automáticamente.
 Django valida campos con unique=True, EmailField, y otros automáticamente.
+
+Las relaciones de OrdenServicioForm usan widgets de autocompletado: solo se
+renderizan las opciones seleccionadas y el resto se busca en
+/api/autocompletar/ (core.api) desde static/autocompletar.js.
 """
 
 
+class AutocompletarMixin:
+    """
+    Select que renderiza solo los valores seleccionados (una consulta por pk
+    en lugar de un <option> por fila de la tabla). `url_name` es la ruta de
+    autocompletado que usa autocompletar.js.
+    """
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    @property
+    def media(self):
+        return forms.Media(js=['autocompletar.js'])
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar-url'] = reverse(self.url_name)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        opciones = []
+        if not self.allow_multiple_selected:
+            opciones.append(self.create_option(name, '', '---------', not any(value), 0))
+        pks = [pk for pk in value if str(pk).isdigit()]
+        if pks:
+            field = self.choices.field
+            for indice, obj in enumerate(field.queryset.filter(pk__in=pks), start=len(opciones)):
+                opciones.append(self.create_option(name, obj.pk, field.label_from_instance(obj), True, indice))
+        return [(None, opciones, 0)]
+
+
+class AutocompletarSelect(AutocompletarMixin, forms.Select):
+    pass
+
+
+class AutocompletarSelectMultiple(AutocompletarMixin, forms.SelectMultiple):
+    pass
+
+
+
 class EmpresaForm(forms.ModelForm):
     """Formulario para crear/editar empresas."""
     class Meta:
@@ -38,3 +87,54 @@ class OrdenServicioForm(forms.ModelForm):
     class Meta:
         model = OrdenServicio
         fields = ['empresa', 'estado', 'prioridad', 'descripcion_requerimiento', 'servicios_seleccionados', 'profesional_asignado']
+        widgets = {
+            'empresa': AutocompletarSelect('autocompletar_empresa'),
+            'servicios_seleccionados': AutocompletarSelectMultiple('autocompletar_servicio'),
+            'profesional_asignado': AutocompletarSelect('autocompletar_profesional'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Empresas y profesionales que se están eliminando (core.eliminacion) no se pueden elegir.
+        for nombre in ('empresa', 'profesional_asignado'):
+            self.fields[nombre].queryset = self.fields[nombre].queryset.filter(eliminacion_pendiente=None)
+
+    def clean_estado(self):
+        """Al editar, el cambio de estado debe estar permitido en core.transiciones.TRANSICIONES."""
+        estado = self.cleaned_data['estado']
+        anterior = self.instance.estado if self.instance.pk else None
+        if anterior and estado != anterior and not es_valida(anterior, estado):
+            permitidos = ', '.join(sorted(TRANSICIONES[anterior])) or 'ninguno'
+            raise forms.ValidationError(
+                f'No se puede pasar de "{anterior}" a "{estado}" (permitidos: {permitidos}).'
+            )
+        return estado
+
+
+class ListaIdsWidget(forms.Textarea):
+    """Textarea que también acepta varios valores con el mismo nombre (checkboxes del listado)."""
+
+    def value_from_datadict(self, data, files, name):
+        if hasattr(data, 'getlist'):
+            return ' '.join(data.getlist(name))
+        return data.get(name)
+
+
+class TransicionMasivaForm(forms.Form):
+    """
+    Cambio de estado de muchas órdenes a la vez (ver core.transiciones).
+    ids: números de orden separados por coma, espacio o salto de línea.
+    """
+    ids = forms.CharField(
+        label='Órdenes', widget=ListaIdsWidget(attrs={'rows': 6}),
+        help_text='Números de orden separados por coma, espacio o salto de línea.',
+    )
+    estado = forms.ChoiceField(label='Nuevo estado', choices=OrdenServicio.ESTADO_CHOICES)
+
+    def clean_ids(self):
+        valores = [valor for valor in re.split(r'[\s,;]+', self.cleaned_data['ids']) if valor]
+        if not all(valor.isdigit() for valor in valores):
+            raise forms.ValidationError('Solo se aceptan números de orden.')
+        if not valores:
+            raise forms.ValidationError('Indique al menos una orden.')
+        return list(dict.fromkeys(int(valor) for valor in valores))
@@ -0,0 +1,302 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+from . import cache, cargas, estadisticas, search
+from .models import Empresa, Servicio, Profesional, OrdenServicio
+from .rut import normalizar_rut
+
+"""
+Importación masiva de empresas, servicios, profesionales y órdenes.
+
+Los archivos (CSV o NDJSON) se leen en streaming y se procesan por lotes:
+cada fila se valida con Model.full_clean() sin consultas (sin validación de
+unicidad ni de claves foráneas), las referencias (RUT, RUN, nombre de
+servicio) se resuelven con diccionarios cargados una sola vez, y las filas
+se escriben con bulk_create. Empresas, servicios y profesionales se
+insertan o actualizan (update_conflicts) según su clave única; el RUT/RUN
+se compara normalizado, con cualquier formato.
+
+El formato de órdenes es el mismo de la exportación (core/export.py):
+empresa_rut, profesional_run, servicios separados por ';'.
+"""
+
+VALORES_VERDADEROS = {'1', 't', 'true', 'si', 'sí', 'yes', 'y'}
+VALORES_FALSOS = {'0', 'f', 'false', 'no', 'n', ''}
+
+
+def leer_csv(ruta):
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        yield from csv.DictReader(archivo)
+
+
+def leer_ndjson(ruta):
+    with open(ruta, encoding='utf-8-sig') as archivo:
+        for linea in archivo:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def leer_filas(ruta, formato=None):
+    """Itera los registros del archivo como dicts. El formato se deduce de la extensión."""
+    formato = formato or ('ndjson' if ruta.endswith(('.ndjson', '.jsonl')) else 'csv')
+    return leer_ndjson(ruta) if formato == 'ndjson' else leer_csv(ruta)
+
+
+def lotes(filas, tamano, inicio=0):
+    """Agrupa (numero_fila, fila) en listas de `tamano`, omitiendo las primeras `inicio` filas."""
+    numeradas = islice(enumerate(filas, start=1), inicio, None)
+    while lote := list(islice(numeradas, tamano)):
+        yield lote
+
+
+def texto(fila, columna):
+    valor = fila.get(columna)
+    return '' if valor is None else str(valor).strip()
+
+
+def booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    normalizado = str(valor).strip().lower()
+    if normalizado in VALORES_VERDADEROS:
+        return True
+    if normalizado in VALORES_FALSOS:
+        return False
+    raise ValidationError({'activo': f'Valor booleano inválido: {valor!r}'})
+
+
+def asignar_fechas_creacion(pares):
+    """
+    Fija fecha_creacion de órdenes ya insertadas: pares = [(id, fecha), ...].
+
+    bulk_create no respeta valores en campos auto_now_add; se usa un
+    executemany (bulk_update genera un CASE por fila, mucho más lento).
+    """
+    if not pares:
+        return
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {OrdenServicio._meta.db_table} SET fecha_creacion = %s WHERE id = %s',
+            [(ops.adapt_datetimefield_value(fecha), pk) for pk, fecha in pares],
+        )
+
+
+class Importador:
+    """
+    Base de los importadores por entidad.
+
+    Subclases definen `model`, `columnas`, `clave` (campo único para
+    update_conflicts) y construir(fila) que retorna una instancia sin guardar.
+    `normalizada` es el campo con la clave normalizada (RUT/RUN), si existe.
+    """
+    model = None
+    columnas = ()
+    clave = None
+    normalizada = None
+    excluir_validacion = ()
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        # Clave guardada por valor normalizado: '76.000.001-9' y '760000019' actualizan la misma fila.
+        self.claves = dict(self.model.objects.values_list(self.normalizada, self.clave)) if self.normalizada else {}
+
+    def clave_existente(self, valor):
+        """Valor de la clave con que ya existe (o llegó antes en el archivo) el RUT/RUN `valor`."""
+        return self.claves.setdefault(normalizar_rut(valor), valor)
+
+    def construir(self, fila):
+        return self.model(**{columna: texto(fila, columna) for columna in self.columnas})
+
+    def validar(self, fila):
+        """Retorna la instancia validada o lanza ValidationError."""
+        instancia = self.construir(fila)
+        instancia.full_clean(exclude=self.excluir_validacion, validate_unique=False)
+        return instancia
+
+    def preparar(self, instancias):
+        """Deduplica por clave dentro del lote (la última fila gana)."""
+        return list({getattr(obj, self.clave): obj for obj in instancias}.values())
+
+    def guardar(self, instancias):
+        instancias = self.preparar(instancias)
+        if self.dry_run or not instancias:
+            return len(instancias)
+        campos = [campo for campo in self.campos_actualizables() if campo != self.clave]
+        self.model.objects.bulk_create(
+            instancias,
+            update_conflicts=True,
+            unique_fields=[self.clave],
+            update_fields=campos,
+        )
+        self.reindexar(instancias)
+        cache.invalidar(self.model, OrdenServicio)
+        return len(instancias)
+
+    def campos_actualizables(self):
+        """
+        Campos que reemplaza el upsert: solo los que trae el archivo. Los que
+        mantiene la aplicación (carga, eliminacion_pendiente) no se tocan.
+        """
+        return [*self.columnas, *([self.normalizada] if self.normalizada else [])]
+
+    def reindexar(self, instancias):
+        """bulk_create no envía señales: actualiza los índices de búsqueda del lote."""
+        valores = [getattr(obj, self.clave) for obj in instancias]
+        search.refresh_in(self.model, f't.{self.clave} IN ({{placeholders}})', valores)
+
+
+class ImportadorEmpresas(Importador):
+    model = Empresa
+    columnas = ('rut', 'razon_social', 'giro', 'telefono', 'email', 'direccion', 'comuna')
+    clave = 'rut'
+    normalizada = 'rut_normalizado'
+
+    def construir(self, fila):
+        empresa = super().construir(fila)
+        empresa.rut = self.clave_existente(empresa.rut)
+        empresa.rut_normalizado = normalizar_rut(empresa.rut)
+        return empresa
+
+    def reindexar(self, instancias):
+        super().reindexar(instancias)
+        search.refresh_in(
+            OrdenServicio,
+            't.empresa_id IN (SELECT id FROM core_empresa WHERE rut IN ({placeholders}))',
+            [obj.rut for obj in instancias],
+        )
+
+
+class ImportadorServicios(Importador):
+    model = Servicio
+    columnas = ('nombre', 'descripcion', 'categoria', 'duracion_estimada_horas', 'activo')
+    clave = 'nombre'
+
+    def construir(self, fila):
+        servicio = super().construir(fila)
+        servicio.duracion_estimada_horas = servicio.duracion_estimada_horas or 0
+        servicio.activo = booleano(fila.get('activo', True))
+        return servicio
+
+
+class ImportadorProfesionales(Importador):
+    model = Profesional
+    columnas = ('run', 'nombres', 'apellidos', 'especialidad', 'email')
+    clave = 'run'
+    normalizada = 'run_normalizado'
+
+    def construir(self, fila):
+        profesional = super().construir(fila)
+        profesional.run = self.clave_existente(profesional.run)
+        profesional.run_normalizado = normalizar_rut(profesional.run)
+        return profesional
+
+    def reindexar(self, instancias):
+        super().reindexar(instancias)
+        search.refresh_in(
+            OrdenServicio,
+            't.profesional_asignado_id IN (SELECT id FROM core_profesional WHERE run IN ({placeholders}))',
+            [obj.run for obj in instancias],
+        )
+
+
+class ImportadorOrdenes(Importador):
+    """
+    Órdenes: no tienen clave natural, siempre se insertan. Las referencias se
+    resuelven con mapas cargados con una consulta por modelo al iniciar.
+    """
+    model = OrdenServicio
+    excluir_validacion = ('empresa', 'profesional_asignado', 'servicios_seleccionados')
+    separador_servicios = ';'
+
+    def __init__(self, dry_run=False):
+        super().__init__(dry_run)
+        self.empresas = dict(Empresa.objects.values_list('rut_normalizado', 'id'))
+        self.profesionales = dict(Profesional.objects.values_list('run_normalizado', 'id'))
+        self.servicios = dict(Servicio.objects.values_list('nombre', 'id'))
+
+    def construir(self, fila):
+        errores = {}
+        empresa_id = self.empresas.get(normalizar_rut(texto(fila, 'empresa_rut')))
+        if empresa_id is None:
+            errores['empresa'] = f"Empresa con RUT {texto(fila, 'empresa_rut')!r} no existe."
+
+        profesional_id = None
+        run = texto(fila, 'profesional_run')
+        if run:
+            profesional_id = self.profesionales.get(normalizar_rut(run))
+            if profesional_id is None:
+                errores['profesional_asignado'] = f'Profesional con RUN {run!r} no existe.'
+
+        servicio_ids = []
+        for nombre in texto(fila, 'servicios').split(self.separador_servicios):
+            nombre = nombre.strip()
+            if not nombre:
+                continue
+            if nombre not in self.servicios:
+                errores['servicios_seleccionados'] = f'Servicio {nombre!r} no existe.'
+            else:
+                servicio_ids.append(self.servicios[nombre])
+
+        fecha = None
+        if texto(fila, 'fecha_creacion'):
+            fecha = parse_datetime(texto(fila, 'fecha_creacion'))
+            if fecha is None:
+                errores['fecha_creacion'] = 'Fecha inválida (use ISO 8601).'
+        if errores:
+            raise ValidationError(errores)
+
+        orden = OrdenServicio(
+            empresa_id=empresa_id,
+            profesional_asignado_id=profesional_id,
+            estado=texto(fila, 'estado') or 'nueva',
+            prioridad=texto(fila, 'prioridad') or 'media',
+            descripcion_requerimiento=texto(fila, 'descripcion_requerimiento'),
+        )
+        orden._servicio_ids = servicio_ids
+        orden._fecha_importada = fecha
+        return orden
+
+    def preparar(self, instancias):
+        return instancias
+
+    def guardar(self, instancias):
+        if self.dry_run or not instancias:
+            return len(instancias)
+        # En SQLite >= 3.35 bulk_create retorna los ids (RETURNING).
+        OrdenServicio.objects.bulk_create(instancias)
+
+        # auto_now_add reemplaza fecha_creacion al insertar: se restaura la importada.
+        asignar_fechas_creacion([(obj.pk, obj._fecha_importada) for obj in instancias if obj._fecha_importada])
+        for obj in instancias:
+            obj.fecha_creacion = obj._fecha_importada or obj.fecha_creacion
+
+        through = OrdenServicio.servicios_seleccionados.through
+        through.objects.bulk_create(
+            [
+                through(ordenservicio_id=obj.pk, servicio_id=servicio_id)
+                for obj in instancias
+                for servicio_id in obj._servicio_ids
+            ],
+            ignore_conflicts=True,
+        )
+        search.refresh_ids(OrdenServicio, [obj.pk for obj in instancias])
+        estadisticas.registrar_creadas(instancias)
+        cargas.recalcular({
+            obj.profesional_asignado_id for obj in instancias if obj.estado in cargas.ESTADOS_ABIERTOS
+        })
+        cache.invalidar(OrdenServicio)
+        return len(instancias)
+
+
+IMPORTADORES = {
+    'empresas': ImportadorEmpresas,
+    'servicios': ImportadorServicios,
+    'profesionales': ImportadorProfesionales,
+    'ordenes': ImportadorOrdenes,
+}
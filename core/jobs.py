@@ -0,0 +1,269 @@
+"""
+Cola de trabajos en segundo plano sobre la base de datos (sin broker).
+
+Las tareas se registran con @tarea('nombre') (core/tareas.py) y reciben un
+Contexto más los parámetros del Job:
+
+    @tarea('archivar_ordenes')
+    def archivar_ordenes(ctx, dias=None):
+        ...
+        ctx.avanzar(50, 'lote 3')
+        return {'ordenes': n}          # se guarda en Job.resultado (JSON)
+
+encolar('archivar_ordenes', {'dias': 180}) crea el Job; `manage.py
+run_worker` los ejecuta en un pool de hilos (o procesos con --procesos).
+
+Tomar un job es un UPDATE condicionado (estado = 'pendiente'): si dos
+workers eligen el mismo, solo uno actualiza la fila, en SQLite o en
+cualquier otra base. Job.intentos identifica el intento en curso: todas las
+escrituras posteriores (avance, latido, resultado) filtran por él, así que
+un intento que se dio por perdido no puede pisar a uno posterior.
+
+  - Reintentos: una excepción vuelve el job a 'pendiente' con una espera
+    exponencial (ESPERA_BASE * 2^(intentos-1)) hasta max_intentos, y luego
+    queda 'fallido' con el traceback en Job.error.
+  - Timeouts: pasado Job.timeout el worker da el intento por fallido. Un
+    hilo no se puede interrumpir: la tarea se detiene en su siguiente
+    ctx.avanzar() (TiempoAgotado / JobPerdido).
+  - Latidos: cada worker actualiza Job.latido de sus jobs cada LATIDO
+    segundos; los jobs en proceso sin latido por LATIDO_MAXIMO (worker
+    caído) se tratan como un intento fallido.
+"""
+
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import timedelta
+
+import django
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+LATIDO = 10
+LATIDO_MAXIMO = 60
+ESPERA_BASE = 30
+# Mínimo de segundos entre escrituras de ctx.avanzar() (el último avance se guarda al terminar).
+AVANCE_MINIMO = 0.5
+
+TAREAS = {}
+
+
+class JobPerdido(Exception):
+    """El intento ya no pertenece a este worker (tiempo agotado o abandonado)."""
+
+
+class TiempoAgotado(Exception):
+    """El intento superó Job.timeout."""
+
+
+@dataclass
+class Tarea:
+    nombre: str
+    funcion: object
+    max_intentos: int = 3
+    timeout: int = 3600
+
+
+def tarea(nombre, max_intentos=3, timeout=3600):
+    """Registra la función decorada como tarea `nombre`."""
+    def registrar(funcion):
+        TAREAS[nombre] = Tarea(nombre, funcion, max_intentos, timeout)
+        return funcion
+    return registrar
+
+
+def encolar(tipo, parametros=None, usuario=None, unico=False, using=DEFAULT_DB_ALIAS):
+    """
+    Crea un Job pendiente de la tarea `tipo`. Con `unico`, si ya hay uno
+    pendiente con los mismos parámetros lo retorna en lugar de crear otro.
+    Lanza ValueError si la tarea no existe.
+    """
+    if tipo not in TAREAS:
+        raise ValueError(f'Tarea desconocida: {tipo}')
+    parametros = parametros or {}
+    if unico:
+        for job in Job.objects.using(using).filter(tipo=tipo, estado=Job.PENDIENTE):
+            if job.parametros == parametros:
+                return job
+    definicion = TAREAS[tipo]
+    return Job.objects.using(using).create(
+        tipo=tipo, parametros=parametros, usuario=usuario,
+        max_intentos=definicion.max_intentos, timeout=definicion.timeout,
+    )
+
+
+def del_intento(job_id, intentos, using=DEFAULT_DB_ALIAS):
+    """Filas del intento `intentos` del job, mientras siga en proceso."""
+    return Job.objects.using(using).filter(pk=job_id, estado=Job.EN_PROCESO, intentos=intentos)
+
+
+def reclamar(worker, using=DEFAULT_DB_ALIAS):
+    """Toma el próximo job disponible para `worker` y lo retorna (o None)."""
+    while True:
+        ahora = timezone.now()
+        candidato = (
+            Job.objects.using(using).filter(estado=Job.PENDIENTE, disponible_desde__lte=ahora)
+            .order_by('disponible_desde', 'id').values_list('id', flat=True).first()
+        )
+        if candidato is None:
+            return None
+        tomado = Job.objects.using(using).filter(pk=candidato, estado=Job.PENDIENTE).update(
+            estado=Job.EN_PROCESO, worker=worker, intentos=F('intentos') + 1,
+            fecha_inicio=ahora, latido=ahora, fecha_fin=None, progreso=0, mensaje='',
+        )
+        if tomado:
+            return Job.objects.using(using).get(pk=candidato)
+        # Otro worker lo tomó entre la lectura y el UPDATE: se prueba con el siguiente.
+
+
+def completar(job_id, intentos, resultado, using=DEFAULT_DB_ALIAS):
+    ahora = timezone.now()
+    return del_intento(job_id, intentos, using).update(
+        estado=Job.COMPLETADO, resultado=resultado, error='', progreso=100, fecha_fin=ahora, latido=ahora,
+    )
+
+
+def fallar(job_id, intentos, error, using=DEFAULT_DB_ALIAS):
+    """
+    Registra el fallo del intento: vuelve a 'pendiente' con espera si quedan
+    intentos, si no queda 'fallido'. Retorna el estado nuevo (o None si el
+    intento ya no estaba en proceso).
+    """
+    ahora = timezone.now()
+    filas = del_intento(job_id, intentos, using)
+    espera = timedelta(seconds=ESPERA_BASE * 2 ** max(intentos - 1, 0))
+    if filas.filter(intentos__lt=F('max_intentos')).update(
+        estado=Job.PENDIENTE, error=error, worker='', disponible_desde=ahora + espera,
+    ):
+        return Job.PENDIENTE
+    if filas.update(estado=Job.FALLIDO, error=error, fecha_fin=ahora):
+        return Job.FALLIDO
+    return None
+
+
+def recuperar_abandonados(using=DEFAULT_DB_ALIAS):
+    """Da por fallido el intento de los jobs en proceso sin latido reciente. Retorna cuántos."""
+    limite = timezone.now() - timedelta(seconds=LATIDO_MAXIMO)
+    abandonados = Job.objects.using(using).filter(estado=Job.EN_PROCESO, latido__lt=limite)
+    return sum(
+        fallar(pk, intentos, f'Sin latido del worker {worker} desde {latido:%Y-%m-%d %H:%M:%S}.', using) is not None
+        for pk, intentos, worker, latido in abandonados.values_list('id', 'intentos', 'worker', 'latido')
+    )
+
+
+class Contexto:
+    """Lo que recibe la tarea: el Job, la base y ctx.avanzar()."""
+
+    def __init__(self, job, using=DEFAULT_DB_ALIAS):
+        self.job = job
+        self.using = using
+        self.limite = job.fecha_inicio + timedelta(seconds=job.timeout)
+        self._ultimo = None
+
+    def avanzar(self, progreso=None, mensaje=None):
+        """
+        Guarda el avance (0-100) y/o un mensaje. Lanza TiempoAgotado si el
+        intento superó su timeout y JobPerdido si el worker lo dio por perdido.
+        """
+        ahora = timezone.now()
+        if ahora > self.limite:
+            raise TiempoAgotado(f'Se superó el timeout de {self.job.timeout} s.')
+        if self._ultimo is not None and (ahora - self._ultimo).total_seconds() < AVANCE_MINIMO:
+            return
+        cambios = {'latido': ahora}
+        if progreso is not None:
+            cambios['progreso'] = max(0, min(100, int(progreso)))
+        if mensaje is not None:
+            cambios['mensaje'] = str(mensaje)[:255]
+        if not del_intento(self.job.pk, self.job.intentos, self.using).update(**cambios):
+            raise JobPerdido(f'{self.job} ya no pertenece a este intento.')
+        self._ultimo = ahora
+
+
+def ejecutar(job_id, using=DEFAULT_DB_ALIAS):
+    """Ejecuta el intento en curso del job (en un hilo o proceso del pool)."""
+    try:
+        job = Job.objects.using(using).get(pk=job_id)
+        try:
+            definicion = TAREAS.get(job.tipo)
+            if definicion is None:
+                raise ValueError(f'Tarea desconocida: {job.tipo}')
+            resultado = definicion.funcion(Contexto(job, using), **job.parametros)
+            # Dentro del try: un resultado que no se puede guardar como JSON también es un fallo.
+            completar(job.pk, job.intentos, resultado, using)
+        except JobPerdido:
+            return
+        except Exception:
+            logger.exception('Falló %s (intento %s)', job, job.intentos)
+            fallar(job.pk, job.intentos, traceback.format_exc(), using)
+    finally:
+        # Las conexiones son por hilo: se cierran antes de devolver el hilo al pool.
+        connections.close_all()
+
+
+def nombre_worker():
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def trabajar(concurrencia=4, procesos=False, intervalo=1.0, una_vez=False, detener=None, using=DEFAULT_DB_ALIAS):
+    """
+    Bucle del worker: mantiene hasta `concurrencia` jobs en ejecución,
+    envía los latidos, aplica los timeouts y recupera los jobs abandonados.
+    Con `una_vez` termina cuando no quedan jobs disponibles ni en curso;
+    si no, hasta que se active el Event `detener` (espera a los jobs en curso).
+    """
+    detener = detener or threading.Event()
+    worker = nombre_worker()
+    if procesos:
+        # 'spawn': los procesos no heredan la conexión abierta del bucle.
+        pool = ProcessPoolExecutor(concurrencia, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup)
+    else:
+        pool = ThreadPoolExecutor(concurrencia, thread_name_prefix='job')
+    en_curso = {}  # futuro: (job_id, intentos, limite)
+    vencidos = set()
+    proximo_latido = timezone.now()
+    with pool:
+        while not detener.is_set():
+            for futuro in [futuro for futuro in en_curso if futuro.done()]:
+                if futuro.exception() is not None:
+                    logger.error('Error del worker en %s', en_curso[futuro], exc_info=futuro.exception())
+                vencidos.discard(futuro)
+                del en_curso[futuro]
+
+            ahora = timezone.now()
+            if ahora >= proximo_latido:
+                vivos = [job_id for futuro, (job_id, _, _) in en_curso.items() if futuro not in vencidos]
+                Job.objects.using(using).filter(pk__in=vivos, estado=Job.EN_PROCESO).update(latido=ahora)
+                recuperar_abandonados(using)
+                proximo_latido = ahora + timedelta(seconds=LATIDO)
+            for futuro, (job_id, intentos, limite) in en_curso.items():
+                if futuro not in vencidos and ahora > limite:
+                    # El hilo sigue ocupando su lugar hasta que la tarea se detenga.
+                    fallar(job_id, intentos, 'Se superó el timeout del intento.', using)
+                    vencidos.add(futuro)
+
+            tomados = 0
+            while len(en_curso) < concurrencia:
+                job = reclamar(worker, using)
+                if job is None:
+                    break
+                limite = job.fecha_inicio + timedelta(seconds=job.timeout)
+                en_curso[pool.submit(ejecutar, job.pk, using)] = (job.pk, job.intentos, limite)
+                tomados += 1
+
+            if una_vez and not en_curso:
+                break
+            if en_curso:
+                wait(en_curso, timeout=intervalo, return_when=FIRST_COMPLETED)
+            elif not tomados:
+                detener.wait(intervalo)
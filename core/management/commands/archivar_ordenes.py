@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import archivo
+
+"""
+Mueve las órdenes cerradas antiguas a las tablas archivadas (core/archivo.py).
+
+Uso:
+    python manage.py archivar_ordenes
+    python manage.py archivar_ordenes --dias 180 --lote 2000
+    python manage.py archivar_ordenes --dry-run
+"""
+
+
+class Command(BaseCommand):
+    help = 'Archiva las órdenes finalizadas o canceladas sin cambios desde hace más de --dias días.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Antigüedad mínima (por defecto settings.CORE_ARCHIVO_DIAS).')
+        parser.add_argument('--lote', type=int, default=archivo.LOTE, help='Órdenes por transacción.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa cuántas órdenes se archivarían.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            cantidad = archivo.archivables(options['dias']).count()
+            self.stdout.write(f'{cantidad} órdenes para archivar. Dry run: no se guardaron cambios.')
+            return
+        t0 = time.perf_counter()
+
+        def progreso(resultado):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  lote {resultado.lotes}: {resultado.ordenes} órdenes')
+
+        resultado = archivo.archivar(options['dias'], options['lote'], progreso=progreso)
+        segundos = time.perf_counter() - t0
+        por_segundo = resultado.ordenes / segundos if segundos else 0
+        self.stdout.write(self.style.SUCCESS(f'{resultado.mensaje()} ({segundos:.2f}s, {por_segundo:.0f} órdenes/s)'))
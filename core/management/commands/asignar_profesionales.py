@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import asignacion
+
+"""
+Asigna profesionales a las órdenes nuevas sin asignar (core/asignacion.py):
+por especialidad = categoría de los servicios, al menos cargado en horas
+pendientes, atendiendo primero prioridad alta y órdenes más antiguas.
+
+Uso:
+    python manage.py asignar_profesionales
+    python manage.py asignar_profesionales --capacidad 160 --dry-run
+"""
+
+
+class Command(BaseCommand):
+    help = 'Asigna automáticamente profesionales a las órdenes nuevas según especialidad y carga.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacidad', type=int, help='Máximo de horas pendientes por profesional.')
+        parser.add_argument('--dry-run', action='store_true', help='Calcula la asignación sin guardarla.')
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        resultado = asignacion.asignar(capacidad=options['capacidad'], guardar=not options['dry_run'])
+        segundos = time.perf_counter() - t0
+        self.stdout.write(f'{resultado.mensaje()} ({segundos:.2f}s)')
+        if resultado.cargas:
+            cargas = sorted(resultado.cargas.values())
+            self.stdout.write(
+                f'Horas pendientes por profesional: mín {cargas[0]}, '
+                f'mediana {cargas[len(cargas) // 2]}, máx {cargas[-1]}'
+            )
+        if options['dry_run']:
+            self.stdout.write('Dry run: no se guardaron cambios.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{resultado.actualizadas} órdenes actualizadas.'))
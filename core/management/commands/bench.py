@@ -0,0 +1,186 @@
+import json
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from core import bench, db
+from core.models import Empresa, Servicio, Profesional, OrdenServicio
+
+"""
+Benchmark de las vistas y querysets de core.
+
+Uso:
+    python manage.py bench --orders 50000 --salida bench.json
+    python manage.py bench --comparar bench.json --umbral 20
+    python manage.py bench --keepdb --filtro orden_list
+    python manage.py bench --keepdb --plantillas --orders 10000
+    python manage.py bench --keepdb --transiciones --orders 50000
+    DJANGO_DB_PRODUCCION=1 python manage.py bench --keepdb --concurrencia --lectores 8 --escritores 2
+    python manage.py bench --keepdb --sin-metricas --salida base.json && python manage.py bench --keepdb --comparar base.json --umbral 3
+
+Por defecto crea una base de datos de prueba (bench_<NAME>), la llena con
+`manage.py seed` y la elimina al terminar; --keepdb la conserva para la
+siguiente ejecución (no se regenera si ya tiene las órdenes pedidas).
+--bd-actual mide sobre la base de datos configurada sin modificarla
+(salvo el escenario 'orden_create POST').
+
+Con --comparar falla si algún escenario es más de --umbral % más lento
+(según --metrica) que en el archivo base.
+
+--plantillas mide solo el renderizado de la tabla de órdenes (1k y 10k
+filas) con y sin {% filas %} y la caché de filas.
+
+--transiciones mide el cambio de estado masivo (core.transiciones) de 1k y
+10k órdenes, en órdenes por segundo.
+
+--sin-metricas quita MetricasMiddleware (core/metricas.py) de MIDDLEWARE:
+comparar con una ejecución normal mide el costo de las métricas.
+
+--concurrencia mide lecturas y escrituras simultáneas durante --duracion
+segundos (operaciones/s, p50/p95 y errores como "database is locked").
+Comparar con y sin DJANGO_DB_PRODUCCION=1 (perfil WAL + réplica de solo
+lectura, core/db.py).
+"""
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia (p50/p95/p99), consultas y tiempo SQL de las vistas de core.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--empresas', type=int, default=200)
+        parser.add_argument('--profesionales', type=int, default=50)
+        parser.add_argument('--iteraciones', type=int, default=30)
+        parser.add_argument('--filtro', help='Solo escenarios cuyo nombre contiene este texto.')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados.')
+        parser.add_argument('--comparar', help='Archivo JSON base para detectar regresiones.')
+        parser.add_argument('--umbral', type=float, default=20.0, help='Porcentaje máximo de empeoramiento.')
+        parser.add_argument('--metrica', default='p50_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'media_ms', 'sql_ms'])
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--bd-actual', action='store_true', help='Usa la base de datos configurada.')
+        parser.add_argument('--plantillas', action='store_true', help='Mide el renderizado de tablas de 1k/10k filas.')
+        parser.add_argument('--transiciones', action='store_true', help='Mide el cambio de estado masivo de 1k/10k órdenes.')
+        parser.add_argument('--concurrencia', action='store_true', help='Mide lecturas y escrituras simultáneas.')
+        parser.add_argument('--lectores', type=int, default=8)
+        parser.add_argument('--escritores', type=int, default=2)
+        parser.add_argument('--duracion', type=float, default=5.0, help='Segundos de --concurrencia.')
+        parser.add_argument('--sin-metricas', action='store_true', help='Mide sin MetricasMiddleware.')
+
+    def handle(self, *args, **options):
+        nombre_original = None
+        if not options['bd_actual']:
+            nombre_original = self.crear_bd(options)
+        try:
+            if options['plantillas']:
+                self.imprimir_plantillas(bench.bench_plantillas(iteraciones=max(3, options['iteraciones'] // 6)))
+                return
+            if options['transiciones']:
+                self.imprimir_transiciones(bench.bench_transiciones())
+                return
+            if options['concurrencia']:
+                self.imprimir_concurrencia(bench.bench_concurrencia(
+                    options['lectores'], options['escritores'], options['duracion'],
+                ))
+                return
+            middleware = settings.MIDDLEWARE
+            if options['sin_metricas']:
+                middleware = [nombre for nombre in middleware if nombre != 'core.middleware.MetricasMiddleware']
+            with override_settings(ALLOWED_HOSTS=['testserver'], MIDDLEWARE=middleware):
+                escenarios = bench.construir_escenarios()
+                t0 = time.perf_counter()
+                resultados = bench.ejecutar(escenarios, options['iteraciones'], filtro=options['filtro'])
+                duracion = time.perf_counter() - t0
+            datos = {
+                'meta': self.metadatos(options, duracion),
+                'escenarios': resultados,
+            }
+        finally:
+            if nombre_original is not None:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0, keepdb=options['keepdb'])
+
+        self.imprimir(resultados)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(datos, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Resultados guardados en {options["salida"]}')
+        if options['comparar']:
+            self.comparar(resultados, options)
+
+    def crear_bd(self, options):
+        """Crea (o reutiliza con --keepdb) la base de benchmark y la llena con seed."""
+        nombre_original = connection.settings_dict['NAME']
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            test_settings['NAME'] = str(settings.BASE_DIR / 'bench.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        if db.replica_configurada():
+            # La réplica de solo lectura apunta al mismo archivo que 'default'.
+            connections[db.ALIAS_REPLICA].close()
+            connections[db.ALIAS_REPLICA].settings_dict['NAME'] = db.uri_solo_lectura(connection.settings_dict['NAME'])
+        if OrdenServicio.objects.count() < options['orders']:
+            self.stdout.write(f'Generando datos ({options["orders"]} órdenes)...')
+            call_command(
+                'seed', limpiar=True, orders=options['orders'], empresas=options['empresas'],
+                profesionales=options['profesionales'], verbosity=0,
+            )
+        return nombre_original
+
+    def metadatos(self, options, duracion):
+        return {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'motor': connection.vendor,
+            'iteraciones': options['iteraciones'],
+            'metricas': not options['sin_metricas'],
+            'duracion_s': round(duracion, 2),
+            'datos': {
+                'empresas': Empresa.objects.count(),
+                'servicios': Servicio.objects.count(),
+                'profesionales': Profesional.objects.count(),
+                'ordenes': OrdenServicio.objects.count(),
+            },
+        }
+
+    def imprimir(self, resultados):
+        self.stdout.write(f'{"escenario":<32} {"p50":>9} {"p95":>9} {"p99":>9} {"consultas":>9} {"sql":>9}')
+        for nombre, r in resultados.items():
+            self.stdout.write(
+                f'{nombre:<32} {r["p50_ms"]:>7.2f}ms {r["p95_ms"]:>7.2f}ms {r["p99_ms"]:>7.2f}ms '
+                f'{r["consultas"]:>9} {r["sql_ms"]:>7.2f}ms'
+            )
+
+    def imprimir_plantillas(self, resultados):
+        self.stdout.write(f'{"renderizado":<32} {"p50":>10} {"media":>10}')
+        for nombre, r in resultados.items():
+            self.stdout.write(f'{nombre:<32} {r["p50_ms"]:>8.1f}ms {r["media_ms"]:>8.1f}ms')
+
+    def imprimir_transiciones(self, resultados):
+        self.stdout.write(f'{"transición masiva":<32} {"p50":>10} {"órdenes/s":>10} {"aplicadas":>10}')
+        for nombre, r in resultados.items():
+            self.stdout.write(f'{nombre:<32} {r["p50_ms"]:>8.1f}ms {r["ordenes_por_s"]:>10} {r["aplicadas"]:>10}')
+
+    def imprimir_concurrencia(self, resultados):
+        self.stdout.write(f'{"operación":<12} {"hilos":>6} {"ops/s":>9} {"p50":>10} {"p95":>10}  errores')
+        for tipo, r in resultados.items():
+            p50 = f'{r["p50_ms"]:.1f}ms' if r['p50_ms'] is not None else '-'
+            p95 = f'{r["p95_ms"]:.1f}ms' if r['p95_ms'] is not None else '-'
+            self.stdout.write(f'{tipo:<12} {r["hilos"]:>6} {r["ops_por_s"]:>9} {p50:>10} {p95:>10}  {r["errores"] or "-"}')
+
+    def comparar(self, resultados, options):
+        with open(options['comparar'], encoding='utf-8') as archivo:
+            base = json.load(archivo)['escenarios']
+        regresiones = bench.comparar(resultados, base, options['umbral'], options['metrica'])
+        for nombre, anterior, actual, variacion in regresiones:
+            self.stdout.write(self.style.ERROR(
+                f'REGRESIÓN {nombre}: {anterior:.2f} -> {actual:.2f} ({variacion:+.1f}%)'
+            ))
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} escenario(s) más de {options["umbral"]}% más lentos.')
+        self.stdout.write(self.style.SUCCESS(f'Sin regresiones sobre {options["comparar"]} ({options["metrica"]}).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core import cache
+
+"""
+Muestra los aciertos y fallos acumulados de la caché de vistas (core/cache.py).
+
+Uso:
+    python manage.py cache_stats
+    python manage.py cache_stats --reiniciar
+
+Con LocMemCache los contadores son del proceso actual; para medir un
+servidor en ejecución use FileBasedCache (CACHE_DIR) u otro backend compartido.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Aciertos y fallos de la caché de vistas de core.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reiniciar', action='store_true', help='Pone los contadores en cero.')
+
+    def handle(self, *args, **options):
+        datos = cache.estadisticas()
+        self.stdout.write(f"aciertos: {datos['aciertos']}  fallos: {datos['fallos']}  tasa: {datos['tasa']:.1%}")
+        if options['reiniciar']:
+            cache.reiniciar_estadisticas()
+            self.stdout.write('Contadores reiniciados.')
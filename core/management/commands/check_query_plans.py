@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.planes import SCENARIOS, explain
+
+"""
+Verifica con EXPLAIN QUERY PLAN que las consultas principales de las ListViews
+usan índices y no recorren la tabla completa (core/planes.py; los mismos
+escenarios se verifican en core/tests.py).
+
+Uso:
+    python manage.py check_query_plans
+    python manage.py check_query_plans --verbose   (muestra cada plan)
+
+Termina con error si algún escenario recorre una tabla o un índice completo
+('SCAN <tabla>', también con 'USING INDEX'), salvo el listado sin filtros en el
+orden de la paginación.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN QUERY PLAN sobre las consultas de las ListViews y falla ante escaneos completos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help='Muestra el plan de cada escenario.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans solo interpreta planes de SQLite.')
+
+        failures = []
+        for name, view_class, params, with_cursor in SCENARIOS:
+            plan, scans = explain(view_class, params, with_cursor)
+            if options['verbose']:
+                self.stdout.write(f'-- {name}\n{plan}\n')
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FALLA  {name}: escaneo completo de {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'OK     {name}'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} escenario(s) con escaneo completo de tabla.')
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.importer import IMPORTADORES, leer_filas, lotes
+
+"""
+Importación masiva desde CSV o NDJSON.
+
+Uso:
+    python manage.py import_data empresas empresas.csv
+    python manage.py import_data ordenes ordenes.ndjson --batch-size 5000
+    python manage.py import_data ordenes ordenes.csv --dry-run
+    python manage.py import_data ordenes ordenes.csv --resume
+
+Cada lote se escribe en su propia transacción. Después de cada lote
+confirmado se guarda un checkpoint (<archivo>.checkpoint) con el número de
+filas procesadas; --resume continúa desde ahí tras una interrupción. Con
+--dry-run se valida y resuelven referencias sin escribir nada.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Importa empresas, servicios, profesionales u órdenes desde CSV/NDJSON en lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entidad', choices=sorted(IMPORTADORES))
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=['csv', 'ndjson'], help='Por defecto se deduce de la extensión.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help='Valida sin escribir en la base de datos.')
+        parser.add_argument('--resume', action='store_true', help='Continúa desde el último checkpoint.')
+        parser.add_argument('--max-errores', type=int, default=100, help='Aborta al superar este número de filas inválidas.')
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe el archivo {ruta}.')
+        checkpoint = f'{ruta}.checkpoint'
+        dry_run = options['dry_run']
+
+        inicio = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as archivo:
+                inicio = json.load(archivo)['filas']
+            self.stdout.write(f'Reanudando desde la fila {inicio + 1}.')
+
+        importador = IMPORTADORES[options['entidad']](dry_run=dry_run)
+        filas = leer_filas(ruta, options['formato'])
+        procesadas, guardadas, errores = inicio, 0, 0
+        t0 = time.perf_counter()
+
+        for lote in lotes(filas, options['batch_size'], inicio):
+            validas = []
+            for numero, fila in lote:
+                try:
+                    validas.append(importador.validar(fila))
+                except ValidationError as exc:
+                    errores += 1
+                    self.stderr.write(f'Fila {numero}: {"; ".join(exc.messages)}')
+            if errores > options['max_errores']:
+                raise CommandError(f'Demasiadas filas inválidas ({errores}); última fila confirmada: {procesadas}.')
+
+            with transaction.atomic():
+                guardadas += importador.guardar(validas)
+            procesadas = lote[-1][0]
+            if not dry_run:
+                with open(checkpoint, 'w') as archivo:
+                    json.dump({'filas': procesadas}, archivo)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {procesadas} filas ({guardadas} guardadas, {errores} con error)')
+
+        duracion = time.perf_counter() - t0
+        leidas = procesadas - inicio
+        ritmo = leidas / duracion if duracion else 0
+        if not dry_run and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        accion = 'validadas' if dry_run else 'guardadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{leidas} filas leídas, {guardadas} {accion}, {errores} con error '
+            f'en {duracion:.2f}s ({ritmo:,.0f} filas/s).'
+        ))
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core.bench import percentil
+from core.models import Empresa
+
+"""
+Prueba de carga en proceso contra la aplicación ASGI (sin servidor HTTP).
+
+Envía --solicitudes requests GET con --concurrencia requests simultáneas a
+get_asgi_application() (un solo proceso = un worker) y reporta
+requests/segundo y latencias. Para comparar vistas sync y async con el mismo
+número de workers:
+
+    CORE_ASYNC_VIEWS=0 python manage.py loadtest
+    CORE_ASYNC_VIEWS=1 python manage.py loadtest
+
+Usa la base de datos configurada (generar datos antes con manage.py seed).
+La caché de páginas se desactiva salvo --con-cache.
+"""
+
+
+class Command(BaseCommand):
+    help = 'Mide requests/segundo de la aplicación ASGI con requests concurrentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls', help='Ruta a probar (repetible).')
+        parser.add_argument('--solicitudes', type=int, default=500)
+        parser.add_argument('--concurrencia', type=int, default=20)
+        parser.add_argument('--con-cache', action='store_true', help='Mantiene la caché de páginas (core.cache).')
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or self.urls_por_defecto()
+        ajustes = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['con_cache']:
+            ajustes['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(**ajustes):
+            app = get_asgi_application()
+            for url in urls:
+                resultado = asyncio.run(self.cargar(app, url, options['solicitudes'], options['concurrencia']))
+                self.stdout.write(
+                    f'{url:<48} {resultado["rps"]:>8.1f} req/s  p50 {resultado["p50_ms"]:>7.1f}ms  '
+                    f'p95 {resultado["p95_ms"]:>7.1f}ms  errores {resultado["errores"]}'
+                )
+
+    def urls_por_defecto(self):
+        palabra = Empresa.objects.values_list('razon_social', flat=True).order_by('id').first() or 'a'
+        palabra = palabra.split()[0]
+        return [
+            '/',
+            f'/?q={palabra}',
+            '/api/ordenes/',
+            f'/api/ordenes/?q={palabra}&embed=empresa',
+            '/empresas/',
+        ]
+
+    async def cargar(self, app, url, solicitudes, concurrencia):
+        semaforo = asyncio.Semaphore(concurrencia)
+        latencias, errores = [], 0
+
+        async def una():
+            nonlocal errores
+            async with semaforo:
+                inicio = time.perf_counter()
+                estado = await solicitar(app, url)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if estado != 200:
+                    errores += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una() for _ in range(solicitudes)))
+        duracion = time.perf_counter() - inicio
+        return {
+            'rps': solicitudes / duracion,
+            'p50_ms': percentil(latencias, 50),
+            'p95_ms': percentil(latencias, 95),
+            'errores': errores,
+        }
+
+
+async def solicitar(app, url):
+    """GET mínimo por el protocolo ASGI; retorna el status y descarta el cuerpo."""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    terminado = asyncio.Event()
+    estado = None
+    enviado = False
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await terminado.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(mensaje):
+        nonlocal estado
+        if mensaje['type'] == 'http.response.start':
+            estado = mensaje['status']
+        elif mensaje['type'] == 'http.response.body' and not mensaje.get('more_body'):
+            terminado.set()
+
+    await app(scope, receive, send)
+    return estado
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import eliminacion
+
+"""
+Elimina por lotes las empresas y profesionales marcados con
+eliminacion_pendiente (core/eliminacion.py).
+
+Uso:
+    python manage.py procesar_eliminaciones
+    python manage.py procesar_eliminaciones --lote 500
+    python manage.py procesar_eliminaciones --continuo --intervalo 10
+"""
+
+
+class Command(BaseCommand):
+    help = 'Procesa las eliminaciones pendientes de empresas y profesionales con muchas órdenes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=eliminacion.LOTE, help='Órdenes por transacción.')
+        parser.add_argument('--continuo', action='store_true', help='No termina: revisa cada --intervalo segundos.')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre revisiones con --continuo.')
+
+    def handle(self, *args, **options):
+        def progreso(resultado):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'  lote {resultado.lotes}: {resultado.ordenes_eliminadas} eliminadas, '
+                    f'{resultado.ordenes_desasignadas} sin profesional'
+                )
+
+        while True:
+            t0 = time.perf_counter()
+            resultado = eliminacion.procesar(options['lote'], progreso=progreso)
+            if resultado.empresas or resultado.profesionales or not options['continuo']:
+                segundos = time.perf_counter() - t0
+                self.stdout.write(self.style.SUCCESS(f'{resultado.mensaje()} ({segundos:.2f}s)'))
+            if not options['continuo']:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core import search
+
+"""
+Reconstruye los índices FTS5 de búsqueda desde las tablas de los modelos.
+
+Necesario después de cargas masivas que no disparan señales
+(bulk_create, QuerySet.update(), SQL directo).
+
+Uso:
+    python manage.py rebuild_search_index
+"""
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los índices de búsqueda de texto completo (FTS5).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        search.reset_fts_cache()
+        if not search.fts_available(using):
+            raise CommandError('La base de datos no tiene las tablas FTS5 (¿SQLite sin FTS5 o migraciones pendientes?).')
+        with transaction.atomic(using=using):
+            search.rebuild(using)
+        self.stdout.write(self.style.SUCCESS('Índices de búsqueda reconstruidos.'))
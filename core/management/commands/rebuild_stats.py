@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core import cargas, estadisticas
+from core.models import EstadisticaOrden
+
+"""
+Reconstruye la tabla de estadísticas de órdenes (EstadisticaOrden) y la
+carga por profesional (CargaProfesional, Profesional.horas_pendientes) desde
+OrdenServicio con un GROUP BY.
+
+Necesario después de modificar órdenes sin pasar por save()/delete() ni por
+core.estadisticas / core.cargas (QuerySet.update(), SQL directo).
+
+Uso:
+    python manage.py rebuild_stats
+"""
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen de órdenes por empresa, estado, prioridad y mes y la carga por profesional.'
+
+    def handle(self, *args, **options):
+        estadisticas.reconstruir()
+        filas = EstadisticaOrden.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas reconstruidas ({filas} filas).'))
+        cargas.recalcular()
+        self.stdout.write(self.style.SUCCESS('Carga por profesional recalculada.'))
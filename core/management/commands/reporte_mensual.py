@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import reportes
+
+"""
+Genera el reporte mensual por empresa (core/reportes.py) en CSV o JSON.
+
+Uso:
+    python manage.py reporte_mensual --salida reporte.csv
+    python manage.py reporte_mensual --empresa 3 --desde 2025-01 --formato json
+    python manage.py reporte_mensual --procesos 8 --regenerar --salida reporte.csv
+"""
+
+
+class Command(BaseCommand):
+    help = 'Reporte mensual por empresa: órdenes por estado y prioridad, horas estimadas y utilización de profesionales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', help='Id de empresa (repetible; todas por defecto).')
+        parser.add_argument('--desde', help='Primer mes (AAAA-MM).')
+        parser.add_argument('--hasta', help='Último mes (AAAA-MM; por defecto el mes en curso).')
+        parser.add_argument('--formato', choices=['csv', 'json'], default='csv')
+        parser.add_argument('--salida', help='Archivo de salida (por defecto la salida estándar).')
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 1,
+            help='Procesos para calcular los meses sin snapshot (por defecto, uno por CPU).',
+        )
+        parser.add_argument('--regenerar', action='store_true', help='Recalcula y reemplaza los snapshots del rango.')
+
+    def handle(self, *args, **options):
+        try:
+            desde, hasta = (
+                reportes.leer_mes(options[nombre]) if options[nombre] else None for nombre in ('desde', 'hasta')
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        t0 = time.perf_counter()
+        resultado = reportes.generar(
+            options['empresa'], desde, hasta, procesos=options['procesos'], regenerar=options['regenerar'],
+        )
+        generar = reportes.generar_csv if options['formato'] == 'csv' else reportes.generar_json
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+                salida.writelines(generar(resultado))
+            informe = self.stdout
+        else:
+            sys.stdout.writelines(generar(resultado))
+            informe = self.stderr
+        segundos = time.perf_counter() - t0
+        informe.write(self.style.SUCCESS(f'{resultado.mensaje()} ({segundos:.2f}s)'))
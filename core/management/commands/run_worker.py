@@ -0,0 +1,44 @@
+"""
+Worker de la cola de trabajos (core/jobs.py).
+
+Uso:
+    python manage.py run_worker
+    python manage.py run_worker --concurrencia 8
+    python manage.py run_worker --procesos --concurrencia 4
+    python manage.py run_worker --una-vez
+
+SIGTERM o Ctrl+C dejan de tomar jobs y esperan a que terminen los en curso.
+"""
+
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los jobs pendientes en un pool de hilos o procesos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help='Jobs simultáneos.')
+        parser.add_argument('--procesos', action='store_true', help='Pool de procesos en lugar de hilos.')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre revisiones de la cola.')
+        parser.add_argument('--una-vez', action='store_true', help='Termina cuando no quedan jobs disponibles.')
+
+    def handle(self, *args, **options):
+        detener = threading.Event()
+
+        def al_detener(signum, frame):
+            self.stdout.write('Deteniendo: esperando los jobs en curso...')
+            detener.set()
+
+        signal.signal(signal.SIGTERM, al_detener)
+        signal.signal(signal.SIGINT, al_detener)
+        modo = 'procesos' if options['procesos'] else 'hilos'
+        self.stdout.write(f"Worker {jobs.nombre_worker()}: {options['concurrencia']} {modo}, tareas: {', '.join(sorted(jobs.TAREAS))}")
+        jobs.trabajar(
+            options['concurrencia'], options['procesos'], options['intervalo'], options['una_vez'], detener,
+        )
+        self.stdout.write(self.style.SUCCESS('Worker detenido.'))
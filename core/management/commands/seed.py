@@ -0,0 +1,258 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import cache, cargas, estadisticas, search
+from core.importer import asignar_fechas_creacion
+from core.models import (
+    Empresa, Servicio, Profesional, OrdenServicio, OrdenTransicion, EstadisticaOrden, CargaProfesional,
+    OrdenServicioArchivada, OrdenTransicionArchivada, ReporteMensual,
+)
+from core.rut import normalizar_rut
+
+"""
+Generador de datos sintéticos a escala de producción.
+
+Uso:
+    python manage.py seed --orders 1000000 --empresas 5000 --profesionales 300
+    python manage.py seed --orders 5000 --seed 7 --limpiar
+
+Los datos son válidos (estados y prioridades de los CHOICES, RUT con dígito
+verificador correcto) y deterministas para una misma --seed y base de datos
+inicial. Las distribuciones son sesgadas como en producción: pocas empresas
+concentran la mayoría de las órdenes, la mayoría de las órdenes están
+finalizadas y unos pocos servicios se piden mucho más que el resto.
+
+Todo se inserta con bulk_create en lotes; al final se reconstruyen la tabla
+de estadísticas, la carga por profesional y los índices de búsqueda (omitir estos con --sin-busqueda).
+"""
+
+ESTADOS = [('finalizada', 55), ('nueva', 20), ('en_ejecucion', 15), ('cancelada', 10)]
+PRIORIDADES = [('media', 50), ('baja', 30), ('alta', 20)]
+SERVICIOS_POR_ORDEN = [(1, 50), (2, 35), (3, 15)]
+# Probabilidad de tener profesional asignado según estado.
+ASIGNACION = {'nueva': 0.3, 'en_ejecucion': 1.0, 'finalizada': 1.0, 'cancelada': 0.5}
+
+CATEGORIAS = ['consultoria', 'desarrollo', 'soporte', 'redes', 'capacitacion']
+CATALOGO = [
+    ('Diagnóstico tecnológico', 'consultoria', 40),
+    ('Desarrollo de prototipo', 'desarrollo', 120),
+    ('Mantención de equipos', 'soporte', 8),
+    ('Instalación de red local', 'redes', 24),
+    ('Capacitación en ofimática', 'capacitacion', 16),
+    ('Auditoría de seguridad', 'consultoria', 32),
+    ('Desarrollo de sitio web', 'desarrollo', 80),
+    ('Reparación de hardware', 'soporte', 6),
+    ('Configuración de firewall', 'redes', 12),
+    ('Capacitación en ciberseguridad', 'capacitacion', 20),
+]
+RUBROS = ['Comercial', 'Transportes', 'Agrícola', 'Constructora', 'Servicios', 'Inversiones', 'Pesquera', 'Forestal']
+NOMBRES_EMPRESA = ['Biobío', 'Andes', 'Pacífico', 'Austral', 'Del Sur', 'Lircay', 'Nahuelbuta', 'Arauco', 'Itata', 'Laja']
+FORMAS = ['SpA', 'Ltda.', 'S.A.', 'E.I.R.L.']
+COMUNAS = ['Concepción', 'Talcahuano', 'Chiguayante', 'San Pedro de la Paz', 'Coronel', 'Los Ángeles', 'Hualpén', 'Lota', 'Tomé', 'Penco']
+NOMBRES = ['Juan', 'María', 'José', 'Camila', 'Pedro', 'Valentina', 'Diego', 'Francisca', 'Matías', 'Constanza', 'Felipe', 'Javiera']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda', 'Morales', 'Fuentes']
+REQUERIMIENTOS = [
+    'Modernización de sistemas legacy',
+    'Falla recurrente en equipos de la oficina',
+    'Implementación de respaldo en la nube',
+    'Ampliación de la red por nueva sucursal',
+    'Capacitación del personal administrativo',
+    'Evaluación de seguridad tras incidente',
+    'Desarrollo de catálogo en línea',
+    'Migración de correo corporativo',
+]
+
+
+def digito_verificador(numero):
+    """Dígito verificador módulo 11 de un RUT chileno."""
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: '0', 10: 'K'}.get(resto, str(resto))
+
+
+def formatear_rut(numero):
+    return f'{numero:,}'.replace(',', '.') + f'-{digito_verificador(numero)}'
+
+
+def pesos_zipf(n, s=1.1):
+    """Pesos acumulados 1/(i+1)^s: los primeros elementos concentran la mayoría."""
+    return list(accumulate(1 / (i + 1) ** s for i in range(n)))
+
+
+def elegir(rng, opciones):
+    valores, pesos = zip(*opciones)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos realistas y deterministas con bulk_create en lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--empresas', type=int, default=100)
+        parser.add_argument('--profesionales', type=int, default=30)
+        parser.add_argument('--servicios', type=int, default=len(CATALOGO))
+        parser.add_argument('--dias', type=int, default=730, help='Antigüedad máxima de las órdenes.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--limpiar', action='store_true', help='Elimina los datos existentes de core antes de generar.')
+        parser.add_argument('--sin-busqueda', action='store_true', help='No reconstruye los índices de búsqueda.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.tiempos = []
+
+        if options['limpiar']:
+            self.fase('limpieza', self.limpiar)
+        empresa_ids = self.fase('empresas', self.crear_empresas, options['empresas'])
+        servicios = self.fase('servicios', self.crear_servicios, options['servicios'])
+        profesionales = self.fase('profesionales', self.crear_profesionales, options['profesionales'])
+        self.fase(
+            'órdenes', self.crear_ordenes,
+            options['orders'], empresa_ids, servicios, profesionales, options['dias'],
+        )
+        self.fase('estadísticas', estadisticas.reconstruir)
+        self.fase('carga profesionales', cargas.recalcular)
+        if not options['sin_busqueda']:
+            self.fase('índices de búsqueda', self.reconstruir_busqueda)
+
+        cache.invalidar(Empresa, Servicio, Profesional, OrdenServicio)
+
+        total = sum(segundos for _, segundos in self.tiempos)
+        self.stdout.write(self.style.SUCCESS(f'Total: {total:.1f}s'))
+
+    def fase(self, nombre, funcion, *args):
+        t0 = time.perf_counter()
+        with transaction.atomic():
+            resultado = funcion(*args)
+        segundos = time.perf_counter() - t0
+        self.tiempos.append((nombre, segundos))
+        self.stdout.write(f'{nombre:<22} {segundos:8.2f}s')
+        return resultado
+
+    def limpiar(self):
+        # DELETE directo: QuerySet.delete() cargaría cada objeto para enviar señales.
+        modelos = (
+            EstadisticaOrden, CargaProfesional, ReporteMensual, OrdenTransicion,
+            OrdenServicio.servicios_seleccionados.through, OrdenServicio, OrdenTransicionArchivada, OrdenServicioArchivada.servicios_seleccionados.through,
+            OrdenServicioArchivada, Profesional, Servicio, Empresa,
+        )
+        with connection.cursor() as cursor:
+            for model in modelos:
+                cursor.execute(f'DELETE FROM {model._meta.db_table}')
+
+    def crear_empresas(self, cantidad):
+        inicio = Empresa.objects.count()
+        empresas = []
+        for i in range(inicio, inicio + cantidad):
+            numero = 76_000_000 + i
+            rut = formatear_rut(numero)
+            nombre = f'{self.rng.choice(RUBROS)} {self.rng.choice(NOMBRES_EMPRESA)} {i}'
+            empresas.append(Empresa(
+                rut=rut,
+                rut_normalizado=normalizar_rut(rut),
+                razon_social=f'{nombre} {self.rng.choice(FORMAS)}',
+                giro=self.rng.choice(RUBROS),
+                telefono=f'+569{self.rng.randrange(10**7, 10**8)}',
+                email=f'contacto{i}@empresa{i}.cl',
+                direccion=f'Calle {self.rng.randrange(1, 500)} #{self.rng.randrange(1, 3000)}',
+                comuna=self.rng.choice(COMUNAS),
+            ))
+        Empresa.objects.bulk_create(empresas, batch_size=self.batch_size)
+        return list(Empresa.objects.order_by('id').values_list('id', flat=True))
+
+    def crear_servicios(self, cantidad):
+        inicio = Servicio.objects.count()
+        servicios = []
+        for i in range(inicio, inicio + cantidad):
+            nombre, categoria, horas = CATALOGO[i % len(CATALOGO)]
+            if i >= len(CATALOGO):
+                nombre = f'{nombre} {i // len(CATALOGO) + 1}'
+            servicios.append(Servicio(
+                nombre=nombre,
+                descripcion=f'{nombre} para pymes de la región',
+                categoria=categoria,
+                duracion_estimada_horas=horas,
+                activo=self.rng.random() > 0.05,
+            ))
+        Servicio.objects.bulk_create(servicios, batch_size=self.batch_size)
+        return list(Servicio.objects.order_by('id').values_list('id', 'categoria'))
+
+    def crear_profesionales(self, cantidad):
+        inicio = Profesional.objects.count()
+        profesionales = []
+        for i in range(inicio, inicio + cantidad):
+            run = formatear_rut(10_000_000 + i * 7)
+            profesionales.append(Profesional(
+                run=run,
+                run_normalizado=normalizar_rut(run),
+                nombres=self.rng.choice(NOMBRES),
+                apellidos=f'{self.rng.choice(APELLIDOS)} {self.rng.choice(APELLIDOS)}',
+                especialidad=self.rng.choice(CATEGORIAS),
+                email=f'profesional{i}@inacap.cl',
+            ))
+        Profesional.objects.bulk_create(profesionales, batch_size=self.batch_size)
+        return list(Profesional.objects.order_by('id').values_list('id', 'especialidad'))
+
+    def crear_ordenes(self, cantidad, empresa_ids, servicios, profesionales, dias):
+        rng = self.rng
+        pesos_empresas = pesos_zipf(len(empresa_ids))
+        servicio_ids = [pk for pk, _ in servicios]
+        pesos_servicios = pesos_zipf(len(servicio_ids), s=0.8)
+        categoria_servicio = dict(servicios)
+        por_especialidad = {}
+        for pk, especialidad in profesionales:
+            por_especialidad.setdefault(especialidad, []).append(pk)
+        profesional_ids = [pk for pk, _ in profesionales]
+        ahora = timezone.now()
+        segundos_max = dias * 86400
+        through = OrdenServicio.servicios_seleccionados.through
+
+        for inicio in range(0, cantidad, self.batch_size):
+            tamano = min(self.batch_size, cantidad - inicio)
+            empresas_lote = rng.choices(empresa_ids, cum_weights=pesos_empresas, k=tamano)
+            ordenes, elegidos, fechas = [], [], []
+            for empresa_id in empresas_lote:
+                estado = elegir(rng, ESTADOS)
+                cantidad_servicios = elegir(rng, SERVICIOS_POR_ORDEN)
+                ids = sorted(set(rng.choices(servicio_ids, cum_weights=pesos_servicios, k=cantidad_servicios)))
+                profesional_id = None
+                if profesional_ids and rng.random() < ASIGNACION[estado]:
+                    candidatos = por_especialidad.get(categoria_servicio[ids[0]]) or profesional_ids
+                    profesional_id = rng.choice(candidatos)
+                ordenes.append(OrdenServicio(
+                    empresa_id=empresa_id,
+                    estado=estado,
+                    prioridad=elegir(rng, PRIORIDADES),
+                    descripcion_requerimiento=rng.choice(REQUERIMIENTOS),
+                    profesional_asignado_id=profesional_id,
+                ))
+                elegidos.append(ids)
+                # Más órdenes recientes que antiguas.
+                fechas.append(ahora - timedelta(seconds=int(segundos_max * rng.random() ** 2)))
+
+            OrdenServicio.objects.bulk_create(ordenes)
+            asignar_fechas_creacion([(orden.pk, fecha) for orden, fecha in zip(ordenes, fechas)])
+            through.objects.bulk_create([
+                through(ordenservicio_id=orden.pk, servicio_id=servicio_id)
+                for orden, ids in zip(ordenes, elegidos)
+                for servicio_id in ids
+            ])
+            if self.verbosity > 1:
+                self.stdout.write(f'  {inicio + tamano} órdenes')
+
+    def reconstruir_busqueda(self):
+        search.reset_fts_cache()
+        if search.fts_available():
+            search.rebuild()
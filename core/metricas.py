@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+"""
+Métricas de las requests por ruta, en memoria del proceso y en el formato
+de texto de Prometheus (GET /metrics, solo staff o CORE_METRICAS_TOKEN).
+
+MetricasMiddleware (core/middleware.py) llama a registrar() una vez por
+request con la ruta (nombre de URL de core/urls.py, o 'sin_ruta' si no se
+resolvió), el método y el código de estado:
+  - core_http_request_duration_seconds: histograma de latencia;
+  - core_http_requests_total: requests por código de estado;
+  - core_sql_queries_total y core_sql_duration_seconds_total: consultas
+    y tiempo SQL (connection.execute_wrapper; en las respuestas streaming,
+    solo lo ejecutado antes de enviar el cuerpo);
+  - core_template_render_seconds: tiempo de renderizado de las
+    TemplateResponse (incluye las consultas que se evalúan al renderizar;
+    las páginas cacheables las renderiza CachedViewMixin con renderizar());
+  - core_http_response_bytes: tamaño de las respuestas (las streaming
+    solo si traen Content-Length).
+Cada request suma a contadores agrupados por (ruta, método) bajo un único
+lock: no se guardan las requests individuales.
+
+Con settings.CORE_METRICAS_LENTAS_MS, las requests más lentas que ese
+umbral se registran en el logger 'core.metricas' con sus
+CONSULTAS_LENTAS consultas de mayor tiempo total.
+
+Los valores son del proceso actual: con varios procesos (gunicorn) cada uno
+expone los suyos, y Prometheus debe consultarlos por separado.
+"""
+
+logger = logging.getLogger('core.metricas')
+
+# Límites superiores (segundos) de los buckets del histograma de latencia.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METODOS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+CONSULTAS_LENTAS = 5
+
+
+class Serie:
+    """Acumulados de una (ruta, método)."""
+    __slots__ = (
+        'buckets', 'cantidad', 'segundos', 'codigos', 'consultas', 'sql_segundos',
+        'plantillas', 'plantilla_segundos', 'respuestas', 'bytes',
+    )
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)  # no acumulados: se suman al exportar
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.codigos = Counter()
+        self.consultas = 0
+        self.sql_segundos = 0.0
+        self.plantillas = 0
+        self.plantilla_segundos = 0.0
+        self.respuestas = 0
+        self.bytes = 0
+
+
+_series = defaultdict(Serie)
+_cerrojo = threading.Lock()
+
+
+def registrar(ruta, metodo, codigo, segundos, consultas, sql_segundos, plantilla_segundos=None, tamano=None):
+    """Suma una request a la serie (ruta, método)."""
+    if metodo not in METODOS:
+        metodo = 'otro'
+    indice = bisect_left(BUCKETS, segundos)
+    with _cerrojo:
+        serie = _series[(ruta, metodo)]
+        if indice < len(BUCKETS):
+            serie.buckets[indice] += 1
+        serie.cantidad += 1
+        serie.segundos += segundos
+        serie.codigos[codigo] += 1
+        serie.consultas += consultas
+        serie.sql_segundos += sql_segundos
+        if plantilla_segundos is not None:
+            serie.plantillas += 1
+            serie.plantilla_segundos += plantilla_segundos
+        if tamano is not None:
+            serie.respuestas += 1
+            serie.bytes += tamano
+
+
+def reiniciar():
+    with _cerrojo:
+        _series.clear()
+
+
+def consultas_lentas(counter, cantidad=CONSULTAS_LENTAS):
+    """[(segundos, ejecuciones, sql)] de las consultas de más tiempo total de un QueryCounter."""
+    tiempos = defaultdict(lambda: [0.0, 0])
+    for sql, duracion in zip(counter.statements, counter.durations):
+        tiempos[sql][0] += duracion
+        tiempos[sql][1] += 1
+    return sorted(((segundos, n, sql) for sql, (segundos, n) in tiempos.items()), reverse=True)[:cantidad]
+
+
+def registrar_lenta(request, ruta, segundos, counter, plantilla_segundos=None):
+    """Registra la request en el logger si supera CORE_METRICAS_LENTAS_MS."""
+    umbral = getattr(settings, 'CORE_METRICAS_LENTAS_MS', None)
+    if not umbral or segundos * 1000 < umbral:
+        return
+    lineas = [
+        f'{request.method} {request.get_full_path()} ({ruta}): {segundos * 1000:.0f} ms, '
+        f'{counter.count} consultas, {counter.duration * 1000:.1f} ms SQL'
+        + (f', {plantilla_segundos * 1000:.1f} ms plantilla' if plantilla_segundos is not None else '')
+    ]
+    lineas += [f'  {tiempo * 1000:.1f} ms x{n}: {sql}' for tiempo, n, sql in consultas_lentas(counter)]
+    logger.warning('\n'.join(lineas))
+
+
+def renderizar(request, response):
+    """
+    Renderiza `response` y guarda la duración en request.template_render_time.
+    Para vistas que renderizan antes de MetricasMiddleware (core.cache).
+    """
+    inicio = time.perf_counter()
+    response.render()
+    request.template_render_time = time.perf_counter() - inicio
+
+
+def _etiquetas(**etiquetas):
+    def escapar(valor):
+        return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{nombre}="{escapar(valor)}"' for nombre, valor in etiquetas.items()) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar():
+    """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+    with _cerrojo:
+        series = sorted(
+            (clave, {nombre: getattr(serie, nombre) for nombre in Serie.__slots__})
+            for clave, serie in _series.items()
+        )
+        for _, serie in series:
+            serie['buckets'] = list(serie['buckets'])
+            serie['codigos'] = sorted(serie['codigos'].items())
+
+    lineas = []
+
+    def metrica(nombre, tipo, ayuda, filas):
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        lineas.extend(f'{nombre}{sufijo}{_etiquetas(**etiquetas)} {_numero(valor)}' for sufijo, etiquetas, valor in filas)
+
+    def histograma():
+        for (ruta, metodo), serie in series:
+            acumulado = 0
+            for limite, n in zip(BUCKETS, serie['buckets']):
+                acumulado += n
+                yield '_bucket', {'route': ruta, 'method': metodo, 'le': repr(limite)}, acumulado
+            yield '_bucket', {'route': ruta, 'method': metodo, 'le': '+Inf'}, serie['cantidad']
+            yield '_sum', {'route': ruta, 'method': metodo}, serie['segundos']
+            yield '_count', {'route': ruta, 'method': metodo}, serie['cantidad']
+
+    def por_serie(*campos):
+        for (ruta, metodo), serie in series:
+            for sufijo, campo in campos:
+                yield sufijo, {'route': ruta, 'method': metodo}, serie[campo]
+
+    metrica(
+        'core_http_request_duration_seconds', 'histogram', 'Latencia de las requests por ruta.', histograma(),
+    )
+    metrica('core_http_requests_total', 'counter', 'Requests por ruta y código de estado.', (
+        ('', {'route': ruta, 'method': metodo, 'status': codigo}, n)
+        for (ruta, metodo), serie in series for codigo, n in serie['codigos']
+    ))
+    metrica('core_sql_queries_total', 'counter', 'Consultas SQL ejecutadas por ruta.', por_serie(('', 'consultas')))
+    metrica(
+        'core_sql_duration_seconds_total', 'counter', 'Tiempo en consultas SQL por ruta.', por_serie(('', 'sql_segundos')),
+    )
+    metrica('core_template_render_seconds', 'summary', 'Tiempo de renderizado de plantillas por ruta.', por_serie(
+        ('_sum', 'plantilla_segundos'), ('_count', 'plantillas'),
+    ))
+    metrica('core_http_response_bytes', 'summary', 'Tamaño de las respuestas por ruta.', por_serie(
+        ('_sum', 'bytes'), ('_count', 'respuestas'),
+    ))
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,196 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metricas
+
+"""
+Control de presupuesto de consultas SQL por vista.
+
+Cada vista puede declarar `query_budget` (máximo de consultas por request) o
+configurarse en settings.QUERY_BUDGETS por nombre de URL; en el admin, los GET
+del changelist usan `changelist_query_budget` del ModelAdmin. Si una request
+lo excede se registra un warning en el logger 'core.querybudget'; con
+settings.QUERY_BUDGET_STRICT = True (tests) se lanza QueryBudgetExceeded para
+que un N+1 nuevo no pase desapercibido.
+
+Para tests también está disponible el context manager max_queries():
+
+    with max_queries(3):
+        client.get('/')
+
+En ASGI el middleware es async: las consultas de las vistas async se
+ejecutan con sync_to_async en el hilo de la request (ThreadSensitiveContext
+del handler ASGI), por lo que el contador se instala en ese hilo.
+
+MetricasMiddleware mide cada request (latencia, consultas, tiempo SQL,
+renderizado de plantillas y tamaño) para /metrics (core/metricas.py).
+"""
+
+logger = logging.getLogger('core.querybudget')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Se excedió el número máximo de consultas permitido para una vista."""
+
+
+class QueryCounter:
+    """execute_wrapper que cuenta las consultas ejecutadas, guarda su SQL y mide su duración."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+        self.durations = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.statements.append(sql)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.duration += elapsed
+            self.durations.append(elapsed)
+
+
+@contextmanager
+def count_queries():
+    """Cuenta las consultas ejecutadas en todas las conexiones dentro del bloque."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+@contextmanager
+def max_queries(budget):
+    """Falla (QueryBudgetExceeded) si el bloque ejecuta más de `budget` consultas."""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > budget:
+        raise QueryBudgetExceeded(
+            f'{counter.count} consultas (máximo {budget}):\n' + '\n'.join(counter.statements)
+        )
+
+
+def get_view_budget(request, view_func):
+    """Presupuesto de la vista: QUERY_BUDGETS[url_name] tiene prioridad sobre view_class.query_budget."""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    match = getattr(request, 'resolver_match', None)
+    if match and match.url_name in budgets:
+        return budgets[match.url_name]
+    model_admin = getattr(view_func, 'model_admin', None)
+    if model_admin is not None:
+        # Las acciones masivas (POST al changelist) no tienen presupuesto.
+        if request.method == 'GET' and match and match.url_name.endswith('_changelist'):
+            return getattr(model_admin, 'changelist_query_budget', None)
+        return None
+    view_class = getattr(view_func, 'view_class', None)
+    return getattr(view_class, 'query_budget', None)
+
+
+class QueryBudgetMiddleware:
+    """Cuenta las consultas de cada request y las compara con el presupuesto de la vista."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with count_queries() as counter:
+            response = self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        stack = ExitStack()
+        counter = await sync_to_async(stack.enter_context)(count_queries())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.check_budget(request, counter)
+        return response
+
+    def check_budget(self, request, counter):
+        # Se resuelve después de la vista (request.resolver_match ya existe) en
+        # lugar de process_view, que en modo async agregaría un salto de hilo.
+        match = getattr(request, 'resolver_match', None)
+        budget = get_view_budget(request, match.func) if match else None
+        if budget is not None and counter.count > budget:
+            message = f'{request.path}: {counter.count} consultas (máximo {budget})'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message + ':\n' + '\n'.join(counter.statements))
+            logger.warning(message)
+
+
+class MetricasMiddleware:
+    """
+    Registra en core.metricas la latencia, las consultas SQL, el tiempo de
+    renderizado y el tamaño de cada request, agrupados por nombre de URL.
+    Va primero en MIDDLEWARE para medir también al resto de los middlewares.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, counter)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        stack = ExitStack()
+        counter = await sync_to_async(stack.enter_context)(count_queries())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, time.perf_counter() - start, counter)
+        return response
+
+    def process_template_response(self, request, response):
+        # Se llama justo antes de response.render(): el callback mide el renderizado.
+        # Si la vista ya renderizó (CachedViewMixin), lo midió metricas.renderizar().
+        if response.is_rendered:
+            return response
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.template_render_time = time.perf_counter() - start
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, elapsed, counter):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'sin_ruta'
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+        render_time = getattr(request, 'template_render_time', None)
+        metricas.registrar(
+            route, request.method, response.status_code, elapsed, counter.count, counter.duration, render_time, size,
+        )
+        metricas.registrar_lenta(request, route, elapsed, counter, render_time)
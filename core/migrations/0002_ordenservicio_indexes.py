@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ordenservicio',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='orden_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicio',
+            index=models.Index(fields=['estado', 'prioridad', '-fecha_creacion', '-id'], name='orden_estado_prio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicio',
+            index=models.Index(fields=['empresa', '-fecha_creacion', '-id'], name='orden_empresa_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicio',
+            index=models.Index(fields=['profesional_asignado', 'estado'], name='orden_profesional_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+"""
+Tablas virtuales FTS5 para la búsqueda de texto completo (core/search.py).
+
+Solo se crean en SQLite; en otros motores, o si SQLite no incluye FTS5, la
+búsqueda usa el filtro icontains.
+"""
+
+TABLES = {
+    'core_empresa_fts': (
+        'razon_social, rut, email',
+        "SELECT t.id, t.razon_social, t.rut, t.email FROM core_empresa t",
+    ),
+    'core_servicio_fts': (
+        'nombre, descripcion, categoria',
+        "SELECT t.id, t.nombre, t.descripcion, t.categoria FROM core_servicio t",
+    ),
+    'core_profesional_fts': (
+        'nombres, apellidos, run, email',
+        "SELECT t.id, t.nombres, t.apellidos, t.run, t.email FROM core_profesional t",
+    ),
+    'core_ordenservicio_fts': (
+        'empresa, descripcion, profesional, servicios',
+        "SELECT t.id, e.razon_social || ' ' || e.rut, t.descripcion_requerimiento, "
+        "COALESCE(p.nombres || ' ' || p.apellidos, ''), "
+        "COALESCE((SELECT group_concat(s.nombre || ' ' || s.categoria, ' ') "
+        "FROM core_ordenservicio_servicios_seleccionados m "
+        "JOIN core_servicio s ON s.id = m.servicio_id WHERE m.ordenservicio_id = t.id), '') "
+        "FROM core_ordenservicio t "
+        "JOIN core_empresa e ON e.id = t.empresa_id "
+        "LEFT JOIN core_profesional p ON p.id = t.profesional_asignado_id",
+    ),
+}
+
+
+def crear_indices(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            for table, (columns, source) in TABLES.items():
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+                )
+                cursor.execute(f"INSERT INTO {table}(rowid, {columns}) {source}")
+    except OperationalError:
+        # SQLite compilado sin FTS5: la búsqueda usará icontains.
+        pass
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_ordenservicio_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
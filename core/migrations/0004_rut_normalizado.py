@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:41
+
+import re
+
+from django.db import migrations, models
+
+
+def normalizar(valor):
+    return re.sub(r'[^0-9kK]', '', valor or '').upper().lstrip('0')
+
+
+def rellenar(apps, schema_editor, model_name, campo, destino, lote=2000):
+    Model = apps.get_model('core', model_name)
+    pendientes = Model.objects.using(schema_editor.connection.alias).only('pk', campo).order_by('pk')
+    ultimo = 0
+    while True:
+        filas = list(pendientes.filter(pk__gt=ultimo)[:lote])
+        if not filas:
+            break
+        for fila in filas:
+            setattr(fila, destino, normalizar(getattr(fila, campo)))
+        Model.objects.using(schema_editor.connection.alias).bulk_update(filas, [destino])
+        ultimo = filas[-1].pk
+
+
+def rellenar_normalizados(apps, schema_editor):
+    rellenar(apps, schema_editor, 'Empresa', 'rut', 'rut_normalizado')
+    rellenar(apps, schema_editor, 'Profesional', 'run', 'run_normalizado')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='rut_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='run_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(rellenar_normalizados, migrations.RunPython.noop),
+    ]
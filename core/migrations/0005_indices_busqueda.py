@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:49
+
+import core.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_rut_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmpresaBusqueda',
+            fields=[
+                ('rank', models.FloatField()),
+                ('empresa', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='core.empresa')),
+                ('documento', core.models.DocumentoFTS(db_column='core_empresa_fts')),
+            ],
+            options={
+                'db_table': 'core_empresa_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OrdenServicioBusqueda',
+            fields=[
+                ('rank', models.FloatField()),
+                ('orden', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='core.ordenservicio')),
+                ('documento', core.models.DocumentoFTS(db_column='core_ordenservicio_fts')),
+            ],
+            options={
+                'db_table': 'core_ordenservicio_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ProfesionalBusqueda',
+            fields=[
+                ('rank', models.FloatField()),
+                ('profesional', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='core.profesional')),
+                ('documento', core.models.DocumentoFTS(db_column='core_profesional_fts')),
+            ],
+            options={
+                'db_table': 'core_profesional_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ServicioBusqueda',
+            fields=[
+                ('rank', models.FloatField()),
+                ('servicio', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='core.servicio')),
+                ('documento', core.models.DocumentoFTS(db_column='core_servicio_fts')),
+            ],
+            options={
+                'db_table': 'core_servicio_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+    ]
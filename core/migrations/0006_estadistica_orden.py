@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, DateField
+from django.db.models.functions import TruncMonth
+
+
+def poblar_estadisticas(apps, schema_editor):
+    OrdenServicio = apps.get_model('core', 'OrdenServicio')
+    EstadisticaOrden = apps.get_model('core', 'EstadisticaOrden')
+    alias = schema_editor.connection.alias
+    filas = (
+        OrdenServicio.objects.using(alias).order_by()
+        .annotate(mes=TruncMonth('fecha_creacion', output_field=DateField()))
+        .values_list('empresa_id', 'mes', 'estado', 'prioridad')
+        .annotate(n=Count('id'))
+    )
+    EstadisticaOrden.objects.using(alias).bulk_create(
+        [
+            EstadisticaOrden(empresa_id=empresa_id, mes=mes, estado=estado, prioridad=prioridad, cantidad=n)
+            for empresa_id, mes, estado, prioridad, n in filas.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaOrden',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes (zona horaria local).')),
+                ('estado', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('media', 'Media'), ('alta', 'Alta')], max_length=10)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas', to='core.empresa')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mes'], name='estadistica_mes_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticaorden',
+            constraint=models.UniqueConstraint(fields=('empresa', 'mes', 'estado', 'prioridad'), name='estadistica_orden_unica'),
+        ),
+        migrations.RunPython(poblar_estadisticas, migrations.RunPython.noop),
+    ]
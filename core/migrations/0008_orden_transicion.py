@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0007_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdenTransicion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transiciones', to='core.ordenservicio')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['orden', '-fecha'], name='transicion_orden_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def poblar_cargas(apps, schema_editor):
+    OrdenServicio = apps.get_model('core', 'OrdenServicio')
+    Profesional = apps.get_model('core', 'Profesional')
+    CargaProfesional = apps.get_model('core', 'CargaProfesional')
+    alias = schema_editor.connection.alias
+    filas = list(
+        OrdenServicio.objects.using(alias)
+        .filter(estado__in=('nueva', 'en_ejecucion'), profesional_asignado__isnull=False)
+        .order_by()
+        .values_list('profesional_asignado_id', 'estado')
+        .annotate(
+            ordenes=Count('id', distinct=True),
+            horas=Coalesce(Sum('servicios_seleccionados__duracion_estimada_horas'), 0),
+        )
+    )
+    CargaProfesional.objects.using(alias).bulk_create(
+        [
+            CargaProfesional(profesional_id=profesional_id, estado=estado, ordenes=ordenes, horas=horas)
+            for profesional_id, estado, ordenes, horas in filas
+        ],
+        batch_size=1000,
+    )
+    totales = {}
+    for profesional_id, _, ordenes, horas in filas:
+        total_ordenes, total_horas = totales.get(profesional_id, (0, 0))
+        totales[profesional_id] = (total_ordenes + ordenes, total_horas + horas)
+    for profesional_id, (ordenes, horas) in totales.items():
+        Profesional.objects.using(alias).filter(pk=profesional_id).update(
+            ordenes_abiertas=ordenes, horas_pendientes=horas,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_orden_transicion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaProfesional',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('ordenes', models.PositiveIntegerField(default=0)),
+                ('horas', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['estado'],
+            },
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='horas_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='ordenes_abiertas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profesional',
+            index=models.Index(fields=['-horas_pendientes', '-id'], name='profesional_horas_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profesional',
+            index=models.Index(fields=['-ordenes_abiertas', '-id'], name='profesional_ordenes_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='cargaprofesional',
+            name='profesional',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cargas', to='core.profesional'),
+        ),
+        migrations.AddConstraint(
+            model_name='cargaprofesional',
+            constraint=models.UniqueConstraint(fields=('profesional', 'estado'), name='carga_profesional_unica'),
+        ),
+        migrations.RunPython(poblar_cargas, migrations.RunPython.noop),
+    ]
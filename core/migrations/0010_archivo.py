@@ -0,0 +1,105 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:25
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db.utils import OperationalError
+
+# Tabla FTS5 de las órdenes archivadas (core/search.py), igual a la de 0003.
+TABLA_FTS = 'core_ordenservicioarchivada_fts'
+COLUMNAS_FTS = 'empresa, descripcion, profesional, servicios'
+
+
+def crear_indice(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5({COLUMNAS_FTS}, tokenize='unicode61 remove_diacritics 2')"
+            )
+    except OperationalError:
+        # SQLite compilado sin FTS5: la búsqueda usará icontains.
+        pass
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0009_carga_profesional'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrdenServicioArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('media', 'Media'), ('alta', 'Alta')], max_length=10)),
+                ('descripcion_requerimiento', models.TextField(blank=True)),
+                ('fecha_modificacion', models.DateTimeField()),
+                ('fecha_archivo', models.DateTimeField(default=django.utils.timezone.now)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ordenes_archivadas', to='core.empresa')),
+                ('profesional_asignado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ordenes_archivadas', to='core.profesional')),
+                ('servicios_seleccionados', models.ManyToManyField(blank=True, related_name='ordenes_archivadas', to='core.servicio')),
+            ],
+            options={
+                'verbose_name': 'orden de servicio archivada',
+                'verbose_name_plural': 'órdenes de servicio archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrdenServicioArchivadaBusqueda',
+            fields=[
+                ('rank', models.FloatField()),
+                ('orden', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='core.ordenservicioarchivada')),
+                ('documento', core.models.DocumentoFTS(db_column='core_ordenservicioarchivada_fts')),
+            ],
+            options={
+                'db_table': 'core_ordenservicioarchivada_fts',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OrdenTransicionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('nueva', 'Nueva'), ('en_ejecucion', 'En ejecución'), ('finalizada', 'Finalizada'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('fecha', models.DateTimeField()),
+                ('orden', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transiciones', to='core.ordenservicioarchivada')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['orden', '-fecha'], name='transicion_arch_orden_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicioarchivada',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='archivada_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicioarchivada',
+            index=models.Index(fields=['estado', 'prioridad', '-fecha_creacion', '-id'], name='archivada_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordenservicioarchivada',
+            index=models.Index(fields=['empresa', '-fecha_creacion', '-id'], name='archivada_empresa_fecha_idx'),
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
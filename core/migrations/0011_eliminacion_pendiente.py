@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='eliminacion_pendiente',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='eliminacion_pendiente',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes (zona horaria local).')),
+                ('datos', models.JSONField()),
+                ('fecha_generacion', models.DateTimeField(auto_now_add=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reportes_mensuales', to='core.empresa')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mes'], name='reporte_mensual_mes_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportemensual',
+            constraint=models.UniqueConstraint(fields=('empresa', 'mes'), name='reporte_mensual_unico'),
+        ),
+    ]
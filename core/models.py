@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.core.validators import MinValueValidator, EmailValidator
 from django.db import models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from .rut import normalizar_rut
+
 """
 Modelos ORM para el Sistema de Gestión de Asistencias Técnicas INACAP Biobío.
 
@@ -20,18 +24,32 @@ class Empresa(models.Model):
         rut: Identificador único de la empresa (máx 12 caracteres).
         razon_social: Nombre legal de la empresa (requerido).
         email: Correo de contacto (validado automáticamente por EmailField).
+        rut_normalizado: RUT sin puntos ni guion, calculado al guardar (búsqueda indexada).
+        fecha_modificacion: Último guardado (versión de las filas cacheadas de los listados).
+        eliminacion_pendiente: Fecha en que se pidió eliminarla con muchas órdenes;
+            core.eliminacion borra sus órdenes por lotes y luego la empresa.
     """
     rut = models.CharField(max_length=12, unique=True)
+    rut_normalizado = models.CharField(max_length=12, editable=False, db_index=True, default='')
     razon_social = models.CharField(max_length=200)
     giro = models.CharField(max_length=200, blank=True)
     telefono = models.CharField(max_length=50, blank=True)
     email = models.EmailField(blank=True)
     direccion = models.CharField(max_length=250, blank=True)
     comuna = models.CharField(max_length=100, blank=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    eliminacion_pendiente = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.razon_social} ({self.rut})"
 
+    def save(self, *args, **kwargs):
+        self.rut_normalizado = normalizar_rut(self.rut)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'rut' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'rut_normalizado'}
+        super().save(*args, **kwargs)
+
     def clean(self):
         # Basic validations: razon_social required (enforced by non blank) and email format handled by EmailField
         if not self.razon_social:
@@ -52,6 +70,7 @@ class Servicio(models.Model):
     categoria = models.CharField(max_length=100, blank=True)
     duracion_estimada_horas = models.PositiveIntegerField(validators=[MinValueValidator(0)], default=0)
     activo = models.BooleanField(default=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre
@@ -65,16 +84,40 @@ class Profesional(models.Model):
         run: Identificador único del profesional (RUN chileno, máx 12 caracteres).
         nombres, apellidos: Datos de identidad.
         especialidad: Área de expertise (ej: "Reparación de hardware").
+        run_normalizado: RUN sin puntos ni guion, calculado al guardar (búsqueda indexada).
+        ordenes_abiertas, horas_pendientes: Carga actual (órdenes nuevas o en
+            ejecución asignadas), desnormalizada y mantenida por core/cargas.py.
+        eliminacion_pendiente: Fecha en que se pidió eliminarlo con muchas órdenes;
+            core.eliminacion las deja sin profesional por lotes y luego lo elimina.
     """
     run = models.CharField(max_length=12, unique=True)
+    run_normalizado = models.CharField(max_length=12, editable=False, db_index=True, default='')
     nombres = models.CharField(max_length=100)
     apellidos = models.CharField(max_length=100)
     especialidad = models.CharField(max_length=100, blank=True)
     email = models.EmailField(blank=True)
+    ordenes_abiertas = models.PositiveIntegerField(default=0, editable=False)
+    horas_pendientes = models.PositiveIntegerField(default=0, editable=False)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    eliminacion_pendiente = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        # Orden por carga en ProfesionalListView (paginación por cursor).
+        indexes = [
+            models.Index(fields=['-horas_pendientes', '-id'], name='profesional_horas_id_idx'),
+            models.Index(fields=['-ordenes_abiertas', '-id'], name='profesional_ordenes_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombres} {self.apellidos} ({self.run})"
 
+    def save(self, *args, **kwargs):
+        self.run_normalizado = normalizar_rut(self.run)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'run' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'run_normalizado'}
+        super().save(*args, **kwargs)
+
 
 class OrdenServicio(models.Model):
     """
@@ -116,9 +159,17 @@ class OrdenServicio(models.Model):
     descripcion_requerimiento = models.TextField(blank=True)
     servicios_seleccionados = models.ManyToManyField(Servicio, blank=True, related_name='ordenes')
     profesional_asignado = models.ForeignKey(Profesional, null=True, blank=True, on_delete=models.SET_NULL, related_name='ordenes')
+    fecha_modificacion = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-fecha_creacion']
+        # Índices para los filtros de OrdenServicioListView/admin y la paginación por cursor.
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='orden_fecha_id_idx'),
+            models.Index(fields=['estado', 'prioridad', '-fecha_creacion', '-id'], name='orden_estado_prio_fecha_idx'),
+            models.Index(fields=['empresa', '-fecha_creacion', '-id'], name='orden_empresa_fecha_idx'),
+            models.Index(fields=['profesional_asignado', 'estado'], name='orden_profesional_estado_idx'),
+        ]
 
     def __str__(self):
         return f"Orden #{self.id} - {self.empresa} - {self.get_estado_display()}"
@@ -130,3 +181,327 @@ class OrdenServicio(models.Model):
         """
         if self.estado == 'finalizada':
             pass
+
+
+class OrdenTransicion(models.Model):
+    """
+    Registro de solo inserción de los cambios de estado de una orden.
+
+    Lo escriben las transiciones masivas (core/transiciones.py) con
+    bulk_create y los guardados individuales desde core/signals.py.
+    usuario queda vacío si el cambio no vino de una request autenticada.
+    """
+    orden = models.ForeignKey(OrdenServicio, on_delete=models.CASCADE, related_name='transiciones')
+    estado_anterior = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    estado_nuevo = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['orden', '-fecha'], name='transicion_orden_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Orden #{self.orden_id}: {self.estado_anterior} -> {self.estado_nuevo}"
+
+
+class OrdenServicioArchivada(models.Model):
+    """
+    Orden cerrada ('finalizada' o 'cancelada') movida fuera de OrdenServicio
+    por `manage.py archivar_ordenes` (core/archivo.py), con el mismo id y sus
+    servicios. No se modifica: los listados, la búsqueda y el admin de
+    órdenes leen solo la tabla activa, salvo el modo "incluir archivadas"
+    (?archivadas=1) que combina ambas por fecha_creacion.
+    """
+    archivada = True  # las plantillas de fila distinguen órdenes archivadas
+
+    id = models.BigIntegerField(primary_key=True)
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='ordenes_archivadas')
+    fecha_creacion = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    prioridad = models.CharField(max_length=10, choices=OrdenServicio.PRIORIDAD_CHOICES)
+    descripcion_requerimiento = models.TextField(blank=True)
+    servicios_seleccionados = models.ManyToManyField(Servicio, blank=True, related_name='ordenes_archivadas')
+    profesional_asignado = models.ForeignKey(
+        Profesional, null=True, blank=True, on_delete=models.SET_NULL, related_name='ordenes_archivadas',
+    )
+    fecha_modificacion = models.DateTimeField()
+    fecha_archivo = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        verbose_name = 'orden de servicio archivada'
+        verbose_name_plural = 'órdenes de servicio archivadas'
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='archivada_fecha_id_idx'),
+            models.Index(fields=['estado', 'prioridad', '-fecha_creacion', '-id'], name='archivada_estado_fecha_idx'),
+            models.Index(fields=['empresa', '-fecha_creacion', '-id'], name='archivada_empresa_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Orden #{self.id} - {self.empresa} - {self.get_estado_display()} (archivada)"
+
+
+class OrdenTransicionArchivada(models.Model):
+    """Historial de estados de una orden archivada (copiado de OrdenTransicion)."""
+    orden = models.ForeignKey(OrdenServicioArchivada, on_delete=models.CASCADE, related_name='transiciones')
+    estado_anterior = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    estado_nuevo = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    fecha = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['orden', '-fecha'], name='transicion_arch_orden_idx'),
+        ]
+
+    def __str__(self):
+        return f"Orden #{self.orden_id}: {self.estado_anterior} -> {self.estado_nuevo}"
+
+
+class EstadisticaOrden(models.Model):
+    """
+    Resumen de órdenes por empresa × estado × prioridad × mes.
+
+    Se mantiene incrementalmente (core/estadisticas.py) al crear, modificar o
+    eliminar órdenes, incluidas las acciones masivas del admin. El dashboard
+    y el panel de la empresa leen solo esta tabla.
+    Reconstruir desde cero: python manage.py rebuild_stats
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='estadisticas')
+    mes = models.DateField(help_text='Primer día del mes (zona horaria local).')
+    estado = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    prioridad = models.CharField(max_length=10, choices=OrdenServicio.PRIORIDAD_CHOICES)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'mes', 'estado', 'prioridad'], name='estadistica_orden_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['mes'], name='estadistica_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa_id} {self.mes:%Y-%m} {self.estado}/{self.prioridad}: {self.cantidad}"
+
+
+class CargaProfesional(models.Model):
+    """
+    Órdenes abiertas y horas estimadas pendientes de un profesional por estado
+    (solo 'nueva' y 'en_ejecucion'). Los totales están en
+    Profesional.ordenes_abiertas / horas_pendientes. Se recalcula por
+    profesional en core/cargas.py.
+    """
+    profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='cargas')
+    estado = models.CharField(max_length=20, choices=OrdenServicio.ESTADO_CHOICES)
+    ordenes = models.PositiveIntegerField(default=0)
+    horas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['estado']
+        constraints = [
+            models.UniqueConstraint(fields=['profesional', 'estado'], name='carga_profesional_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.profesional_id} {self.estado}: {self.ordenes} órdenes, {self.horas} h"
+
+
+class ReporteMensual(models.Model):
+    """
+    Reporte de un mes cerrado de una empresa (core/reportes.py): órdenes por
+    estado y prioridad, horas estimadas y utilización por profesional, en
+    `datos` (JSON). Se guarda una vez, al pedirse por primera vez después
+    del cierre del mes, y no se recalcula (salvo reporte_mensual --regenerar).
+    El mes en curso nunca se guarda.
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='reportes_mensuales')
+    mes = models.DateField(help_text='Primer día del mes (zona horaria local).')
+    datos = models.JSONField()
+    fecha_generacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'mes'], name='reporte_mensual_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['mes'], name='reporte_mensual_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa_id} {self.mes:%Y-%m}"
+
+
+class Job(models.Model):
+    """
+    Trabajo en segundo plano de la cola de core/jobs.py, ejecutado por
+    `manage.py run_worker`.
+
+    Atributos:
+        tipo: Nombre de la tarea registrada con @jobs.tarea (core/tareas.py).
+        parametros: Argumentos de la tarea (JSON).
+        estado: pendiente -> en_proceso -> completado | fallido (un intento
+            fallido vuelve a pendiente mientras intentos < max_intentos).
+        progreso, mensaje: Avance informado por la tarea (0-100).
+        resultado, error: Valor retornado (JSON) o traceback del último intento.
+        intentos: Veces que un worker lo tomó; identifica el intento en curso.
+        disponible_desde: No se toma antes de esta fecha (espera entre reintentos).
+        latido: Última señal del worker; sin latidos se considera abandonado.
+        timeout: Segundos máximos por intento.
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADO, 'Completado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=100)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    progreso = models.PositiveSmallIntegerField(default=0)
+    mensaje = models.CharField(max_length=255, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=3)
+    timeout = models.PositiveIntegerField(default=3600)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    worker = models.CharField(max_length=100, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    latido = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Próximo job a tomar (core.jobs.reclamar) y jobs en proceso sin latido.
+            models.Index(fields=['estado', 'disponible_desde', 'id'], name='job_cola_idx'),
+            models.Index(fields=['usuario', '-id'], name='job_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+    @property
+    def terminado(self):
+        return self.estado in (self.COMPLETADO, self.FALLIDO)
+
+    def como_dict(self):
+        return {
+            'id': self.pk,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'progreso': self.progreso,
+            'mensaje': self.mensaje,
+            'resultado': self.resultado,
+            'error': self.error,
+            'intentos': self.intentos,
+            'fecha_creacion': self.fecha_creacion,
+            'fecha_inicio': self.fecha_inicio,
+            'fecha_fin': self.fecha_fin,
+        }
+
+
+class DocumentoFTS(models.Field):
+    """
+    Columna oculta de una tabla virtual FTS5 (lleva el nombre de la tabla).
+    Solo sirve para filtrar con el lookup 'match'.
+    """
+
+    def db_type(self, connection):
+        return None
+
+
+@DocumentoFTS.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class IndiceBusqueda(models.Model):
+    """
+    Base de los modelos no administrados sobre las tablas FTS5 (core/search.py).
+
+    Permiten unir la tabla FTS con la del modelo (rowid = id) en una sola
+    consulta y ordenar por `rank` (bm25) sin subconsultas por fila.
+    """
+    rank = models.FloatField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+
+class EmpresaBusqueda(IndiceBusqueda):
+    empresa = models.OneToOneField(
+        Empresa, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='busqueda',
+    )
+    documento = DocumentoFTS(db_column='core_empresa_fts')
+
+    class Meta(IndiceBusqueda.Meta):
+        db_table = 'core_empresa_fts'
+
+
+class ServicioBusqueda(IndiceBusqueda):
+    servicio = models.OneToOneField(
+        Servicio, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='busqueda',
+    )
+    documento = DocumentoFTS(db_column='core_servicio_fts')
+
+    class Meta(IndiceBusqueda.Meta):
+        db_table = 'core_servicio_fts'
+
+
+class ProfesionalBusqueda(IndiceBusqueda):
+    profesional = models.OneToOneField(
+        Profesional, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='busqueda',
+    )
+    documento = DocumentoFTS(db_column='core_profesional_fts')
+
+    class Meta(IndiceBusqueda.Meta):
+        db_table = 'core_profesional_fts'
+
+
+class OrdenServicioBusqueda(IndiceBusqueda):
+    orden = models.OneToOneField(
+        OrdenServicio, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='busqueda',
+    )
+    documento = DocumentoFTS(db_column='core_ordenservicio_fts')
+
+    class Meta(IndiceBusqueda.Meta):
+        db_table = 'core_ordenservicio_fts'
+
+
+class OrdenServicioArchivadaBusqueda(IndiceBusqueda):
+    orden = models.OneToOneField(
+        OrdenServicioArchivada, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='busqueda',
+    )
+    documento = DocumentoFTS(db_column='core_ordenservicioarchivada_fts')
+
+    class Meta(IndiceBusqueda.Meta):
+        db_table = 'core_ordenservicioarchivada_fts'
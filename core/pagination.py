@@ -0,0 +1,284 @@
+import base64
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import cache
+
+"""
+Paginación por cursor (keyset) para las ListViews.
+
+A diferencia de OFFSET, cada página se obtiene con un filtro sobre la última
+fila vista (ej: fecha_creacion < X OR (fecha_creacion = X AND id < Y)), por lo
+que la página N cuesta lo mismo que la página 1 si existe un índice sobre las
+columnas de orden.
+
+El cursor es opaco para el usuario: JSON codificado en base64 con la dirección
+('n' siguiente, 'p' anterior) y los valores de la fila de referencia.
+
+ConteoEstimadoPaginator es el Paginator de los changelists del admin (que
+paginan por número de página): evita el COUNT(*) exacto sobre tablas grandes.
+"""
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder trunca microsegundos; el cursor necesita la precisión completa."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    """Codifica dirección y valores de la fila de referencia en un cursor URL-safe."""
+    raw = json.dumps({'d': direction, 'v': values}, cls=CursorJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor. Retorna (direccion, valores) o None si es inválido."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction, values = data['d'], data['v']
+    except (ValueError, TypeError, KeyError):
+        return None
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        return None
+    return direction, values
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Construye el Q que selecciona las filas posteriores a `values` según `ordering`.
+
+    Para ordering=('-fecha_creacion', '-id') genera:
+        Q(fecha_creacion__lt=f) | Q(fecha_creacion=f, id__lt=i)
+    Con reverse=True se invierten las comparaciones (filas anteriores).
+    """
+    condition = Q()
+    for position, field in enumerate(ordering):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        lookup = 'lt' if descending != reverse else 'gt'
+        equals = {ordering[i].lstrip('-'): values[i] for i in range(position)}
+        condition |= Q(**equals, **{f'{name}__{lookup}': values[position]})
+    return condition
+
+
+def invert_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class KeysetPage:
+    """
+    Equivalente mínimo a django.core.paginator.Page para paginación por cursor.
+
+    Expone has_next/has_previous y los querystrings listos para los enlaces,
+    conservando el resto de parámetros GET (q, estado, prioridad, empresa...).
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, params, cursor_param):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._params = params
+        self._cursor_param = cursor_param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def _querystring(self, cursor):
+        params = self._params.copy()
+        params[self._cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor) if self._has_next else ''
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor) if self._has_previous else ''
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ListView que reemplaza la paginación OFFSET por cursor.
+
+    Atributos:
+        keyset_ordering: campos de orden; el último debe ser único (normalmente 'id').
+        ranked_ordering: orden usado cuando get_queryset marca search_ranked
+            (búsqueda por relevancia, ver core.search).
+        paginate_by: tamaño de página.
+        cursor_param: nombre del parámetro GET con el cursor.
+    """
+    keyset_ordering = ('-id',)
+    ranked_ordering = ('search_rank', 'id')
+    search_ranked = False
+    paginate_by = 50
+    cursor_param = 'cursor'
+
+    def get_ordering(self):
+        return self.keyset_ordering
+
+    def get_keyset_ordering(self):
+        return self.ranked_ordering if self.search_ranked else self.keyset_ordering
+
+    def _row_values(self, obj):
+        values = []
+        for field in self.get_keyset_ordering():
+            name = field.lstrip('-')
+            values.append(obj.pk if name in ('id', 'pk') else getattr(obj, name))
+        return values
+
+    def _parse_values(self, raw_values):
+        """Convierte los valores del cursor (JSON) a tipos Python usando los campos del modelo."""
+        ordering = self.get_keyset_ordering()
+        if len(raw_values) != len(ordering):
+            return None
+        values = []
+        opts = self.model._meta
+        field_names = {field.name for field in opts.concrete_fields} | {'pk'}
+        for field, raw in zip(ordering, raw_values):
+            name = field.lstrip('-')
+            if name not in field_names:
+                # Anotación (ej: search_rank): solo se aceptan números.
+                if not isinstance(raw, (int, float)) or isinstance(raw, bool):
+                    return None
+                values.append(raw)
+                continue
+            model_field = opts.pk if name == 'pk' else opts.get_field(name)
+            try:
+                values.append(model_field.to_python(raw))
+            except Exception:
+                return None
+        return values
+
+    def get_cursor(self):
+        """Retorna (valores, hacia_atras) según el cursor de la request; (None, False) si no hay."""
+        cursor = self.request.GET.get(self.cursor_param, '')
+        decoded = decode_cursor(cursor) if cursor else None
+        values = self._parse_values(decoded[1]) if decoded else None
+        return values, bool(values) and decoded[0] == 'p'
+
+    def keyset_queryset(self, queryset, values=None, backwards=False):
+        """Aplica orden y filtro de cursor: la consulta que realmente ejecuta cada página."""
+        ordering = tuple(self.get_keyset_ordering())
+        if backwards:
+            return queryset.filter(keyset_filter(ordering, values, reverse=True)).order_by(*invert_ordering(ordering))
+        if values:
+            return queryset.filter(keyset_filter(ordering, values)).order_by(*ordering)
+        return queryset.order_by(*ordering)
+
+    def get_keyset_querysets(self, queryset):
+        """
+        Querysets cuyas páginas se combinan en una sola (por defecto solo
+        `queryset`). Cada uno se pagina con el mismo cursor y orden, y las
+        filas se mezclan según get_keyset_ordering() (ej: órdenes activas y
+        archivadas). Los valores de orden no deben repetirse entre ellos.
+        """
+        return [queryset]
+
+    def merge_rows(self, groups, backwards):
+        """Mezcla las filas leídas de cada queryset en el orden de la página."""
+        if len(groups) == 1:
+            return groups[0]
+        rows = [row for group in groups for row in group]
+        ordering = self.get_keyset_ordering()
+        # Ordenamiento estable por campo, del último al primero (admite direcciones mixtas).
+        for position in reversed(range(len(ordering))):
+            descending = ordering[position].startswith('-')
+            rows.sort(key=lambda row: self._row_values(row)[position], reverse=descending != backwards)
+        return rows
+
+    def paginate_queryset(self, queryset, page_size):
+        values, backwards = self.get_cursor()
+        groups = [
+            list(self.keyset_queryset(qs, values, backwards)[:page_size + 1])
+            for qs in self.get_keyset_querysets(queryset)
+        ]
+        return self.build_page(self.merge_rows(groups, backwards)[:page_size + 1], page_size, values, backwards)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Versión async de paginate_queryset (vistas async, ver core.async_views)."""
+        values, backwards = self.get_cursor()
+        groups = [
+            [row async for row in self.keyset_queryset(qs, values, backwards)[:page_size + 1]]
+            for qs in self.get_keyset_querysets(queryset)
+        ]
+        return self.build_page(self.merge_rows(groups, backwards)[:page_size + 1], page_size, values, backwards)
+
+    def build_page(self, rows, page_size, values, backwards):
+        """Arma la página a partir de las page_size + 1 filas leídas."""
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(values)
+        has_next = has_next and bool(rows)
+        has_previous = has_previous and bool(rows)
+
+        next_cursor = encode_cursor('n', self._row_values(rows[-1])) if rows and has_next else None
+        previous_cursor = encode_cursor('p', self._row_values(rows[0])) if rows and has_previous else None
+
+        params = self.request.GET.copy()
+        params.pop(self.cursor_param, None)
+        page = KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor, params, self.cursor_param)
+        return (None, page, rows, page.has_other_pages())
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """
+    Paginator con conteo acotado.
+
+    Primero cuenta como máximo `umbral` + 1 filas (COUNT sobre un subquery
+    con LIMIT, costo acotado). Si el resultado supera el umbral, usa el conteo
+    exacto guardado en la caché por settings.CORE_CONTEO_TIMEOUT segundos
+    (estimado: puede no incluir los cambios de ese lapso) y solo lo calcula
+    cuando no está guardado.
+    """
+    umbral = 10000
+
+    def clave_conteo(self):
+        sql = str(self.object_list.query)
+        huella = hashlib.md5(f'{self.object_list.db}:{sql}'.encode(), usedforsecurity=False).hexdigest()
+        return f'{cache.PREFIJO}:conteo:{self.object_list.model._meta.label_lower}:{huella}'
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        acotado = self.object_list.order_by()[:self.umbral + 1].count()
+        if acotado <= self.umbral:
+            return acotado
+        clave = self.clave_conteo()
+        conteo = cache.get_cache().get(clave)
+        if conteo is None:
+            conteo = self.object_list.count()
+            cache.get_cache().set(clave, conteo, getattr(settings, 'CORE_CONTEO_TIMEOUT', 600))
+        return max(conteo, acotado)
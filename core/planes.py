@@ -0,0 +1,82 @@
+import re
+
+from django.db import models
+from django.test import RequestFactory
+from django.utils import timezone
+
+from . import views
+
+"""
+EXPLAIN QUERY PLAN de las consultas principales de las ListViews: detecta
+los 'SCAN <tabla>', con o sin índice ('SCAN x USING INDEX i' también recorre
+el índice completo). Lo usan los tests (core/tests.py) y
+`manage.py check_query_plans`.
+
+Los escenarios con filtros solo pueden usar SEARCH. La única excepción es el
+listado sin filtros, que recorre la tabla de la propia vista en el orden de
+la paginación (clave primaria o el índice de BOUNDED_SCANS) sin ordenamiento
+temporal: con LIMIT, SQLite se detiene al completar la página.
+"""
+
+# (nombre, vista, parámetros GET, usar cursor)
+SCENARIOS = [
+    ('ordenes', views.OrdenServicioListView, {}, False),
+    ('ordenes página siguiente', views.OrdenServicioListView, {}, True),
+    ('ordenes por estado', views.OrdenServicioListView, {'estado': 'nueva'}, False),
+    ('ordenes por estado y prioridad', views.OrdenServicioListView, {'estado': 'nueva', 'prioridad': 'alta'}, False),
+    ('ordenes por estado y prioridad, página siguiente', views.OrdenServicioListView, {'estado': 'nueva', 'prioridad': 'alta'}, True),
+    ('ordenes búsqueda', views.OrdenServicioListView, {'q': 'diagnostico'}, False),
+    ('empresas', views.EmpresaListView, {}, False),
+    ('empresas búsqueda', views.EmpresaListView, {'q': 'comercial'}, False),
+    ('empresas por RUT', views.EmpresaListView, {'q': '76.123.456-7'}, False),
+    ('empresas página siguiente', views.EmpresaListView, {}, True),
+    ('servicios', views.ServicioListView, {}, False),
+    ('profesionales', views.ProfesionalListView, {}, False),
+]
+
+# Índice que recorre en orden el listado sin filtros de cada vista (orden por defecto de la paginación).
+BOUNDED_SCANS = {
+    views.OrdenServicioListView: 'orden_fecha_id_idx',
+}
+
+# 'SCAN x VIRTUAL TABLE INDEX' es la consulta al índice FTS5, no un escaneo completo.
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! VIRTUAL TABLE)(?: USING (?:COVERING )?INDEX (\w+))?(?!\w)')
+
+
+def sample_cursor(view):
+    """Valores de cursor representativos (no necesitan existir en la base de datos)."""
+    values = []
+    for field in view.get_keyset_ordering():
+        name = field.lstrip('-')
+        model_field = view.model._meta.pk if name == 'pk' else view.model._meta.get_field(name)
+        values.append(timezone.now() if isinstance(model_field, models.DateTimeField) else 1)
+    return values
+
+
+def bounded_scan(view, params, plan):
+    """(tabla, índice o None) que el listado sin filtros puede recorrer en orden, o None."""
+    if params or 'TEMP B-TREE' in plan:
+        return None
+    if tuple(field.lstrip('-') for field in view.get_keyset_ordering()) in (('id',), ('pk',)):
+        return (view.model._meta.db_table, None)
+    index = BOUNDED_SCANS.get(type(view))
+    return (view.model._meta.db_table, index) if index else None
+
+
+def full_scans(plan, view, params):
+    """Tablas (o 'tabla USING índice') recorridas completamente según el texto de EXPLAIN QUERY PLAN."""
+    allowed = bounded_scan(view, params, plan)
+    return [
+        f'{table} USING {index}' if index else table
+        for table, index in (match.groups() for match in FULL_SCAN.finditer(plan))
+        if (table, index) != allowed
+    ]
+
+
+def explain(view_class, params, with_cursor):
+    """(plan, tablas recorridas completamente) de la primera página (o una siguiente) de la vista."""
+    view = view_class()
+    view.setup(RequestFactory().get('/', params))
+    values = sample_cursor(view) if with_cursor else None
+    plan = view.keyset_queryset(view.get_queryset(), values)[:view.paginate_by + 1].explain()
+    return plan, full_scans(plan, view, params)
@@ -0,0 +1,312 @@
+import csv
+import json
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+import django
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, DateField, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .export import _Eco
+from .models import Empresa, EstadisticaOrden, OrdenServicio, OrdenServicioArchivada, Profesional, ReporteMensual
+
+"""
+Reportes mensuales por empresa: órdenes por estado y prioridad, horas
+estimadas (Servicio.duracion_estimada_horas a través de la M2M, por estado)
+y utilización por profesional (órdenes, horas y % de las horas del mes).
+
+calcular() agrega con GROUP BY sobre TruncMonth(fecha_creacion) en la zona
+horaria local, sobre órdenes activas y archivadas (tres consultas por tabla
+para un lote de empresas, sin importar cuántos meses abarque).
+
+generar() solo calcula lo que falta:
+  - los meses cerrados ya reportados se leen de ReporteMensual (snapshots
+    inmutables: cambios posteriores en órdenes de esos meses no los alteran);
+  - los meses cerrados sin snapshot se calculan y se guardan (con
+    guardar=False, como en /reportes/mensual/, solo se calculan);
+  - el mes en curso se calcula siempre y no se guarda.
+Qué meses tienen órdenes se obtiene de EstadisticaOrden, sin leer las
+órdenes. Las empresas pendientes se reparten en lotes de LOTE_EMPRESAS
+que se calculan en paralelo en un pool de procesos (`procesos`); el
+proceso principal es el único que escribe.
+
+Salida: generar_csv() (una fila por empresa y mes) y generar_json().
+Los snapshots los guardan manage.py reporte_mensual y el job
+'generar_reportes'; /reportes/mensual/ solo lee.
+"""
+
+LOTE_EMPRESAS = 200
+TABLAS = (OrdenServicio, OrdenServicioArchivada)
+ESTADOS = [valor for valor, _ in OrdenServicio.ESTADO_CHOICES]
+PRIORIDADES = [valor for valor, _ in OrdenServicio.PRIORIDAD_CHOICES]
+
+
+def mes_actual():
+    return timezone.localdate().replace(day=1)
+
+
+def siguiente_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def inicio_mes(mes):
+    return timezone.make_aware(datetime.combine(mes, time.min))
+
+
+def leer_mes(texto):
+    """'2025-03' -> date(2025, 3, 1). ValueError si el formato no es AAAA-MM."""
+    try:
+        anio, mes = texto.split('-')
+        return date(int(anio), int(mes), 1)
+    except (AttributeError, ValueError):
+        raise ValueError(f'Mes inválido: {texto!r} (se espera AAAA-MM).')
+
+
+def _vacio():
+    return {
+        'ordenes': 0,
+        'por_estado': dict.fromkeys(ESTADOS, 0),
+        'por_prioridad': dict.fromkeys(PRIORIDADES, 0),
+        'horas_estimadas': 0,
+        'horas_por_estado': dict.fromkeys(ESTADOS, 0),
+        'sin_profesional': 0,
+        'profesionales': [],
+    }
+
+
+def calcular(empresa_ids, desde=None, hasta=None, using=DEFAULT_DB_ALIAS):
+    """
+    {(empresa_id, mes): datos} de las órdenes de `empresa_ids` creadas entre
+    los meses `desde` (incluido) y `hasta` (excluido); None = sin límite.
+    """
+    if desde is not None and hasta == siguiente_mes(desde):
+        # Un solo mes (el caso normal: solo falta el mes en curso): se evita
+        # truncar la fecha de cada fila (en SQLite, una función Python).
+        truncar = Value(desde, output_field=DateField())
+    else:
+        truncar = TruncMonth('fecha_creacion', output_field=DateField())
+    datos = defaultdict(_vacio)
+    por_profesional = defaultdict(lambda: defaultdict(lambda: [0, 0]))  # {(empresa, mes): {id: [órdenes, horas]}}
+    for modelo in TABLAS:
+        qs = modelo.objects.using(using).filter(empresa_id__in=empresa_ids)
+        if desde is not None:
+            qs = qs.filter(fecha_creacion__gte=inicio_mes(desde))
+        if hasta is not None:
+            qs = qs.filter(fecha_creacion__lt=inicio_mes(hasta))
+        qs = qs.order_by().annotate(mes=truncar)
+
+        for empresa_id, mes, estado, prioridad, n in (
+            qs.values_list('empresa_id', 'mes', 'estado', 'prioridad').annotate(n=Count('id'))
+        ):
+            fila = datos[(empresa_id, mes)]
+            fila['ordenes'] += n
+            fila['por_estado'][estado] += n
+            fila['por_prioridad'][prioridad] += n
+        for empresa_id, mes, estado, horas in (
+            qs.values_list('empresa_id', 'mes', 'estado')
+            .annotate(horas=Coalesce(Sum('servicios_seleccionados__duracion_estimada_horas'), 0))
+        ):
+            fila = datos[(empresa_id, mes)]
+            fila['horas_estimadas'] += horas
+            fila['horas_por_estado'][estado] += horas
+        for empresa_id, mes, profesional_id, ordenes, horas in (
+            qs.values_list('empresa_id', 'mes', 'profesional_asignado_id')
+            .annotate(
+                ordenes=Count('id', distinct=True),
+                horas=Coalesce(Sum('servicios_seleccionados__duracion_estimada_horas'), 0),
+            )
+        ):
+            if profesional_id is None:
+                datos[(empresa_id, mes)]['sin_profesional'] += ordenes
+            else:
+                acumulado = por_profesional[(empresa_id, mes)][profesional_id]
+                acumulado[0] += ordenes
+                acumulado[1] += horas
+
+    ids = {pk for profesionales in por_profesional.values() for pk in profesionales}
+    nombres = {
+        pk: f'{nombres} {apellidos}'
+        for pk, nombres, apellidos in Profesional.objects.using(using).filter(pk__in=ids)
+        .values_list('id', 'nombres', 'apellidos')
+    }
+    for clave, profesionales in por_profesional.items():
+        total = datos[clave]['horas_estimadas']
+        datos[clave]['profesionales'] = sorted(
+            (
+                {
+                    'id': pk, 'nombre': nombres.get(pk, ''), 'ordenes': ordenes, 'horas': horas,
+                    'porcentaje_horas': round(100 * horas / total, 1) if total else 0,
+                }
+                for pk, (ordenes, horas) in profesionales.items()
+            ),
+            key=lambda fila: (-fila['horas'], fila['id']),
+        )
+    return dict(datos)
+
+
+def _calcular_lote(lote):
+    # En un proceso del pool (initializer=django.setup).
+    return calcular(*lote)
+
+
+@dataclass
+class Reporte:
+    empresa_id: int
+    mes: date
+    cerrado: bool
+    datos: dict
+
+
+@dataclass
+class ResultadoReportes:
+    reportes: list = field(default_factory=list)
+    empresas: dict = field(default_factory=dict)  # {id: (rut, razon_social)}
+    guardados: int = 0
+    sin_guardar: int = 0
+    desde_snapshot: int = 0
+    mes_en_curso: int = 0
+    lotes: int = 0
+
+    def mensaje(self):
+        sin_guardar = f', {self.sin_guardar} meses cerrados calculados sin guardar' if self.sin_guardar else ''
+        return (
+            f'{len(self.reportes)} reportes: {self.desde_snapshot} desde snapshots, '
+            f'{self.guardados} meses cerrados calculados y guardados{sin_guardar}, '
+            f'{self.mes_en_curso} del mes en curso ({self.lotes} lotes).'
+        )
+
+
+def generar(
+    empresa_ids=None, desde=None, hasta=None, procesos=1, regenerar=False, guardar=True, using=DEFAULT_DB_ALIAS,
+):
+    """
+    Reportes de `empresa_ids` (todas si es None) para los meses `desde` a
+    `hasta` (incluidos; None = sin límite). Con `regenerar` recalcula y
+    reemplaza los snapshots del rango; con guardar=False no escribe nada.
+    `procesos` > 1 usa un pool de procesos.
+    """
+    if regenerar and not guardar:
+        raise ValueError('regenerar requiere guardar.')
+    actual = mes_actual()
+    hasta = min(hasta, actual) if hasta is not None else actual
+    resultado = ResultadoReportes()
+
+    def en_rango(qs):
+        if empresa_ids is not None:
+            qs = qs.filter(empresa_id__in=empresa_ids)
+        if desde is not None:
+            qs = qs.filter(mes__gte=desde)
+        return qs.filter(mes__lte=hasta)
+
+    if regenerar:
+        en_rango(ReporteMensual.objects.using(using)).delete()
+    con_datos = set(
+        en_rango(EstadisticaOrden.objects.using(using)).filter(cantidad__gt=0)
+        .order_by().values_list('empresa_id', 'mes').distinct()
+    )
+    guardados = {
+        (empresa_id, mes): datos
+        for empresa_id, mes, datos in en_rango(ReporteMensual.objects.using(using)).values_list('empresa_id', 'mes', 'datos')
+    }
+    pendientes = {clave for clave in con_datos if clave not in guardados}
+
+    # Lotes de empresas con el primer mes pendiente de cada una: en régimen
+    # solo falta el mes en curso y cada consulta lee solo ese mes (índice empresa, fecha).
+    primero = {}
+    for empresa_id, mes in pendientes:
+        primero[empresa_id] = min(mes, primero.get(empresa_id, mes))
+    orden = sorted(primero, key=lambda pk: (primero[pk], pk))
+    lotes = [
+        (ids, min(primero[pk] for pk in ids), siguiente_mes(hasta), using)
+        for ids in (orden[inicio:inicio + LOTE_EMPRESAS] for inicio in range(0, len(orden), LOTE_EMPRESAS))
+    ]
+    resultado.lotes = len(lotes)
+    if procesos > 1 and len(lotes) > 1:
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(min(procesos, len(lotes)), mp_context=contexto, initializer=django.setup) as pool:
+            calculados = list(pool.map(_calcular_lote, lotes))
+    else:
+        calculados = [_calcular_lote(lote) for lote in lotes]
+
+    nuevos = {}
+    for parcial in calculados:
+        nuevos.update((clave, datos) for clave, datos in parcial.items() if clave in pendientes)
+    cerrados = [
+        ReporteMensual(empresa_id=empresa_id, mes=mes, datos=datos)
+        for (empresa_id, mes), datos in nuevos.items() if mes < actual
+    ]
+    if guardar:
+        with transaction.atomic(using=using):
+            # ignore_conflicts: otro proceso pudo guardar el mismo mes; el primero queda.
+            ReporteMensual.objects.using(using).bulk_create(cerrados, batch_size=1000, ignore_conflicts=True)
+        resultado.guardados = len(cerrados)
+    else:
+        resultado.sin_guardar = len(cerrados)
+    resultado.desde_snapshot = len(guardados)
+    resultado.mes_en_curso = len(nuevos) - len(cerrados)
+    todos = {**guardados, **nuevos}
+    resultado.reportes = [
+        Reporte(empresa_id, mes, mes < actual, todos[(empresa_id, mes)]) for empresa_id, mes in sorted(todos)
+    ]
+    resultado.empresas = {
+        pk: (rut, razon_social)
+        for pk, rut, razon_social in Empresa.objects.using(using)
+        .filter(pk__in={reporte.empresa_id for reporte in resultado.reportes}).values_list('id', 'rut', 'razon_social')
+    }
+    return resultado
+
+
+ENCABEZADOS = (
+    ['empresa_id', 'empresa_rut', 'empresa_razon_social', 'mes', 'cerrado', 'ordenes']
+    + [f'ordenes_{estado}' for estado in ESTADOS]
+    + [f'prioridad_{prioridad}' for prioridad in PRIORIDADES]
+    + ['horas_estimadas']
+    + [f'horas_{estado}' for estado in ESTADOS]
+    + ['sin_profesional', 'profesionales', 'utilizacion']
+)
+
+
+def fila_csv(reporte, empresas):
+    datos = reporte.datos
+    rut, razon_social = empresas.get(reporte.empresa_id, ('', ''))
+    utilizacion = '; '.join(
+        f"{fila['nombre']}: {fila['horas']} h ({fila['porcentaje_horas']}%)" for fila in datos['profesionales']
+    )
+    return (
+        [reporte.empresa_id, rut, razon_social, f'{reporte.mes:%Y-%m}', int(reporte.cerrado), datos['ordenes']]
+        + [datos['por_estado'].get(estado, 0) for estado in ESTADOS]
+        + [datos['por_prioridad'].get(prioridad, 0) for prioridad in PRIORIDADES]
+        + [datos['horas_estimadas']]
+        + [datos['horas_por_estado'].get(estado, 0) for estado in ESTADOS]
+        + [datos['sin_profesional'], len(datos['profesionales']), utilizacion]
+    )
+
+
+def generar_csv(resultado):
+    writer = csv.writer(_Eco())
+    yield '﻿' + writer.writerow(ENCABEZADOS)  # BOM para que Excel detecte UTF-8
+    for reporte in resultado.reportes:
+        yield writer.writerow(fila_csv(reporte, resultado.empresas))
+
+
+def como_dict(reporte, empresas):
+    rut, razon_social = empresas.get(reporte.empresa_id, ('', ''))
+    return {
+        'empresa': {'id': reporte.empresa_id, 'rut': rut, 'razon_social': razon_social},
+        'mes': f'{reporte.mes:%Y-%m}',
+        'cerrado': reporte.cerrado,
+        **reporte.datos,
+    }
+
+
+def generar_json(resultado):
+    """Lista JSON, un elemento por línea (se puede enviar en streaming)."""
+    yield '['
+    for indice, reporte in enumerate(resultado.reportes):
+        yield (',\n' if indice else '\n') + json.dumps(como_dict(reporte, resultado.empresas), ensure_ascii=False)
+    yield '\n]\n'
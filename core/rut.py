@@ -0,0 +1,47 @@
+import re
+
+from django.db.models import Q
+
+"""
+Normalización y búsqueda indexada de RUT/RUN chilenos.
+
+Los RUT se guardan tal como los escribe el usuario ('76.123.456-7'); además
+Empresa.rut_normalizado y Profesional.run_normalizado guardan solo dígitos y
+dígito verificador ('761234567'), indexados. Así '76123456-7', '76.123.456-7'
+y '761234567' encuentran la misma empresa sin un LIKE '%...%'.
+"""
+
+RUT_FORMATEADO = re.compile(r'[\d.]+(-[\dkK]?)?')
+RUT_SIN_FORMATO = re.compile(r'\d+[kK]?')
+MIN_DIGITOS = 7
+
+
+def normalizar_rut(valor):
+    """'76.123.456-k' --> '76123456K'. Quita puntos, guion, espacios y ceros a la izquierda."""
+    limpio = re.sub(r'[^0-9kK]', '', valor or '').upper()
+    return limpio.lstrip('0')
+
+
+def filtro_rut(campo, q):
+    """
+    Retorna un Q indexado sobre `campo` si `q` parece un RUT; si no, None.
+
+    - Con guion y dígito verificador ('76.123.456-7'): igualdad exacta.
+    - Parcial ('76.123.4', '7612345'): búsqueda por prefijo como rango
+      (campo >= n AND campo < siguiente(n)), que usa el índice en cualquier motor.
+
+    Con o sin puntos y guion se exigen al menos 7 dígitos (contados tras
+    normalizar) para no confundir números cortos ('2024', '1.5', '12-3')
+    con un RUT; esos textos siguen por la búsqueda de texto.
+    """
+    texto = (q or '').strip()
+    formateado = RUT_FORMATEADO.fullmatch(texto) and ('.' in texto or '-' in texto)
+    if not (formateado or RUT_SIN_FORMATO.fullmatch(texto)):
+        return None
+    normalizado = normalizar_rut(texto)
+    if len(normalizado.rstrip('K')) < MIN_DIGITOS:
+        return None
+    if re.search(r'-[\dkK]$', texto):
+        return Q(**{campo: normalizado})
+    siguiente = normalizado[:-1] + chr(ord(normalizado[-1]) + 1)
+    return Q(**{f'{campo}__gte': normalizado, f'{campo}__lt': siguiente})
@@ -0,0 +1,214 @@
+import re
+from dataclasses import dataclass
+
+from django.db import connections
+from django.db.models import F, Q
+
+from .models import Empresa, Servicio, Profesional, OrdenServicio, OrdenServicioArchivada
+
+"""
+Motor de búsqueda de texto completo para el parámetro GET 'q'.
+
+En SQLite se usa una tabla virtual FTS5 por modelo (tokenizador unicode61 con
+remove_diacritics, por lo que 'diagnostico' encuentra 'Diagnóstico'). Las
+tablas se crean en la migración 0003 y se mantienen sincronizadas con señales
+(core/signals.py). Los resultados se ordenan por relevancia (bm25).
+
+En otros motores, o si FTS5 no está disponible, se usa el filtro icontains
+original sobre `like_fields`.
+"""
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """
+    Definición de un índice FTS5.
+
+    source_sql: SELECT que produce (rowid, *columns) desde la tabla del modelo
+    con alias 't'; debe terminar en WHERE para poder agregar una condición.
+    """
+    model: type
+    table: str
+    columns: tuple
+    source_sql: str
+
+    @property
+    def base_table(self):
+        return self.model._meta.db_table
+
+
+SEARCH_INDEXES = {
+    Empresa: SearchIndex(
+        model=Empresa,
+        table='core_empresa_fts',
+        columns=('razon_social', 'rut', 'email'),
+        source_sql="SELECT t.id, t.razon_social, t.rut, t.email FROM core_empresa t WHERE",
+    ),
+    Servicio: SearchIndex(
+        model=Servicio,
+        table='core_servicio_fts',
+        columns=('nombre', 'descripcion', 'categoria'),
+        source_sql="SELECT t.id, t.nombre, t.descripcion, t.categoria FROM core_servicio t WHERE",
+    ),
+    Profesional: SearchIndex(
+        model=Profesional,
+        table='core_profesional_fts',
+        columns=('nombres', 'apellidos', 'run', 'email'),
+        source_sql="SELECT t.id, t.nombres, t.apellidos, t.run, t.email FROM core_profesional t WHERE",
+    ),
+    OrdenServicio: SearchIndex(
+        model=OrdenServicio,
+        table='core_ordenservicio_fts',
+        columns=('empresa', 'descripcion', 'profesional', 'servicios'),
+        source_sql=(
+            "SELECT t.id, e.razon_social || ' ' || e.rut, t.descripcion_requerimiento, "
+            "COALESCE(p.nombres || ' ' || p.apellidos, ''), "
+            "COALESCE((SELECT group_concat(s.nombre || ' ' || s.categoria, ' ') "
+            "FROM core_ordenservicio_servicios_seleccionados m "
+            "JOIN core_servicio s ON s.id = m.servicio_id WHERE m.ordenservicio_id = t.id), '') "
+            "FROM core_ordenservicio t "
+            "JOIN core_empresa e ON e.id = t.empresa_id "
+            "LEFT JOIN core_profesional p ON p.id = t.profesional_asignado_id WHERE"
+        ),
+    ),
+    # Mismo documento que OrdenServicio (migración 0010, core/archivo.py).
+    OrdenServicioArchivada: SearchIndex(
+        model=OrdenServicioArchivada,
+        table='core_ordenservicioarchivada_fts',
+        columns=('empresa', 'descripcion', 'profesional', 'servicios'),
+        source_sql=(
+            "SELECT t.id, e.razon_social || ' ' || e.rut, t.descripcion_requerimiento, "
+            "COALESCE(p.nombres || ' ' || p.apellidos, ''), "
+            "COALESCE((SELECT group_concat(s.nombre || ' ' || s.categoria, ' ') "
+            "FROM core_ordenservicioarchivada_servicios_seleccionados m "
+            "JOIN core_servicio s ON s.id = m.servicio_id WHERE m.ordenservicioarchivada_id = t.id), '') "
+            "FROM core_ordenservicioarchivada t "
+            "JOIN core_empresa e ON e.id = t.empresa_id "
+            "LEFT JOIN core_profesional p ON p.id = t.profesional_asignado_id WHERE"
+        ),
+    ),
+}
+
+TOKENIZER = 'unicode61 remove_diacritics 2'
+
+_fts_ready = {}
+
+
+def fts_available(using='default'):
+    """True si la conexión es SQLite y las tablas FTS5 existen (se consulta una vez por base)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, str(connection.settings_dict['NAME']))
+    if key not in _fts_ready:
+        tables = set(connection.introspection.table_names())
+        _fts_ready[key] = all(index.table in tables for index in SEARCH_INDEXES.values())
+    return _fts_ready[key]
+
+
+def reset_fts_cache():
+    _fts_ready.clear()
+
+
+def refresh(model, condition, params=(), using='default'):
+    """
+    Reindexa las filas de `model` que cumplen `condition` (SQL sobre alias 't').
+
+    Ejemplo: refresh(OrdenServicio, 't.empresa_id = %s', [empresa.pk])
+    """
+    if not fts_available(using):
+        return
+    index = SEARCH_INDEXES[model]
+    columns = ', '.join(('rowid',) + index.columns)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {index.table} WHERE rowid IN (SELECT t.id FROM {index.base_table} t WHERE {condition})",
+            params,
+        )
+        cursor.execute(f"INSERT INTO {index.table}({columns}) {index.source_sql} {condition}", params)
+
+
+def refresh_in(model, condition, values, using='default', batch_size=500):
+    """
+    Como refresh(), con una condición que contiene '{placeholders}' y se
+    ejecuta en lotes para no exceder el límite de parámetros de SQLite.
+
+    Ejemplo: refresh_in(Empresa, 't.rut IN ({placeholders})', ruts)
+    """
+    values = list(values)
+    for start in range(0, len(values), batch_size):
+        batch = values[start:start + batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        refresh(model, condition.format(placeholders=placeholders), batch, using)
+
+
+def refresh_ids(model, ids, using='default'):
+    refresh_in(model, 't.id IN ({placeholders})', ids, using)
+
+
+def remove(model, pk, using='default'):
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_INDEXES[model].table} WHERE rowid = %s", [pk])
+
+
+def remove_ids(model, ids, using='default', batch_size=500):
+    if not fts_available(using):
+        return
+    ids = list(ids)
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM {SEARCH_INDEXES[model].table} WHERE rowid IN ({placeholders})", batch)
+
+
+def rebuild(using='default'):
+    """Reconstruye todos los índices desde cero."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES.values():
+            cursor.execute(f"DELETE FROM {index.table}")
+    for model in SEARCH_INDEXES:
+        refresh(model, '1 = 1', using=using)
+
+
+def match_expression(q):
+    """
+    Convierte el texto del usuario en una expresión MATCH de FTS5.
+
+    Cada palabra se busca como prefijo y todas deben aparecer:
+    'diag tecno' --> '"diag"* "tecno"*'. Retorna None si no hay palabras.
+    """
+    terms = re.findall(r'\w+', q)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def like_filter(queryset, q, like_fields):
+    condition = Q()
+    for field in like_fields:
+        condition |= Q(**{f'{field}__icontains': q})
+    return queryset.filter(condition)
+
+
+def search(queryset, q, like_fields):
+    """
+    Filtra `queryset` por el texto `q`.
+
+    Retorna (queryset, ranked). Con FTS5, ranked=True y cada objeto tiene el
+    atributo search_rank (menor es más relevante). Si no, aplica icontains
+    sobre like_fields y ranked=False.
+    """
+    index = SEARCH_INDEXES.get(queryset.model)
+    expression = match_expression(q)
+    if index is None or expression is None or not fts_available(queryset.db):
+        return like_filter(queryset, q, like_fields), False
+    # JOIN con la tabla FTS (rowid = id): FTS5 resuelve el MATCH una sola vez.
+    return (
+        queryset.filter(busqueda__documento__match=expression)
+        .annotate(search_rank=F('busqueda__rank')),
+        True,
+    )
@@ -0,0 +1,203 @@
+from collections import Counter
+
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import cache, cargas, estadisticas, search
+from .models import Empresa, Servicio, Profesional, OrdenServicio, OrdenServicioArchivada, OrdenTransicion
+
+"""
+Señales que mantienen sincronizados los índices de búsqueda FTS5 (core/search.py),
+la tabla de estadísticas de órdenes (core/estadisticas.py), la carga por
+profesional (core/cargas.py), las generaciones de la caché de vistas
+(core/cache.py) y el historial OrdenTransicion de los cambios de estado
+hechos con save().
+
+El documento de una orden incluye datos de su empresa, profesional y servicios,
+por lo que los cambios en esos modelos también reindexan las órdenes afectadas
+(activas y archivadas).
+Se registran en CoreConfig.ready().
+"""
+
+
+@receiver(post_save, sender=Empresa)
+def empresa_guardada(sender, instance, using, **kwargs):
+    search.refresh_ids(Empresa, [instance.pk], using)
+    search.refresh(OrdenServicio, 't.empresa_id = %s', [instance.pk], using)
+    search.refresh(OrdenServicioArchivada, 't.empresa_id = %s', [instance.pk], using)
+
+
+@receiver(post_delete, sender=Empresa)
+def empresa_eliminada(sender, instance, using, **kwargs):
+    search.remove(Empresa, instance.pk, using)
+
+
+@receiver(post_save, sender=Servicio)
+def servicio_guardado(sender, instance, using, **kwargs):
+    search.refresh_ids(Servicio, [instance.pk], using)
+    search.refresh(
+        OrdenServicio,
+        't.id IN (SELECT ordenservicio_id FROM core_ordenservicio_servicios_seleccionados WHERE servicio_id = %s)',
+        [instance.pk],
+        using,
+    )
+    search.refresh(
+        OrdenServicioArchivada,
+        't.id IN (SELECT ordenservicioarchivada_id FROM core_ordenservicioarchivada_servicios_seleccionados '
+        'WHERE servicio_id = %s)',
+        [instance.pk],
+        using,
+    )
+
+
+@receiver(pre_delete, sender=Servicio)
+def servicio_por_eliminar(sender, instance, **kwargs):
+    # Después del delete ya no existen las filas M2M: se guardan las órdenes afectadas.
+    instance._ordenes_afectadas = list(instance.ordenes.values_list('pk', flat=True))
+    instance._archivadas_afectadas = list(instance.ordenes_archivadas.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Servicio)
+def servicio_eliminado(sender, instance, using, **kwargs):
+    search.remove(Servicio, instance.pk, using)
+    search.refresh_ids(OrdenServicio, getattr(instance, '_ordenes_afectadas', []), using)
+    search.refresh_ids(OrdenServicioArchivada, getattr(instance, '_archivadas_afectadas', []), using)
+    cargas.recalcular_ordenes(getattr(instance, '_ordenes_afectadas', []), using)
+
+
+@receiver(post_save, sender=Servicio)
+def servicio_guardado_carga(sender, instance, created, using, **kwargs):
+    # La duración estimada puede haber cambiado: cambia la carga de quienes tienen órdenes abiertas con él.
+    if not created:
+        cargas.recalcular(
+            OrdenServicio.objects.using(using)
+            .filter(servicios_seleccionados=instance, estado__in=cargas.ESTADOS_ABIERTOS)
+            .exclude(profesional_asignado=None)
+            .values_list('profesional_asignado_id', flat=True).distinct(),
+            using,
+        )
+
+
+@receiver(post_save, sender=Profesional)
+def profesional_guardado(sender, instance, using, **kwargs):
+    search.refresh_ids(Profesional, [instance.pk], using)
+    search.refresh(OrdenServicio, 't.profesional_asignado_id = %s', [instance.pk], using)
+    search.refresh(OrdenServicioArchivada, 't.profesional_asignado_id = %s', [instance.pk], using)
+
+
+@receiver(pre_delete, sender=Profesional)
+def profesional_por_eliminar(sender, instance, **kwargs):
+    # SET_NULL actualiza las órdenes (activas y archivadas) con update(), sin señales.
+    instance._ordenes_afectadas = list(instance.ordenes.values_list('pk', flat=True))
+    instance._archivadas_afectadas = list(instance.ordenes_archivadas.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Profesional)
+def profesional_eliminado(sender, instance, using, **kwargs):
+    search.remove(Profesional, instance.pk, using)
+    search.refresh_ids(OrdenServicio, getattr(instance, '_ordenes_afectadas', []), using)
+    search.refresh_ids(OrdenServicioArchivada, getattr(instance, '_archivadas_afectadas', []), using)
+
+
+@receiver(pre_save, sender=OrdenServicio)
+def orden_por_guardar(sender, instance, using, **kwargs):
+    # Valores actuales en la base, para descontarlos del resumen y de la carga en post_save.
+    instance._clave_estadistica = None
+    instance._profesional_anterior = None
+    if not instance._state.adding and instance.pk is not None:
+        anterior = (
+            sender.objects.using(using).filter(pk=instance.pk)
+            .values_list('empresa_id', 'fecha_creacion', 'estado', 'prioridad', 'profesional_asignado_id').first()
+        )
+        if anterior is not None:
+            empresa_id, fecha, estado, prioridad, profesional_id = anterior
+            instance._clave_estadistica = (empresa_id, estadisticas.mes_de(fecha), estado, prioridad)
+            instance._profesional_anterior = profesional_id
+
+
+@receiver(post_save, sender=OrdenServicio)
+def orden_guardada(sender, instance, using, **kwargs):
+    search.refresh_ids(OrdenServicio, [instance.pk], using)
+    anterior = getattr(instance, '_clave_estadistica', None)
+    actual = estadisticas.clave(instance)
+    if anterior != actual:
+        deltas = Counter({actual: 1})
+        if anterior is not None:
+            deltas[anterior] -= 1
+        estadisticas.aplicar_deltas(deltas, using)
+    profesional_anterior = getattr(instance, '_profesional_anterior', None)
+    estado_anterior = anterior[2] if anterior is not None else None
+    if (profesional_anterior, estado_anterior) != (instance.profesional_asignado_id, instance.estado):
+        cargas.recalcular({profesional_anterior, instance.profesional_asignado_id}, using)
+    if anterior is not None and anterior[2] != instance.estado:
+        # _usuario_transicion lo asigna la vista de edición (request.user).
+        usuario = getattr(instance, '_usuario_transicion', None)
+        OrdenTransicion.objects.using(using).create(
+            orden=instance, estado_anterior=anterior[2], estado_nuevo=instance.estado,
+            usuario_id=getattr(usuario, 'pk', None),
+        )
+    instance._clave_estadistica = actual
+    instance._profesional_anterior = instance.profesional_asignado_id
+
+
+@receiver(post_delete, sender=OrdenServicio)
+def orden_eliminada(sender, instance, using, **kwargs):
+    search.remove(OrdenServicio, instance.pk, using)
+    estadisticas.aplicar_deltas(Counter({estadisticas.clave(instance): -1}), using)
+    if instance.estado in cargas.ESTADOS_ABIERTOS:
+        cargas.recalcular([instance.profesional_asignado_id], using)
+
+
+@receiver(m2m_changed, sender=OrdenServicio.servicios_seleccionados.through)
+def servicios_de_orden_cambiados(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.refresh_ids(OrdenServicio, [instance.pk], using)
+    elif action == 'post_clear':
+        # servicio.ordenes.clear(): pk_set es None, se reindexa desde pre_clear.
+        search.refresh_ids(OrdenServicio, getattr(instance, '_ordenes_afectadas', []), using)
+    else:
+        search.refresh_ids(OrdenServicio, pk_set or [], using)
+
+
+@receiver(m2m_changed, sender=OrdenServicio.servicios_seleccionados.through)
+def servicios_de_orden_carga(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        if instance.estado in cargas.ESTADOS_ABIERTOS:
+            cargas.recalcular([instance.profesional_asignado_id], using)
+    elif action == 'post_clear':
+        cargas.recalcular_ordenes(getattr(instance, '_ordenes_afectadas', []), using)
+    else:
+        cargas.recalcular_ordenes(pk_set or [], using)
+
+
+@receiver(m2m_changed, sender=OrdenServicio.servicios_seleccionados.through)
+def servicios_de_orden_por_limpiar(sender, instance, action, reverse, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._ordenes_afectadas = list(instance.ordenes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_save, sender=Servicio)
+@receiver(post_save, sender=Profesional)
+@receiver(post_save, sender=OrdenServicio)
+@receiver(post_delete, sender=Empresa)
+@receiver(post_delete, sender=OrdenServicio)
+def invalidar_cache(sender, using, **kwargs):
+    cache.invalidar(sender, using=using)
+
+
+@receiver(post_delete, sender=Servicio)
+@receiver(post_delete, sender=Profesional)
+def invalidar_cache_con_ordenes(sender, using, **kwargs):
+    # Eliminan filas M2M o ponen en NULL el profesional de órdenes (activas y archivadas) sin señales.
+    cache.invalidar(sender, OrdenServicio, OrdenServicioArchivada, using=using)
+
+
+@receiver(m2m_changed, sender=OrdenServicio.servicios_seleccionados.through)
+def invalidar_cache_servicios_de_orden(sender, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        cache.invalidar(OrdenServicio, using=using)
@@ -0,0 +1,108 @@
+"""
+Tareas de la cola de trabajos (core/jobs.py). Se registran al importar este
+módulo desde CoreConfig.ready().
+
+Cada una recibe el Contexto (ctx.job, ctx.avanzar()) y los parámetros del
+Job, y retorna un resultado JSON. Los archivos que generan quedan en
+settings.CORE_JOBS_DIR y se descargan desde /jobs/<id>/descarga/.
+"""
+
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpRequest, QueryDict
+
+from . import archivo, asignacion, db, eliminacion, reportes, transiciones
+from .export import filas_exportacion
+from .jobs import tarea
+
+
+def ruta_archivo(nombre):
+    directorio = Path(settings.CORE_JOBS_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio / nombre
+
+
+@tarea('exportar_ordenes', timeout=2 * 3600)
+def exportar_ordenes(ctx, formato='csv', filtros=''):
+    """Exportación de OrdenServicioExportView a un archivo, con los mismos filtros GET (`filtros`)."""
+    from .views import OrdenServicioExportView
+
+    request = HttpRequest()
+    request.GET = QueryDict(filtros)
+    vista = OrdenServicioExportView()
+    vista.setup(request)
+    if formato not in vista.formatos:
+        raise ValueError(f'Formato inválido: {formato}')
+    generar, _ = vista.formatos[formato]
+    # Como la vista: se lee de la réplica (core.db). En SQLite los avances no
+    # pueden escribirse por la conexión que mantiene abierta la lectura.
+    with db.lectura():
+        queryset = vista.get_queryset()
+        queryset = queryset.using(queryset.db)
+    total = queryset.count()
+
+    def filas():
+        for n, fila in enumerate(filas_exportacion(queryset, vista.chunk_size), start=1):
+            if n % vista.chunk_size == 0:
+                ctx.avanzar(100 * n // total, f'{n} de {total} órdenes')
+            yield fila
+
+    ruta = ruta_archivo(f'job_{ctx.job.pk}.{formato}')
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with open(temporal, 'w', encoding='utf-8', newline='') as salida:
+        salida.writelines(generar(filas()))
+    # Un reintento nunca deja a la vista un archivo a medio escribir.
+    os.replace(temporal, ruta)
+    return {'archivo': ruta.name, 'filas': total}
+
+
+@tarea('asignar_profesionales')
+def asignar_profesionales(ctx, capacidad=None):
+    resultado = asignacion.asignar(capacidad=capacidad)
+    return {'asignadas': resultado.actualizadas, 'sin_candidato': len(resultado.sin_candidato), 'mensaje': resultado.mensaje()}
+
+
+@tarea('transicionar_ordenes')
+def transicionar_ordenes(ctx, estado, ids):
+    return transiciones.transicionar_a(ids, estado, ctx.job.usuario).como_dict()
+
+
+@tarea('archivar_ordenes', timeout=6 * 3600)
+def archivar_ordenes(ctx, dias=None, lote=archivo.LOTE):
+    total = archivo.archivables(dias).count()
+
+    def progreso(resultado):
+        ctx.avanzar(100 * resultado.ordenes // total if total else None, f'lote {resultado.lotes}: {resultado.ordenes} órdenes')
+
+    resultado = archivo.archivar(dias, lote, progreso=progreso)
+    return {'ordenes': resultado.ordenes, 'lotes': resultado.lotes, 'mensaje': resultado.mensaje()}
+
+
+@tarea('procesar_eliminaciones', timeout=6 * 3600)
+def procesar_eliminaciones(ctx, lote=eliminacion.LOTE):
+    def progreso(resultado):
+        ctx.avanzar(mensaje=f'lote {resultado.lotes}: {resultado.ordenes_eliminadas} eliminadas, '
+                            f'{resultado.ordenes_desasignadas} sin profesional')
+
+    resultado = eliminacion.procesar(lote, progreso=progreso)
+    return {'empresas': resultado.empresas, 'profesionales': resultado.profesionales, 'mensaje': resultado.mensaje()}
+
+
+@tarea('generar_reportes', timeout=2 * 3600)
+def generar_reportes(ctx, formato='csv', empresas=None, desde=None, hasta=None, procesos=1):
+    """Reporte mensual (core/reportes.py) a un archivo; `desde` y `hasta` en formato AAAA-MM."""
+    generar = {'csv': reportes.generar_csv, 'json': reportes.generar_json}.get(formato)
+    if generar is None:
+        raise ValueError(f'Formato inválido: {formato}')
+    desde, hasta = (reportes.leer_mes(mes) if mes else None for mes in (desde, hasta))
+    ctx.avanzar(0, 'calculando meses sin snapshot')
+    resultado = reportes.generar(empresas, desde, hasta, procesos=procesos)
+    ctx.avanzar(90, resultado.mensaje())
+    ruta = ruta_archivo(f'job_{ctx.job.pk}.{formato}')
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    with open(temporal, 'w', encoding='utf-8', newline='') as salida:
+        salida.writelines(generar(resultado))
+    os.replace(temporal, ruta)
+    return {'archivo': ruta.name, 'filas': len(resultado.reportes), 'mensaje': resultado.mensaje()}
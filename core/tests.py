@@ -0,0 +1,933 @@
+import csv
+import json
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.template.response import SimpleTemplateResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import archivo, cache, cargas, eliminacion, estadisticas, jobs, metricas, planes, reportes, transiciones
+from .admin import ListadoEscalableMixin
+from .cache import get_cache
+from .db import ALIAS_REPLICA, LecturaRouter, lectura
+from .middleware import QueryBudgetExceeded, count_queries, max_queries
+from .importer import ImportadorEmpresas, ImportadorProfesionales
+from .management.commands.seed import formatear_rut
+from .models import (
+    Empresa, EstadisticaOrden, Job, OrdenServicio, OrdenServicioArchivada, OrdenTransicion, Profesional, ReporteMensual,
+    Servicio,
+)
+from .rut import filtro_rut, normalizar_rut
+from .search import search
+from .views import EmpresaListView, OrdenServicioListView
+
+"""
+Tests de core: python manage.py test core
+
+Los datos se generan con `manage.py seed` (pocas filas, deterministas).
+QUERY_BUDGET_STRICT está activo: una vista que excede su query_budget
+falla con QueryBudgetExceeded.
+"""
+
+
+def seed(ordenes, empresas=10, profesionales=5):
+    call_command(
+        'seed', orders=ordenes, empresas=empresas, profesionales=profesionales, verbosity=0, stdout=StringIO(),
+    )
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CoreTestCase(TestCase):
+    ordenes = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(cls.ordenes)
+        cls.staff = get_user_model().objects.create_user('staff', password='x', is_staff=True, is_superuser=True)
+
+    def setUp(self):
+        # La caché de vistas no se revierte con la transacción de cada test.
+        get_cache().clear()
+
+    def assertEstadisticasAlDia(self):
+        """EstadisticaOrden coincide con un GROUP BY sobre las órdenes activas y archivadas."""
+        esperadas = estadisticas.conteos_por_clave(OrdenServicio.objects.all())
+        esperadas.update(estadisticas.conteos_por_clave(OrdenServicioArchivada.objects.all()))
+        guardadas = EstadisticaOrden.objects.filter(cantidad__gt=0).values_list(
+            'empresa_id', 'mes', 'estado', 'prioridad', 'cantidad',
+        )
+        self.assertEqual({fila[:4]: fila[4] for fila in guardadas}, dict(+esperadas))
+
+    def assertCargasAlDia(self):
+        """Profesional.ordenes_abiertas coincide con sus órdenes abiertas."""
+        esperadas = Counter()
+        for (profesional_id, _), (ordenes, _) in cargas.calcular().items():
+            esperadas[profesional_id] += ordenes
+        guardadas = Profesional.objects.filter(ordenes_abiertas__gt=0).values_list('id', 'ordenes_abiertas')
+        self.assertEqual(dict(guardadas), dict(esperadas))
+
+
+class OrdenApiArchivadasTests(CoreTestCase):
+    """/api/ordenes/?archivadas=1 combina tuplas de órdenes activas y archivadas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        archivo.archivar(dias=0)
+        cls.archivadas = set(OrdenServicioArchivada.objects.values_list('id', flat=True))
+
+    def recorrer(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            datos = response.json()
+            ids += [item['id'] for item in datos['results']]
+            url = datos['next'] and '/api/ordenes/' + datos['next']
+        return ids
+
+    def test_incluye_archivadas(self):
+        self.assertTrue(self.archivadas)
+        for autenticado in (False, True):
+            with self.subTest(autenticado=autenticado):
+                if autenticado:
+                    self.client.force_login(self.staff)
+                ids = self.recorrer('/api/ordenes/?archivadas=1')
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(set(ids), set(OrdenServicio.objects.values_list('id', flat=True)) | self.archivadas)
+
+    def test_sin_archivadas(self):
+        ids = self.recorrer('/api/ordenes/')
+        self.assertFalse(self.archivadas & set(ids))
+        self.assertEqual(len(ids), OrdenServicio.objects.count())
+
+    def test_total_una_consulta(self):
+        self.client.force_login(self.staff)
+        with count_queries() as sin_total:
+            self.client.get('/api/ordenes/?archivadas=1')
+        get_cache().clear()
+        with count_queries() as con_total:
+            response = self.client.get('/api/ordenes/?archivadas=1&total=1')
+        self.assertEqual(response.json()['total'], OrdenServicio.objects.count() + len(self.archivadas))
+        self.assertEqual(con_total.count, sin_total.count + 1)
+
+    def test_embed_y_total(self):
+        response = self.client.get('/api/ordenes/?archivadas=1&embed=empresa,servicios&total=1&estado=finalizada')
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(
+            datos['total'],
+            OrdenServicio.objects.filter(estado='finalizada').count()
+            + OrdenServicioArchivada.objects.filter(estado='finalizada').count(),
+        )
+        archivada = next(item for item in datos['results'] if item['id'] in self.archivadas)
+        orden = OrdenServicioArchivada.objects.get(pk=archivada['id'])
+        self.assertEqual(archivada['empresa']['id'], orden.empresa_id)
+        self.assertEqual(
+            sorted(servicio['id'] for servicio in archivada['servicios']),
+            sorted(orden.servicios_seleccionados.values_list('id', flat=True)),
+        )
+
+
+class ArchivoTests(CoreTestCase):
+    """Archivo por lotes de órdenes cerradas (core/archivo.py)."""
+
+    def test_invalida_cache_por_lote(self):
+        archivables = archivo.archivables(dias=0).count()
+        lote = archivables // 3 + 1
+        with mock.patch.object(cache, 'invalidar', wraps=cache.invalidar) as invalidar:
+            llamadas = []
+            resultado = archivo.archivar(dias=0, batch_size=lote, progreso=lambda _: llamadas.append(invalidar.call_count))
+        self.assertEqual((resultado.ordenes, resultado.lotes), (archivables, 3))
+        self.assertEqual(llamadas, [1, 2, 3])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Interpreta planes de SQLite.')
+class QueryPlanTests(CoreTestCase):
+    """Las consultas de las ListViews usan índices (core/planes.py, también manage.py check_query_plans)."""
+
+    def test_sin_escaneos_completos(self):
+        for name, view_class, params, with_cursor in planes.SCENARIOS:
+            with self.subTest(name):
+                plan, scans = planes.explain(view_class, params, with_cursor)
+                self.assertEqual(scans, [], f'escaneo completo de {", ".join(scans)}:\n{plan}')
+
+    def test_escaneo_de_indice_es_completo(self):
+        view = OrdenServicioListView()
+        view.setup(RequestFactory().get('/'))
+        plan = 'SCAN core_ordenservicio USING INDEX orden_fecha_id_idx'
+        self.assertEqual(planes.full_scans(plan, view, {}), [])
+        self.assertEqual(planes.full_scans(plan, view, {'estado': 'nueva'}), ['core_ordenservicio USING orden_fecha_id_idx'])
+        self.assertEqual(
+            planes.full_scans('SCAN core_ordenservicio USING COVERING INDEX orden_empresa_fecha_idx', view, {}),
+            ['core_ordenservicio USING orden_empresa_fecha_idx'],
+        )
+        self.assertEqual(planes.full_scans(plan + '\nUSE TEMP B-TREE FOR ORDER BY', view, {}), ['core_ordenservicio USING orden_fecha_id_idx'])
+
+
+class AdminChangelistTests(CoreTestCase):
+    """
+    El GET al changelist hace siempre las mismas consultas (ListadoEscalableMixin):
+    sesión, usuario, conteo acotado y página, más el valor del filtro de empresa.
+    """
+    consultas = {
+        'admin:core_ordenservicio_changelist': {'': 4, '?estado__exact=nueva': 4, '?q=76': 4, '?empresa=1': 5},
+        'admin:core_empresa_changelist': {'': 4, '?q=comercial': 4, '?q=76.000.001-9': 4},
+    }
+
+    def verificar(self):
+        for nombre, por_query in self.consultas.items():
+            for query, n in por_query.items():
+                url = reverse(nombre) + query
+                with self.subTest(url=url, ordenes=OrdenServicio.objects.count()), self.assertNumQueries(n):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_consultas_constantes(self):
+        self.client.force_login(self.staff)
+        self.verificar()
+        seed(2000, empresas=200)
+        get_cache().clear()
+        self.verificar()
+
+    def test_dentro_del_presupuesto(self):
+        for por_query in self.consultas.values():
+            self.assertLessEqual(max(por_query.values()), ListadoEscalableMixin.changelist_query_budget)
+
+
+class QueryBudgetTests(CoreTestCase):
+    """
+    query_budget de los listados y detalles (core.middleware). Subir un
+    presupuesto obliga a cambiar este test; una consulta N+1 nueva lo excede.
+    """
+    presupuestos = {
+        'empresa_list': 4, 'empresa_detail': 6,
+        'servicio_list': 4, 'servicio_detail': 4,
+        'profesional_list': 4, 'profesional_detail': 4,
+        'orden_list': 5, 'orden_detail': 6,
+        'dashboard': 6,
+        'api_empresa_list': 4, 'api_empresa_detail': 4,
+        'api_servicio_list': 4, 'api_servicio_detail': 4,
+        'api_profesional_list': 4, 'api_profesional_detail': 4,
+        'api_orden_list': 6, 'api_orden_detail': 6,
+    }
+    consultas = {
+        'empresa_list': ('', '?q=comercial', '?q=76.000.001-9'),
+        'orden_list': ('', '?estado=nueva&prioridad=alta', '?q=mantencion', '?archivadas=1', '?empresa=76.000.001-9'),
+        'api_orden_list': (
+            '', '?embed=empresa,profesional_asignado,servicios', '?archivadas=1&embed=servicios',
+            '?total=1', '?archivadas=1&total=1', '?archivadas=1&total=1&embed=servicios&q=mantencion',
+        ),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        archivo.archivar(dias=0)
+
+    def vista(self, nombre):
+        return resolve(reverse(nombre, args=[1] if nombre.endswith('_detail') else [])).func.view_class
+
+    def url(self, nombre):
+        if not nombre.endswith('_detail'):
+            return reverse(nombre)
+        pk = self.vista(nombre).model._default_manager.order_by('-pk').values_list('pk', flat=True)[0]
+        return reverse(nombre, args=[pk])
+
+    def test_presupuestos(self):
+        for nombre, presupuesto in self.presupuestos.items():
+            with self.subTest(nombre):
+                self.assertEqual(self.vista(nombre).query_budget, presupuesto)
+
+    def test_vistas_dentro_del_presupuesto(self):
+        self.client.force_login(self.staff)
+        for nombre, presupuesto in self.presupuestos.items():
+            for query in self.consultas.get(nombre, ('',)):
+                url = self.url(nombre) + query
+                with self.subTest(url), max_queries(presupuesto):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_modo_estricto(self):
+        self.client.force_login(self.staff)
+        url = reverse('empresa_list')
+        with override_settings(QUERY_BUDGETS={'empresa_list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url)
+            get_cache().clear()
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('core.querybudget', 'WARNING'):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_relaciones_sin_n_mas_1(self):
+        # Las consultas de la orden no crecen con sus servicios ni con las empresas de la página.
+        self.client.force_login(self.staff)
+        orden = OrdenServicio.objects.create(empresa=Empresa.objects.first(), descripcion_requerimiento='x')
+        url = reverse('orden_detail', args=[orden.pk])
+        conteos = []
+        for servicios in (Servicio.objects.all()[:1], Servicio.objects.all()[:8]):
+            orden.servicios_seleccionados.set(servicios)
+            with count_queries() as contador:
+                self.assertContains(self.client.get(url), servicios[0].nombre)
+            conteos.append(contador.count)
+        with count_queries() as contador:
+            self.client.get(reverse('orden_list'))
+        seed(100, empresas=100)
+        with count_queries() as muchas_empresas:
+            self.client.get(reverse('orden_list'))
+        conteos += [contador.count, muchas_empresas.count]
+        self.assertEqual(conteos[0], conteos[1])
+        self.assertEqual(conteos[2], conteos[3])
+
+    def test_max_queries(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with max_queries(1):
+                list(Empresa.objects.all())
+                list(Servicio.objects.all())
+
+
+class BusquedaArchivadasTests(CoreTestCase):
+    """Eliminar un profesional o un servicio reindexa sus órdenes activas y archivadas (core/signals.py)."""
+
+    def encontrada(self, modelo, orden, texto):
+        qs, _ = search(modelo.objects.filter(pk=orden.pk), texto, OrdenServicioListView.search_fields)
+        return qs.exists()
+
+    def test_eliminar_profesional(self):
+        archivo.archivar(dias=0)
+        archivada = OrdenServicioArchivada.objects.exclude(profesional_asignado=None).first()
+        profesional = archivada.profesional_asignado
+        activa = OrdenServicio.objects.create(
+            empresa=archivada.empresa, profesional_asignado=profesional, descripcion_requerimiento='Revisión',
+        )
+        profesional.apellidos = 'Zzyzx'
+        profesional.save()
+        self.assertTrue(self.encontrada(OrdenServicioArchivada, archivada, 'Zzyzx'))
+        self.assertTrue(self.encontrada(OrdenServicio, activa, 'Zzyzx'))
+
+        profesional.delete()
+        self.assertFalse(self.encontrada(OrdenServicioArchivada, archivada, 'Zzyzx'))
+        self.assertFalse(self.encontrada(OrdenServicio, activa, 'Zzyzx'))
+
+    def test_eliminar_servicio(self):
+        archivo.archivar(dias=0)
+        archivada = OrdenServicioArchivada.objects.filter(servicios_seleccionados__isnull=False).first()
+        servicio = archivada.servicios_seleccionados.first()
+        servicio.nombre = 'Qwyxz'
+        servicio.save()
+        self.assertTrue(self.encontrada(OrdenServicioArchivada, archivada, 'Qwyxz'))
+        generacion = cache.generaciones([OrdenServicioArchivada])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            servicio.delete()
+        self.assertFalse(self.encontrada(OrdenServicioArchivada, archivada, 'Qwyxz'))
+        self.assertNotEqual(cache.generaciones([OrdenServicioArchivada]), generacion)
+
+
+class FiltroRutTests(CoreTestCase):
+    """filtro_rut solo reemplaza la búsqueda de texto cuando el texto tiene forma de RUT (core/rut.py)."""
+
+    def test_numeros_cortos(self):
+        for texto in ('1.5', '3-1', '12-3', '2024', '1.234.5', 'comercial'):
+            with self.subTest(texto):
+                self.assertIsNone(filtro_rut('rut_normalizado', texto))
+
+    def test_rut(self):
+        empresa = Empresa.objects.order_by('pk').first()
+        for texto in (empresa.rut, empresa.rut_normalizado, empresa.rut.rsplit('-', 1)[0], empresa.rut[:9]):
+            with self.subTest(texto):
+                self.assertIn(empresa, Empresa.objects.filter(filtro_rut('rut_normalizado', texto)))
+
+    def test_listado_busca_texto(self):
+        empresa = Empresa.objects.order_by('pk').first()
+        empresa.razon_social = 'Bodega 12-3'
+        empresa.save()
+        response = self.client.get(reverse('empresa_list') + '?q=12-3')
+        self.assertIn(empresa, response.context['object_list'])
+
+
+class LecturaRouterTests(SimpleTestCase):
+    """LecturaRouter envía a 'replica' solo las lecturas dentro de lectura() (core/db.py)."""
+
+    def test_db_for_read(self):
+        router = LecturaRouter()
+        self.assertIsNone(router.db_for_read(Empresa))
+        with lectura():
+            self.assertIsNone(router.db_for_read(Empresa))
+            with mock.patch('core.db.replica_configurada', return_value=True):
+                self.assertEqual(router.db_for_read(Empresa), ALIAS_REPLICA)
+        with mock.patch('core.db.replica_configurada', return_value=True):
+            self.assertIsNone(router.db_for_read(Empresa))
+
+
+class ImportadorTests(CoreTestCase):
+    """Importación masiva (core/importer.py, manage.py import_data)."""
+    columnas_ordenes = ('empresa_rut', 'profesional_run', 'servicios', 'estado', 'prioridad', 'descripcion_requerimiento')
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        self.empresa = Empresa.objects.order_by('pk').first()
+        self.profesional = Profesional.objects.order_by('pk').first()
+        self.servicio = Servicio.objects.order_by('pk').first()
+
+    def archivo(self, nombre, filas, columnas=None):
+        ruta = self.directorio / nombre
+        if nombre.endswith('.ndjson'):
+            ruta.write_text(''.join(json.dumps(fila) + '\n' for fila in filas), encoding='utf-8')
+        else:
+            with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+                escritor = csv.DictWriter(archivo, columnas or list(filas[0]))
+                escritor.writeheader()
+                escritor.writerows(filas)
+        return str(ruta)
+
+    def importar(self, entidad, ruta, *args):
+        salida, errores = StringIO(), StringIO()
+        call_command('import_data', entidad, ruta, *args, stdout=salida, stderr=errores)
+        return salida.getvalue(), errores.getvalue()
+
+    def orden(self, descripcion, empresa_rut=None, servicios=None, profesional_run=''):
+        return {
+            'empresa_rut': empresa_rut or self.empresa.rut, 'profesional_run': profesional_run,
+            'servicios': self.servicio.nombre if servicios is None else servicios,
+            'estado': 'nueva', 'prioridad': 'alta', 'descripcion_requerimiento': descripcion,
+        }
+
+    def test_upsert_por_clave(self):
+        nueva = formatear_rut(99_000_001)
+        self.importar('empresas', self.archivo('empresas.csv', [
+            {'rut': normalizar_rut(self.empresa.rut), 'razon_social': 'Renombrada SpA', 'email': 'a@example.com'},
+            {'rut': nueva, 'razon_social': 'Nueva Ltda', 'email': 'b@example.com'},
+        ], columnas=ImportadorEmpresas.columnas))
+        self.importar('servicios', self.archivo('servicios.ndjson', [
+            {'nombre': self.servicio.nombre, 'categoria': 'Otra', 'duracion_estimada_horas': 3, 'activo': 'no'},
+        ]))
+        self.importar('profesionales', self.archivo('profesionales.csv', [
+            {'run': self.profesional.run, 'nombres': 'Ana', 'apellidos': 'Reimportada', 'email': 'c@example.com'},
+        ]))
+
+        self.assertEqual(Empresa.objects.filter(razon_social='Renombrada SpA').get().pk, self.empresa.pk)
+        self.assertTrue(Empresa.objects.filter(rut=nueva, rut_normalizado=normalizar_rut(nueva)).exists())
+        self.servicio.refresh_from_db()
+        self.assertEqual((self.servicio.categoria, self.servicio.duracion_estimada_horas, self.servicio.activo), (
+            'Otra', 3, False,
+        ))
+        self.assertEqual(Profesional.objects.get(apellidos='Reimportada').pk, self.profesional.pk)
+        qs, _ = search(Empresa.objects.all(), 'Renombrada', EmpresaListView.search_fields)
+        self.assertEqual(list(qs), [self.empresa])
+
+    def test_dry_run(self):
+        antes = OrdenServicio.objects.count()
+        ruta = self.archivo('ordenes.csv', [self.orden('Seca'), self.orden('Seca 2')])
+        salida, _ = self.importar('ordenes', ruta, '--dry-run')
+        self.assertIn('2 validadas', salida)
+        self.assertEqual(OrdenServicio.objects.count(), antes)
+        self.assertFalse(Path(f'{ruta}.checkpoint').exists())
+
+    def test_referencias_no_resueltas(self):
+        ruta = self.archivo('ordenes.csv', [
+            self.orden('Válida', profesional_run=normalizar_rut(self.profesional.run)),
+            self.orden('Sin empresa', empresa_rut='1.111.111-1'),
+            self.orden('Sin servicio', servicios=f'{self.servicio.nombre};No existe'),
+            self.orden('Sin profesional', profesional_run='2.222.222-2'),
+        ])
+        salida, errores = self.importar('ordenes', ruta)
+        self.assertIn('1 guardadas, 3 con error', salida)
+        self.assertIn("Fila 2: Empresa con RUT '1.111.111-1' no existe.", errores)
+        self.assertIn("Fila 3: Servicio 'No existe' no existe.", errores)
+        self.assertIn("Fila 4: Profesional con RUN '2.222.222-2' no existe.", errores)
+        orden = OrdenServicio.objects.get(descripcion_requerimiento='Válida')
+        self.assertEqual((orden.empresa, orden.profesional_asignado), (self.empresa, self.profesional))
+        self.assertEqual(list(orden.servicios_seleccionados.all()), [self.servicio])
+        self.assertFalse(OrdenServicio.objects.filter(descripcion_requerimiento__startswith='Sin ').exists())
+        self.assertEstadisticasAlDia()
+        self.assertCargasAlDia()
+
+    def test_resume(self):
+        filas = [self.orden(f'Lote {n}') for n in range(1, 5)] + [self.orden('Mala', empresa_rut='1.111.111-1')]
+        ruta = self.archivo('ordenes.csv', filas)
+        # El quinto registro aborta el tercer lote: quedan confirmados los dos primeros.
+        with self.assertRaises(CommandError):
+            self.importar('ordenes', ruta, '--batch-size', '2', '--max-errores', '0')
+        self.assertEqual(json.loads(Path(f'{ruta}.checkpoint').read_text()), {'filas': 4})
+
+        filas[-1] = self.orden('Lote 5')
+        self.archivo('ordenes.csv', filas)
+        salida, _ = self.importar('ordenes', ruta, '--batch-size', '2', '--resume')
+        self.assertIn('Reanudando desde la fila 5.', salida)
+        descripciones = OrdenServicio.objects.filter(descripcion_requerimiento__startswith='Lote ')
+        self.assertEqual(sorted(descripciones.values_list('descripcion_requerimiento', flat=True)), [
+            f'Lote {n}' for n in range(1, 6)
+        ])
+        self.assertFalse(Path(f'{ruta}.checkpoint').exists())
+
+    def test_upsert_conserva_campos_calculados(self):
+        profesional = Profesional.objects.order_by('pk').first()
+        pendiente = timezone.now()
+        Profesional.objects.filter(pk=profesional.pk).update(
+            ordenes_abiertas=7, horas_pendientes=20, eliminacion_pendiente=pendiente,
+        )
+        importador = ImportadorProfesionales()
+        importador.guardar([importador.validar({
+            'run': profesional.run, 'nombres': 'Otro', 'apellidos': 'Nombre', 'especialidad': 'Redes',
+            'email': 'otro@example.com',
+        })])
+        profesional.refresh_from_db()
+        self.assertEqual(profesional.nombres, 'Otro')
+        self.assertEqual((profesional.ordenes_abiertas, profesional.horas_pendientes), (7, 20))
+        self.assertEqual(profesional.eliminacion_pendiente, pendiente)
+
+
+class MetricasTests(CoreTestCase):
+    """Métricas por ruta de MetricasMiddleware (core/metricas.py)."""
+
+    def setUp(self):
+        super().setUp()
+        metricas.reiniciar()
+        self.addCleanup(metricas.reiniciar)
+
+    def serie(self, ruta):
+        return metricas._series[(ruta, 'GET')]
+
+    def test_renderizado_de_pagina_cacheable(self):
+        contenido = SimpleTemplateResponse.rendered_content
+
+        def lento(response):
+            time.sleep(0.02)
+            return contenido.fget(response)
+
+        with mock.patch.object(SimpleTemplateResponse, 'rendered_content', property(lento)):
+            self.assertEqual(self.client.get(reverse('empresa_list'))['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get(reverse('empresa_list'))['X-Cache'], 'HIT')
+            self.client.force_login(self.staff)
+            self.client.get(reverse('servicio_list'))
+
+        empresas = self.serie('empresa_list')
+        self.assertEqual((empresas.cantidad, empresas.plantillas), (2, 1))
+        self.assertGreaterEqual(empresas.plantilla_segundos, 0.02)
+        servicios = self.serie('servicio_list')
+        self.assertEqual(servicios.plantillas, 1)
+        self.assertGreaterEqual(servicios.plantilla_segundos, 0.02)
+
+
+class TransicionesTests(CoreTestCase):
+    """Cambios de estado masivos validados contra la máquina de estados (core/transiciones.py)."""
+
+    def ids(self, estado, cantidad):
+        return list(OrdenServicio.objects.filter(estado=estado).order_by('pk').values_list('pk', flat=True)[:cantidad])
+
+    def test_transicionar(self):
+        nuevas = self.ids('nueva', 5)
+        finalizadas = self.ids('finalizada', 2)
+        en_ejecucion = self.ids('en_ejecucion', 1)
+        pedidas = {
+            **dict.fromkeys(nuevas, 'en_ejecucion'),
+            **dict.fromkeys(finalizadas, 'nueva'),
+            **dict.fromkeys(en_ejecucion, 'en_ejecucion'),
+            999999: 'cancelada',
+        }
+        resultado = transiciones.transicionar(pedidas, self.staff, batch_size=2)
+
+        self.assertEqual(resultado.aplicadas, Counter({'en_ejecucion': 5}))
+        self.assertEqual(resultado.rechazadas, [(pk, 'finalizada', 'nueva') for pk in finalizadas])
+        self.assertEqual(resultado.inexistentes, [999999])
+        self.assertEqual(resultado.sin_cambio, 1)
+        self.assertEqual(OrdenServicio.objects.filter(pk__in=nuevas, estado='en_ejecucion').count(), 5)
+        self.assertEqual(OrdenServicio.objects.filter(pk__in=finalizadas, estado='finalizada').count(), 2)
+        self.assertEqual(
+            sorted(OrdenTransicion.objects.filter(orden__in=nuevas + finalizadas + en_ejecucion).values_list(
+                'orden_id', 'estado_anterior', 'estado_nuevo', 'usuario_id',
+            )),
+            [(pk, 'nueva', 'en_ejecucion', self.staff.pk) for pk in nuevas],
+        )
+        self.assertEstadisticasAlDia()
+        self.assertCargasAlDia()
+
+    def test_consultas_por_lote(self):
+        # Lectura por lote de batch_size, un UPDATE por lote y estado destino, un INSERT del registro.
+        nuevas = self.ids('nueva', 6)
+        with count_queries() as contador:
+            transiciones.transicionar(dict.fromkeys(nuevas, 'cancelada'), batch_size=2)
+        with count_queries() as contador_un_lote:
+            transiciones.transicionar(dict.fromkeys(nuevas, 'nueva'), batch_size=10)
+        self.assertEqual(contador.count - contador_un_lote.count, 4)
+
+    def test_estado_desconocido(self):
+        with self.assertRaises(ValueError):
+            transiciones.transicionar({self.ids('nueva', 1)[0]: 'archivada'})
+
+    def test_api(self):
+        url = reverse('api_orden_transiciones')
+        pk = self.ids('nueva', 1)[0]
+        self.assertEqual(self.client.post(url, {}, content_type='application/json').status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.post(url, {'estado': 'cancelada', 'ids': [pk]}, content_type='application/json')
+        self.assertEqual(response.json()['aplicadas'], {'cancelada': 1})
+        response = self.client.post(url, {'estado': 'finalizada', 'ids': [pk]}, content_type='application/json')
+        self.assertEqual(
+            response.json()['rechazadas'], [{'id': pk, 'estado_actual': 'cancelada', 'estado_pedido': 'finalizada'}],
+        )
+        response = self.client.post(url, json.dumps({'estado': 'nueva', 'ids': ['1']}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CacheVistasTests(CoreTestCase):
+    """Caché de páginas por generación (core/cache.py): los cambios la invalidan, los usuarios no la usan."""
+
+    def get(self, url, estado):
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], estado)
+        return response
+
+    def test_save_invalida_listado_y_detalle(self):
+        empresa = Empresa.objects.order_by('pk').first()
+        urls = (reverse('empresa_list'), reverse('empresa_detail', args=[empresa.pk]))
+        for url in urls:
+            self.get(url, 'MISS')
+            self.get(url, 'HIT')
+        empresa.razon_social = 'Cambiada SpA'
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa.save()
+        for url in urls:
+            self.assertContains(self.get(url, 'MISS'), 'Cambiada SpA')
+            self.get(url, 'HIT')
+
+    def test_update_masivo_invalida(self):
+        orden = OrdenServicio.objects.filter(estado='nueva').first()
+        url = reverse('orden_detail', args=[orden.pk])
+        self.get(url, 'MISS')
+        self.get(url, 'HIT')
+        # Acción del admin: QuerySet.update() en core.transiciones, sin señales.
+        cliente = self.client_class()
+        cliente.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente.post(reverse('admin:core_ordenservicio_changelist'), {
+                'action': 'marcar_cancelada', '_selected_action': [orden.pk],
+            })
+        self.assertEqual(OrdenServicio.objects.get(pk=orden.pk).estado, 'cancelada')
+        self.assertContains(self.get(url, 'MISS'), 'Cancelada')
+
+    def test_importacion_invalida(self):
+        empresa = Empresa.objects.order_by('pk').first()
+        url = reverse('empresa_list')
+        self.get(url, 'MISS')
+        importador = ImportadorEmpresas()
+        with self.captureOnCommitCallbacks(execute=True):
+            importador.guardar([importador.validar({'rut': empresa.rut, 'razon_social': 'Importada SpA'})])
+        self.assertContains(self.get(url, 'MISS'), 'Importada SpA')
+
+    def test_autenticado_sin_cache(self):
+        url = reverse('empresa_list')
+        self.get(url, 'MISS')
+        self.client.force_login(self.staff)
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('X-Cache'))
+            self.assertContains(response, self.staff.username)
+        self.assertEqual(cache.estadisticas()['aciertos'], 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Índices FTS5 de SQLite.')
+class BusquedaTests(CoreTestCase):
+    """Índices FTS5 sincronizados por señales y resultados por relevancia (core/search.py)."""
+
+    def encontrados(self, modelo, texto):
+        qs, ranked = search(modelo.objects.all(), texto, ())
+        self.assertTrue(ranked)
+        return list(qs)
+
+    def test_sincronizado_al_guardar_y_eliminar(self):
+        servicio = Servicio.objects.create(nombre='Calibración de xilófonos', categoria='Música')
+        self.assertEqual(self.encontrados(Servicio, 'xilofono'), [servicio])
+        servicio.nombre = 'Afinación de tambores'
+        servicio.save()
+        self.assertEqual(self.encontrados(Servicio, 'xilofono'), [])
+        self.assertEqual(self.encontrados(Servicio, 'tambor'), [servicio])
+
+        orden = OrdenServicio.objects.create(empresa=Empresa.objects.first(), descripcion_requerimiento='Revisión')
+        orden.servicios_seleccionados.add(servicio)
+        self.assertEqual(self.encontrados(OrdenServicio, 'tambores'), [orden])
+        servicio.delete()
+        self.assertEqual(self.encontrados(Servicio, 'tambor'), [])
+        self.assertEqual(self.encontrados(OrdenServicio, 'tambores'), [])
+
+        orden.descripcion_requerimiento = 'Cambio de timbales'
+        orden.save()
+        self.assertEqual(self.encontrados(OrdenServicio, 'timbal'), [orden])
+        orden.delete()
+        self.assertEqual(self.encontrados(OrdenServicio, 'timbal'), [])
+
+    def test_orden_por_relevancia(self):
+        una_vez = Servicio.objects.create(
+            nombre='Mantención general', descripcion='Incluye revisión de equipos, cableado, xilófonos y sillas.',
+        )
+        varias = Servicio.objects.create(nombre='Xilófonos', descripcion='Xilófonos', categoria='Xilófonos')
+        response = self.client.get(reverse('servicio_list') + '?q=xilofono')
+        self.assertEqual(list(response.context['object_list']), [varias, una_vez])
+        self.assertTrue(response.context['view'].search_ranked)
+
+
+class ExportacionTests(CoreTestCase):
+    """Exportación en streaming de órdenes (core/export.py, OrdenServicioExportView)."""
+    filtros = ('', 'estado=finalizada', 'prioridad=alta&estado=nueva', 'q=mantencion', 'empresa=76.000.001-9')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def exportar(self, query):
+        response = self.client.get(f"{reverse('orden_export')}?{query}")
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def ids_del_listado(self, query):
+        # Todas las páginas del listado HTML con los mismos filtros.
+        ids, url = [], f"{reverse('orden_list')}?{query}"
+        while url:
+            response = self.client.get(url)
+            ids += [orden.pk for orden in response.context['object_list']]
+            page = response.context['page_obj']
+            url = page.has_next() and f"{reverse('orden_list')}?{page.next_querystring}"
+        return ids
+
+    def test_csv(self):
+        orden = OrdenServicio.objects.exclude(profesional_asignado=None).filter(
+            servicios_seleccionados__isnull=False,
+        ).first()
+        filas = list(csv.DictReader(StringIO(self.exportar('').lstrip('\ufeff'))))
+        self.assertEqual(len(filas), OrdenServicio.objects.count())
+        fila = next(fila for fila in filas if fila['id'] == str(orden.pk))
+        self.assertEqual(fila['empresa_rut'], orden.empresa.rut)
+        self.assertEqual(fila['profesional_run'], orden.profesional_asignado.run)
+        self.assertEqual(fila['estado'], orden.estado)
+        self.assertEqual(fila['servicios'], '; '.join(sorted(orden.servicios_seleccionados.values_list('nombre', flat=True))))
+
+    def test_ndjson(self):
+        lineas = self.exportar('formato=ndjson&estado=finalizada').splitlines()
+        filas = [json.loads(linea) for linea in lineas]
+        self.assertEqual(
+            [fila['id'] for fila in filas],
+            list(OrdenServicio.objects.filter(estado='finalizada').order_by('-fecha_creacion', '-id')
+                 .values_list('id', flat=True)),
+        )
+
+    def test_mismos_filtros_que_el_listado(self):
+        for query in self.filtros:
+            with self.subTest(query):
+                exportados = [int(fila['id']) for fila in csv.DictReader(StringIO(self.exportar(query).lstrip('\ufeff')))]
+                self.assertTrue(exportados)
+                # Con q el listado ordena por relevancia; la exportación siempre por fecha.
+                self.assertEqual(sorted(exportados), sorted(self.ids_del_listado(query)))
+
+
+class EliminacionTests(CoreTestCase):
+    """Eliminación por lotes de empresas y profesionales con muchas órdenes (core/eliminacion.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        archivo.archivar(dias=0)
+
+    def con_mas_ordenes(self, modelo, relacion):
+        return modelo.objects.annotate(n=Count(relacion)).order_by('-n').first()
+
+    def procesar(self, batch_size):
+        estados = []
+
+        def progreso(resultado):
+            # Cada lote confirmado deja estadísticas y carga coherentes.
+            self.assertEstadisticasAlDia()
+            self.assertCargasAlDia()
+            estados.append(resultado.lotes)
+        resultado = eliminacion.procesar(batch_size=batch_size, progreso=progreso)
+        self.assertEqual(estados, list(range(1, resultado.lotes + 1)))
+        return resultado
+
+    @override_settings(CORE_ELIMINACION_UMBRAL=10)
+    def test_bajo_el_umbral_elimina(self):
+        empresa = Empresa.objects.create(rut=formatear_rut(99_000_002), razon_social='Pequeña')
+        OrdenServicio.objects.create(empresa=empresa, descripcion_requerimiento='x')
+        self.assertTrue(eliminacion.solicitar(empresa))
+        self.assertFalse(Empresa.objects.filter(pk=empresa.pk).exists())
+        self.assertFalse(Job.objects.filter(tipo='procesar_eliminaciones').exists())
+
+    @override_settings(CORE_ELIMINACION_UMBRAL=10)
+    def test_empresa_por_lotes(self):
+        empresa = self.con_mas_ordenes(Empresa, 'ordenes')
+        activas = empresa.ordenes.count()
+        archivadas = empresa.ordenes_archivadas.count()
+        self.assertGreater(activas, 10)
+        self.assertGreater(archivadas, 0)
+
+        self.assertFalse(eliminacion.solicitar(empresa))
+        self.assertTrue(Empresa.objects.filter(pk=empresa.pk, eliminacion_pendiente__isnull=False).exists())
+        self.assertEqual(empresa.ordenes.count(), activas)
+        self.assertTrue(Job.objects.filter(tipo='procesar_eliminaciones', estado=Job.PENDIENTE).exists())
+        self.assertNotIn(empresa, self.client.get(reverse('empresa_list')).context['object_list'])
+
+        resultado = self.procesar(batch_size=7)
+        self.assertEqual((resultado.empresas, resultado.ordenes_eliminadas), (1, activas + archivadas))
+        self.assertGreater(resultado.lotes, 2)
+        self.assertFalse(Empresa.objects.filter(pk=empresa.pk).exists())
+        self.assertFalse(OrdenServicioArchivada.objects.filter(empresa_id=empresa.pk).exists())
+        self.assertEstadisticasAlDia()
+
+    @override_settings(CORE_ELIMINACION_UMBRAL=10)
+    def test_profesional_por_lotes(self):
+        profesional = self.con_mas_ordenes(Profesional, 'ordenes')
+        ordenes = list(profesional.ordenes.values_list('pk', flat=True))
+        archivadas = profesional.ordenes_archivadas.count()
+        self.assertFalse(eliminacion.solicitar(profesional))
+
+        resultado = self.procesar(batch_size=7)
+        self.assertEqual((resultado.profesionales, resultado.ordenes_desasignadas), (1, len(ordenes) + archivadas))
+        self.assertFalse(Profesional.objects.filter(pk=profesional.pk).exists())
+        self.assertEqual(OrdenServicio.objects.filter(pk__in=ordenes, profesional_asignado=None).count(), len(ordenes))
+        self.assertCargasAlDia()
+
+
+class JobsTests(CoreTestCase):
+    """Cola de trabajos (core/jobs.py): reclamo, reintentos, timeouts y latidos."""
+
+    def setUp(self):
+        super().setUp()
+        self.llamadas = []
+
+        def prueba(ctx, fallar=False):
+            self.llamadas.append(ctx.job.intentos)
+            if fallar:
+                raise RuntimeError('falla de prueba')
+            ctx.avanzar(50, 'mitad')
+            return {'ok': True}
+
+        jobs.tarea('prueba', max_intentos=2, timeout=60)(prueba)
+        self.addCleanup(jobs.TAREAS.pop, 'prueba')
+        # ejecutar() cierra las conexiones del hilo, lo que invalidaría la transacción del test.
+        patcher = mock.patch.object(jobs.connections, 'close_all')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reclamar(self):
+        primero = jobs.encolar('prueba')
+        segundo = jobs.encolar('prueba', {'fallar': False})
+        Job.objects.filter(pk=segundo.pk).update(disponible_desde=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(jobs.encolar('prueba', unico=True), primero)
+
+        job = jobs.reclamar('w1')
+        self.assertEqual((job.pk, job.estado, job.worker, job.intentos), (primero.pk, Job.EN_PROCESO, 'w1', 1))
+        # Ni otro worker ni el mismo vuelven a tomarlo; el segundo aún no está disponible.
+        self.assertIsNone(jobs.reclamar('w2'))
+        self.assertIsNone(jobs.reclamar('w1'))
+
+    def test_completar(self):
+        job = jobs.encolar('prueba')
+        jobs.ejecutar(jobs.reclamar('w1').pk)
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.resultado, job.progreso, job.mensaje), (Job.COMPLETADO, {'ok': True}, 100, 'mitad'))
+
+    def test_reintentos(self):
+        job = jobs.encolar('prueba', {'fallar': True})
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.ejecutar(jobs.reclamar('w1').pk)
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), (Job.PENDIENTE, 1))
+        self.assertIn('falla de prueba', job.error)
+        self.assertGreater(job.disponible_desde, timezone.now() + timedelta(seconds=jobs.ESPERA_BASE - 5))
+        self.assertIsNone(jobs.reclamar('w1'))
+
+        Job.objects.filter(pk=job.pk).update(disponible_desde=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.ejecutar(jobs.reclamar('w1').pk)
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), (Job.FALLIDO, 2))
+        self.assertEqual(self.llamadas, [1, 2])
+
+    def test_timeout(self):
+        job = jobs.encolar('prueba')
+        job = jobs.reclamar('w1')
+        Job.objects.filter(pk=job.pk).update(fecha_inicio=timezone.now() - timedelta(seconds=61))
+        with self.assertLogs('core.jobs', 'ERROR') as logs:
+            jobs.ejecutar(job.pk)
+        self.assertIn('TiempoAgotado', '\n'.join(logs.output))
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), (Job.PENDIENTE, 1))
+
+    def test_intento_perdido_no_escribe(self):
+        jobs.encolar('prueba')
+        job = jobs.reclamar('w1')
+        ctx = jobs.Contexto(job)
+        # El worker dio el intento por abandonado (sin latido) y otro lo tomó.
+        Job.objects.filter(pk=job.pk).update(latido=timezone.now() - timedelta(seconds=jobs.LATIDO_MAXIMO + 1))
+        self.assertEqual(jobs.recuperar_abandonados(), 1)
+        Job.objects.filter(pk=job.pk).update(disponible_desde=timezone.now())
+        nuevo = jobs.reclamar('w2')
+        self.assertEqual(nuevo.intentos, 2)
+
+        with self.assertRaises(jobs.JobPerdido):
+            ctx.avanzar(90)
+        self.assertEqual(jobs.completar(job.pk, job.intentos, {'viejo': True}), 0)
+        self.assertIsNone(jobs.fallar(job.pk, job.intentos, 'viejo'))
+        nuevo.refresh_from_db()
+        self.assertEqual((nuevo.estado, nuevo.worker, nuevo.progreso), (Job.EN_PROCESO, 'w2', 0))
+
+
+class ReportesTests(CoreTestCase):
+    """Reportes mensuales con snapshots inmutables de los meses cerrados (core/reportes.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+        self.orden = OrdenServicio.objects.filter(
+            estado='nueva', fecha_creacion__lt=reportes.inicio_mes(reportes.mes_actual()),
+        ).first()
+        self.clave = (self.orden.empresa_id, estadisticas.mes_de(self.orden.fecha_creacion))
+
+    def reporte(self, resultado):
+        return next(reporte.datos for reporte in resultado.reportes if (reporte.empresa_id, reporte.mes) == self.clave)
+
+    def test_get_no_escribe(self):
+        with count_queries() as contador:
+            response = self.client.get(reverse('reporte_mensual') + '?formato=json')
+            datos = json.loads(b''.join(response.streaming_content))
+        self.assertTrue(datos)
+        self.assertFalse(ReporteMensual.objects.exists())
+        escrituras = [sql for sql in contador.statements if not sql.lstrip().upper().startswith('SELECT')]
+        self.assertEqual(escrituras, [])
+
+    def test_snapshot_inmutable(self):
+        resultado = reportes.generar()
+        self.assertGreater(resultado.guardados, 0)
+        self.assertEqual(ReporteMensual.objects.count(), resultado.guardados)
+        antes = self.reporte(resultado)
+
+        self.orden.estado = 'cancelada'
+        self.orden.save()
+        otra = reportes.generar()
+        self.assertEqual((otra.guardados, otra.desde_snapshot), (0, resultado.guardados))
+        self.assertEqual(self.reporte(otra), antes)
+        datos = json.loads(b''.join(self.client.get(reverse('reporte_mensual') + '?formato=json').streaming_content))
+        mes = f'{self.clave[1]:%Y-%m}'
+        en_vista = next(item for item in datos if (item['empresa']['id'], item['mes']) == (self.clave[0], mes))
+        self.assertEqual(en_vista['por_estado'], antes['por_estado'])
+
+        regenerado = self.reporte(reportes.generar(regenerar=True))
+        self.assertEqual(regenerado['por_estado']['nueva'], antes['por_estado']['nueva'] - 1)
+        self.assertEqual(regenerado['por_estado']['cancelada'], antes['por_estado']['cancelada'] + 1)
+
+    def test_mes_en_curso_no_se_guarda(self):
+        OrdenServicio.objects.create(empresa_id=self.clave[0], descripcion_requerimiento='Este mes')
+        resultado = reportes.generar(empresa_ids=[self.clave[0]])
+        self.assertGreater(resultado.mes_en_curso, 0)
+        self.assertFalse(ReporteMensual.objects.filter(mes=reportes.mes_actual()).exists())
+        self.assertTrue(ReporteMensual.objects.filter(empresa_id=self.clave[0], mes=self.clave[1]).exists())
@@ -0,0 +1,150 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import DateField
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import cache, cargas, estadisticas
+from .models import OrdenServicio, OrdenTransicion
+
+"""
+Máquina de estados de OrdenServicio y transiciones masivas.
+
+transicionar() recibe miles de pares (orden_id, estado_nuevo) y, en una sola
+transacción:
+  1. lee el estado actual de todas las órdenes (una consulta por lote de
+     `batch_size` ids) y valida cada cambio contra TRANSICIONES;
+  2. aplica los válidos con un UPDATE por estado destino;
+  3. registra cada cambio en OrdenTransicion con un INSERT (executemany);
+  4. mantiene EstadisticaOrden con los deltas, recalcula la carga de los
+     profesionales afectados (core.cargas) y anula la caché de órdenes.
+
+La lectura usa select_for_update() (en SQLite la propia transacción impide
+que otra conexión escriba entre la validación y el UPDATE). El mes de las
+estadísticas se calcula en la misma consulta y el registro se inserta sin
+instanciar modelos: con 10k órdenes el costo en Python de bulk_create()
+superaba al de las consultas.
+"""
+
+TABLA = OrdenTransicion._meta.db_table
+
+# Estados a los que se puede pasar desde cada estado.
+TRANSICIONES = {
+    'nueva': {'en_ejecucion', 'cancelada'},
+    'en_ejecucion': {'finalizada', 'cancelada', 'nueva'},
+    'finalizada': set(),
+    'cancelada': {'nueva'},
+}
+
+# Bajo el límite de parámetros por consulta de SQLite (32766 desde 3.32).
+LOTE = 10000
+
+
+def es_valida(estado_actual, estado_nuevo):
+    return estado_nuevo in TRANSICIONES.get(estado_actual, ())
+
+
+@dataclass
+class ResultadoTransicion:
+    aplicadas: Counter = field(default_factory=Counter)  # {estado_nuevo: n}
+    rechazadas: list = field(default_factory=list)  # [(orden_id, estado_actual, estado_pedido)]
+    inexistentes: list = field(default_factory=list)
+    sin_cambio: int = 0
+
+    @property
+    def total_aplicadas(self):
+        return sum(self.aplicadas.values())
+
+    def como_dict(self):
+        return {
+            'aplicadas': dict(self.aplicadas),
+            'rechazadas': [
+                {'id': pk, 'estado_actual': actual, 'estado_pedido': pedido}
+                for pk, actual, pedido in self.rechazadas
+            ],
+            'inexistentes': self.inexistentes,
+            'sin_cambio': self.sin_cambio,
+        }
+
+    def mensaje(self):
+        partes = [f'{self.total_aplicadas} órdenes actualizadas']
+        if self.rechazadas:
+            partes.append(f'{len(self.rechazadas)} rechazadas por transición no permitida')
+        if self.sin_cambio:
+            partes.append(f'{self.sin_cambio} ya estaban en ese estado')
+        if self.inexistentes:
+            partes.append(f'{len(self.inexistentes)} no existen')
+        return ', '.join(partes) + '.'
+
+
+def transicionar(pedidas, usuario=None, using=DEFAULT_DB_ALIAS, batch_size=LOTE):
+    """
+    Aplica {orden_id: estado_nuevo} (o pares) validando contra TRANSICIONES.
+
+    Lanza ValueError si algún estado pedido no existe. Las órdenes cuya
+    transición no es válida se informan en el resultado y no se modifican.
+    """
+    pedidas = dict(pedidas)
+    desconocidos = set(pedidas.values()) - set(TRANSICIONES)
+    if desconocidos:
+        raise ValueError(f"Estados inválidos: {', '.join(sorted(desconocidos))}")
+    usuario_id = getattr(usuario, 'pk', None)
+    ahora = timezone.now()
+    connection = connections[using]
+    fecha = connection.ops.adapt_datetimefield_value(ahora)
+    ids = list(pedidas)
+    resultado = ResultadoTransicion()
+    por_destino = defaultdict(list)
+    deltas = Counter()
+    registro = []
+    profesionales = set()
+
+    with transaction.atomic(using=using):
+        for inicio in range(0, len(ids), batch_size):
+            lote = ids[inicio:inicio + batch_size]
+            filas = (
+                OrdenServicio.objects.using(using).select_for_update()
+                .filter(pk__in=lote).order_by()
+                .annotate(mes=TruncMonth('fecha_creacion', output_field=DateField()))
+                .values_list('id', 'estado', 'empresa_id', 'mes', 'prioridad', 'profesional_asignado_id')
+            )
+            encontradas = set()
+            for pk, estado, empresa_id, mes, prioridad, profesional_id in filas:
+                encontradas.add(pk)
+                destino = pedidas[pk]
+                if destino == estado:
+                    resultado.sin_cambio += 1
+                elif not es_valida(estado, destino):
+                    resultado.rechazadas.append((pk, estado, destino))
+                else:
+                    por_destino[destino].append(pk)
+                    deltas[(empresa_id, mes, estado, prioridad)] -= 1
+                    deltas[(empresa_id, mes, destino, prioridad)] += 1
+                    registro.append((pk, estado, destino, usuario_id, fecha))
+                    profesionales.add(profesional_id)
+            resultado.inexistentes.extend(pk for pk in lote if pk not in encontradas)
+
+        for destino, pks in por_destino.items():
+            for inicio in range(0, len(pks), batch_size):
+                OrdenServicio.objects.using(using).filter(pk__in=pks[inicio:inicio + batch_size]).update(
+                    estado=destino, fecha_modificacion=ahora,
+                )
+            resultado.aplicadas[destino] = len(pks)
+        if registro:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {TABLA} (orden_id, estado_anterior, estado_nuevo, usuario_id, fecha) '
+                    f'VALUES (%s, %s, %s, %s, %s)',
+                    registro,
+                )
+            estadisticas.aplicar_deltas(deltas, using)
+            cargas.recalcular(profesionales, using)
+            cache.invalidar(OrdenServicio, using=using)
+    return resultado
+
+
+def transicionar_a(ids, estado, usuario=None, using=DEFAULT_DB_ALIAS):
+    """Lleva todas las órdenes `ids` a `estado`."""
+    return transicionar(dict.fromkeys(ids, estado), usuario, using)
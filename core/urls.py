@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, db, views
 
 """
 Rutas URL para las operaciones CRUD del sistema.
@@ -10,36 +11,88 @@ Patrón REST:
   - POST /entidad/crear/ --> CreateView
   - POST /entidad/<id>/editar/ --> UpdateView
   - POST /entidad/<id>/eliminar/ --> DeleteView
+  - GET /api/entidad/ y /api/entidad/<id>/ --> JSON de solo lectura (core/api.py)
+  - POST /ordenes/transicion/ y /api/ordenes/transiciones/ --> cambio de estado masivo
+  - GET /api/autocompletar/<entidad>/?q= --> sugerencias para los widgets del formulario de órdenes
+  - GET /ordenes/archivadas/<id>/ --> detalle de una orden archivada (core/archivo.py)
+  - GET /jobs/ y /jobs/<id>/ --> trabajos en segundo plano (core/jobs.py); /api/jobs/ para encolar y consultar
 
 Las rutas son nombradas (name=) para usarlas en plantillas con {% url 'nombre' %}.
+
+Con settings.CORE_ASYNC_VIEWS (despliegue ASGI) los listados, detalles,
+exportación y la API usan las versiones async de core/async_views.py.
+
+Las vistas que solo leen van envueltas en db.solo_lectura(): con el perfil
+de producción sus consultas usan la réplica de solo lectura (core/db.py).
 """
 
+if settings.CORE_ASYNC_VIEWS:
+    from . import async_views
+    lectura = lectura_api = async_views
+else:
+    lectura, lectura_api = views, api
+
 urlpatterns = [
     # Empresa CRUD
-    path('empresas/', views.EmpresaListView.as_view(), name='empresa_list'),
-    path('empresas/<int:pk>/', views.EmpresaDetailView.as_view(), name='empresa_detail'),
+    path('empresas/', db.solo_lectura(lectura.EmpresaListView.as_view()), name='empresa_list'),
+    path('empresas/<int:pk>/', db.solo_lectura(lectura.EmpresaDetailView.as_view()), name='empresa_detail'),
     path('empresas/crear/', views.EmpresaCreateView.as_view(), name='empresa_create'),
     path('empresas/<int:pk>/editar/', views.EmpresaUpdateView.as_view(), name='empresa_update'),
     path('empresas/<int:pk>/eliminar/', views.EmpresaDeleteView.as_view(), name='empresa_delete'),
 
     # Servicio CRUD
-    path('servicios/', views.ServicioListView.as_view(), name='servicio_list'),
-    path('servicios/<int:pk>/', views.ServicioDetailView.as_view(), name='servicio_detail'),
+    path('servicios/', db.solo_lectura(lectura.ServicioListView.as_view()), name='servicio_list'),
+    path('servicios/<int:pk>/', db.solo_lectura(lectura.ServicioDetailView.as_view()), name='servicio_detail'),
     path('servicios/crear/', views.ServicioCreateView.as_view(), name='servicio_create'),
     path('servicios/<int:pk>/editar/', views.ServicioUpdateView.as_view(), name='servicio_update'),
     path('servicios/<int:pk>/eliminar/', views.ServicioDeleteView.as_view(), name='servicio_delete'),
 
     # Profesional CRUD
-    path('profesionales/', views.ProfesionalListView.as_view(), name='profesional_list'),
-    path('profesionales/<int:pk>/', views.ProfesionalDetailView.as_view(), name='profesional_detail'),
+    path('profesionales/', db.solo_lectura(lectura.ProfesionalListView.as_view()), name='profesional_list'),
+    path('profesionales/<int:pk>/', db.solo_lectura(lectura.ProfesionalDetailView.as_view()), name='profesional_detail'),
     path('profesionales/crear/', views.ProfesionalCreateView.as_view(), name='profesional_create'),
     path('profesionales/<int:pk>/editar/', views.ProfesionalUpdateView.as_view(), name='profesional_update'),
     path('profesionales/<int:pk>/eliminar/', views.ProfesionalDeleteView.as_view(), name='profesional_delete'),
 
     # OrdenServicio CRUD (raíz es el listado de órdenes)
-    path('', views.OrdenServicioListView.as_view(), name='orden_list'),
-    path('ordenes/<int:pk>/', views.OrdenServicioDetailView.as_view(), name='orden_detail'),
+    path('', db.solo_lectura(lectura.OrdenServicioListView.as_view()), name='orden_list'),
+    path('ordenes/exportar/', db.solo_lectura(lectura.OrdenServicioExportView.as_view()), name='orden_export'),
+    path('ordenes/exportar/job/', views.OrdenServicioExportJobView.as_view(), name='orden_export_job'),
+    path('ordenes/<int:pk>/', db.solo_lectura(lectura.OrdenServicioDetailView.as_view()), name='orden_detail'),
+    path(
+        'ordenes/archivadas/<int:pk>/', db.solo_lectura(lectura.OrdenServicioArchivadaDetailView.as_view()),
+        name='orden_archivada_detail',
+    ),
     path('ordenes/crear/', views.OrdenServicioCreateView.as_view(), name='orden_create'),
     path('ordenes/<int:pk>/editar/', views.OrdenServicioUpdateView.as_view(), name='orden_update'),
     path('ordenes/<int:pk>/eliminar/', views.OrdenServicioDeleteView.as_view(), name='orden_delete'),
+    path('ordenes/transicion/', views.OrdenTransicionView.as_view(), name='orden_transicion'),
+
+    # API JSON de solo lectura
+    path('api/empresas/', db.solo_lectura(lectura_api.EmpresaApiView.as_view()), name='api_empresa_list'),
+    path('api/empresas/<int:pk>/', db.solo_lectura(lectura_api.EmpresaApiView.as_view()), name='api_empresa_detail'),
+    path('api/servicios/', db.solo_lectura(lectura_api.ServicioApiView.as_view()), name='api_servicio_list'),
+    path('api/servicios/<int:pk>/', db.solo_lectura(lectura_api.ServicioApiView.as_view()), name='api_servicio_detail'),
+    path('api/profesionales/', db.solo_lectura(lectura_api.ProfesionalApiView.as_view()), name='api_profesional_list'),
+    path('api/profesionales/<int:pk>/', db.solo_lectura(lectura_api.ProfesionalApiView.as_view()), name='api_profesional_detail'),
+    path('api/ordenes/', db.solo_lectura(lectura_api.OrdenServicioApiView.as_view()), name='api_orden_list'),
+    path('api/ordenes/<int:pk>/', db.solo_lectura(lectura_api.OrdenServicioApiView.as_view()), name='api_orden_detail'),
+    path('api/ordenes/transiciones/', api.OrdenTransicionApiView.as_view(), name='api_orden_transiciones'),
+    path('api/jobs/', api.JobApiView.as_view(), name='api_job_create'),
+    path('api/jobs/<int:pk>/', api.JobApiView.as_view(), name='api_job_detail'),
+    path('api/autocompletar/empresas/', db.solo_lectura(api.EmpresaAutocompletarView.as_view()), name='autocompletar_empresa'),
+    path('api/autocompletar/profesionales/', db.solo_lectura(api.ProfesionalAutocompletarView.as_view()), name='autocompletar_profesional'),
+    path('api/autocompletar/servicios/', db.solo_lectura(api.ServicioAutocompletarView.as_view()), name='autocompletar_servicio'),
+
+    # Jobs en segundo plano
+    path('jobs/', views.JobListView.as_view(), name='job_list'),
+    path('jobs/<int:pk>/', views.JobDetailView.as_view(), name='job_detail'),
+    path('jobs/<int:pk>/descarga/', views.JobDescargaView.as_view(), name='job_descarga'),
+
+    # Estadísticas
+    path('dashboard/', db.solo_lectura(views.DashboardView.as_view()), name='dashboard'),
+    path('reportes/mensual/', views.ReporteMensualView.as_view(), name='reporte_mensual'),
+
+    # Métricas (Prometheus)
+    path('metrics', views.MetricasView.as_view(), name='metricas'),
 ]
@@ -1,9 +1,28 @@
-from django.urls import reverse_lazy
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q
-from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Empresa, Servicio, Profesional, OrdenServicio
-from .forms import EmpresaForm, ServicioForm, ProfesionalForm, OrdenServicioForm
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, StreamingHttpResponse,
+)
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views import View
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, FormView
+from django.db.models import Prefetch, Q
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from . import eliminacion, estadisticas, jobs, metricas, reportes, transiciones
+from .models import (
+    Empresa, Servicio, Profesional, OrdenServicio, OrdenServicioArchivada, OrdenTransicion, EstadisticaOrden,
+    OrdenTransicionArchivada, Job,
+)
+from .forms import EmpresaForm, ServicioForm, ProfesionalForm, OrdenServicioForm, TransicionMasivaForm
+from .export import filas_exportacion, generar_csv, generar_ndjson
+from .pagination import KeysetPaginationMixin
+from .rut import filtro_rut
+from .search import search
+from .cache import CachedViewMixin
 
 """
 Vistas genéricas (Class-Based Views) para las operaciones CRUD.
@@ -12,11 +31,49 @@ Características:
   - ListViews con búsqueda por query (parámetro GET 'q').
   - LoginRequiredMixin en Create/Update/Delete (solo usuarios autenticados).
   - DetailViews para ver detalles de cada entidad.
-  - Búsqueda case-insensitive usando Q() con icontains.
+  - Búsqueda de texto completo (core.search): FTS5 en SQLite ordenada por
+    relevancia, icontains sobre `search_fields` en otros motores.
+  - Consultas con forma de RUT/RUN usan el campo normalizado indexado (core.rut).
+  - Paginación por cursor (parámetro GET 'cursor') en todas las ListViews.
+  - query_budget: máximo de consultas SQL por request (ver core.middleware).
+  - CachedViewMixin (core.cache) en listados, detalles y dashboard: GET
+    anónimos cacheados con invalidación por generación de `cache_models`.
+  - Dashboard y panel de estadísticas de empresa leen solo la tabla de
+    resumen EstadisticaOrden (core.estadisticas), nunca OrdenServicio.
+  - Cambios de estado validados por la máquina de estados de
+    core.transiciones, incluido el cambio masivo (OrdenTransicionView).
+  - El listado de órdenes lee solo la tabla activa; con ?archivadas=1
+    combina también OrdenServicioArchivada (core.archivo).
+  - Eliminar una empresa o profesional con muchas órdenes lo marca y deja
+    el trabajo a core.eliminacion (EliminacionPorLotesMixin).
+  - Jobs en segundo plano (core.jobs): la exportación se puede encolar
+    (OrdenServicioExportJobView) y /jobs/<id>/ muestra su avance.
 """
 
 
-class EmpresaListView(ListView):
+class EliminacionPorLotesMixin:
+    """
+    DeleteView de Empresa/Profesional: la confirmación muestra cuántas órdenes
+    se afectan (una consulta) y, sobre CORE_ELIMINACION_UMBRAL, la eliminación
+    queda pendiente para manage.py procesar_eliminaciones (core.eliminacion).
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminacion_pendiente=None)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['dependientes'] = eliminacion.dependientes(self.object)
+        context['en_segundo_plano'] = sum(context['dependientes'].values()) > eliminacion.umbral()
+        return context
+
+    def form_valid(self, form):
+        success_url = self.get_success_url()
+        if not eliminacion.solicitar(self.object):
+            messages.info(self.request, f'La eliminación de {self.object} se completará en segundo plano.')
+        return HttpResponseRedirect(success_url)
+
+
+class EmpresaListView(CachedViewMixin, KeysetPaginationMixin, ListView):
     """
     Listado de empresas con búsqueda.
     
@@ -24,23 +81,38 @@ class EmpresaListView(ListView):
     Ejemplo: /empresas/?q=PYME
     """
     model = Empresa
+    keyset_ordering = ('id',)
+    query_budget = 4
     template_name = 'core/empresa_list.html'
+    search_fields = ('razon_social', 'rut', 'email')
     
     def get_queryset(self):
         """Aplica filtro de búsqueda si existe el parámetro 'q' en la URL."""
-        qs = super().get_queryset()
+        qs = super().get_queryset().filter(eliminacion_pendiente=None)
         q = self.request.GET.get('q', '').strip()
         if q:
-            qs = qs.filter(
-                Q(razon_social__icontains=q) | Q(rut__icontains=q) | Q(email__icontains=q)
-            )
+            por_rut = filtro_rut('rut_normalizado', q)
+            if por_rut is not None:
+                qs = qs.filter(por_rut)
+            else:
+                qs, self.search_ranked = search(qs, q, self.search_fields)
         return qs
 
 
-class EmpresaDetailView(DetailView):
+class EmpresaDetailView(CachedViewMixin, DetailView):
     model = Empresa
+    cache_models = (Empresa, OrdenServicio)
+    query_budget = 6
     template_name = 'core/empresa_detail.html'
 
+    def get_context_data(self, **kwargs):
+        """Panel de estadísticas de órdenes de la empresa (desde la tabla de resumen)."""
+        context = super().get_context_data(**kwargs)
+        filas = EstadisticaOrden.objects.filter(empresa=self.object)
+        context['estadisticas'] = estadisticas.resumen(filas)
+        context['estadisticas_por_mes'] = estadisticas.por_mes(filas, meses=6)
+        return context
+
 
 class EmpresaCreateView(LoginRequiredMixin, CreateView):
     """
@@ -60,29 +132,31 @@ class EmpresaUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('empresa_list')
 
 
-class EmpresaDeleteView(LoginRequiredMixin, DeleteView):
+class EmpresaDeleteView(LoginRequiredMixin, EliminacionPorLotesMixin, DeleteView):
     model = Empresa
     template_name = 'core/empresa_confirm_delete.html'
     success_url = reverse_lazy('empresa_list')
 
 
 # Servicio views
-class ServicioListView(ListView):
+class ServicioListView(CachedViewMixin, KeysetPaginationMixin, ListView):
     model = Servicio
+    keyset_ordering = ('id',)
+    query_budget = 4
     template_name = 'core/servicio_list.html'
+    search_fields = ('nombre', 'descripcion', 'categoria')
     
     def get_queryset(self):
         qs = super().get_queryset()
         q = self.request.GET.get('q', '').strip()
         if q:
-            qs = qs.filter(
-                Q(nombre__icontains=q) | Q(descripcion__icontains=q) | Q(categoria__icontains=q)
-            )
+            qs, self.search_ranked = search(qs, q, self.search_fields)
         return qs
 
 
-class ServicioDetailView(DetailView):
+class ServicioDetailView(CachedViewMixin, DetailView):
     model = Servicio
+    query_budget = 4
     template_name = 'core/servicio_detail.html'
 
 
@@ -107,24 +181,50 @@ class ServicioDeleteView(LoginRequiredMixin, DeleteView):
 
 
 # Profesional views
-class ProfesionalListView(ListView):
+class ProfesionalListView(CachedViewMixin, KeysetPaginationMixin, ListView):
+    """
+    Listado de profesionales con búsqueda y orden por carga.
+
+    Parámetro GET 'orden': 'carga' (horas pendientes) u 'ordenes' (órdenes
+    abiertas), de mayor a menor. Ordena por las columnas desnormalizadas e
+    indexadas de Profesional (core.cargas), sin agregar por fila.
+    """
     model = Profesional
+    keyset_ordering = ('id',)
+    ordenes_por_carga = {
+        'carga': ('-horas_pendientes', '-id'),
+        'ordenes': ('-ordenes_abiertas', '-id'),
+    }
+    query_budget = 4
     template_name = 'core/profesional_list.html'
-    
+    search_fields = ('nombres', 'apellidos', 'run', 'email')
+
+    def get_keyset_ordering(self):
+        if self.search_ranked:
+            return self.ranked_ordering
+        return self.ordenes_por_carga.get(self.request.GET.get('orden'), self.keyset_ordering)
+
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().filter(eliminacion_pendiente=None)
         q = self.request.GET.get('q', '').strip()
         if q:
-            qs = qs.filter(
-                Q(nombres__icontains=q) | Q(apellidos__icontains=q) | Q(run__icontains=q) | Q(email__icontains=q)
-            )
+            por_run = filtro_rut('run_normalizado', q)
+            if por_run is not None:
+                qs = qs.filter(por_run)
+            else:
+                qs, self.search_ranked = search(qs, q, self.search_fields)
         return qs
 
 
-class ProfesionalDetailView(DetailView):
+class ProfesionalDetailView(CachedViewMixin, DetailView):
     model = Profesional
+    query_budget = 4
     template_name = 'core/profesional_detail.html'
 
+    def get_queryset(self):
+        """Carga por estado (CargaProfesional) que muestra profesional_detail.html."""
+        return super().get_queryset().prefetch_related('cargas')
+
 
 class ProfesionalCreateView(LoginRequiredMixin, CreateView):
     model = Profesional
@@ -140,14 +240,14 @@ class ProfesionalUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('profesional_list')
 
 
-class ProfesionalDeleteView(LoginRequiredMixin, DeleteView):
+class ProfesionalDeleteView(LoginRequiredMixin, EliminacionPorLotesMixin, DeleteView):
     model = Profesional
     template_name = 'core/profesional_confirm_delete.html'
     success_url = reverse_lazy('profesional_list')
 
 
 # OrdenServicio views
-class OrdenServicioListView(ListView):
+class OrdenServicioListView(CachedViewMixin, KeysetPaginationMixin, ListView):
     """
     Listado de órdenes de servicio con búsqueda y filtros avanzados.
     
@@ -156,28 +256,59 @@ class OrdenServicioListView(ListView):
         - 'estado': Filtrar por estado (nueva, en_ejecucion, finalizada, cancelada).
         - 'prioridad': Filtrar por prioridad (baja, media, alta).
         - 'empresa': Búsqueda por nombre o RUT de empresa.
+        - 'cursor': Posición de la página (generado por los enlaces Anterior/Siguiente).
+        - 'archivadas': '1' incluye las órdenes archivadas (core.archivo).
     
     Ejemplo: /ordenes/?q=diagnóstico&estado=nueva&prioridad=alta
+
+    Paginación por cursor sobre (fecha_creacion, id): la página N cuesta lo mismo que la 1.
+    Con archivadas, cada tabla se pagina con el mismo cursor y las filas se
+    combinan por fecha_creacion (también al buscar, en lugar de relevancia).
     """
     model = OrdenServicio
+    cache_models = (OrdenServicio, OrdenServicioArchivada, Empresa, Profesional, Servicio)
+    keyset_ordering = ('-fecha_creacion', '-id')
     template_name = 'core/orden_list.html'
+    query_budget = 5  # 4 + la página de archivadas
+    search_fields = (
+        'empresa__razon_social',
+        'descripcion_requerimiento',
+        'profesional_asignado__nombres',
+        'profesional_asignado__apellidos',
+    )
+
+    def incluir_archivadas(self):
+        return self.request.GET.get('archivadas') == '1'
 
     def get_queryset(self):
-        """Aplica filtros múltiples según parámetros GET."""
-        qs = super().get_queryset()
+        return self.filtrar(super().get_queryset())
+
+    def get_keyset_querysets(self, queryset):
+        if not self.incluir_archivadas():
+            return [queryset]
+        return [queryset, self.filtrar(OrdenServicioArchivada.objects.all())]
+
+    def get_keyset_ordering(self):
+        if self.incluir_archivadas():
+            return self.keyset_ordering
+        return super().get_keyset_ordering()
+
+    def filtrar(self, qs):
+        """Aplica filtros múltiples según parámetros GET (a órdenes activas o archivadas)."""
+        # La plantilla muestra {{ obj.empresa }} en cada fila: se carga con JOIN.
+        qs = qs.select_related('empresa')
         q = self.request.GET.get('q', '').strip()
         estado = self.request.GET.get('estado', '').strip()
         prioridad = self.request.GET.get('prioridad', '').strip()
         empresa = self.request.GET.get('empresa', '').strip()
 
-        # Búsqueda general (Q con OR)
+        # Búsqueda general (RUT de empresa indexado, FTS5 o Q con OR)
         if q:
-            qs = qs.filter(
-                Q(empresa__razon_social__icontains=q)
-                | Q(descripcion_requerimiento__icontains=q)
-                | Q(profesional_asignado__nombres__icontains=q)
-                | Q(profesional_asignado__apellidos__icontains=q)
-            )
+            por_rut = filtro_rut('empresa__rut_normalizado', q)
+            if por_rut is not None:
+                qs = qs.filter(por_rut)
+            else:
+                qs, self.search_ranked = search(qs, q, self.search_fields)
         
         # Filtros específicos
         if estado:
@@ -185,14 +316,75 @@ class OrdenServicioListView(ListView):
         if prioridad:
             qs = qs.filter(prioridad=prioridad)
         if empresa:
-            qs = qs.filter(Q(empresa__razon_social__icontains=empresa) | Q(empresa__rut__icontains=empresa))
+            por_rut = filtro_rut('empresa__rut_normalizado', empresa)
+            if por_rut is not None:
+                qs = qs.filter(por_rut)
+            else:
+                qs = qs.filter(Q(empresa__razon_social__icontains=empresa) | Q(empresa__rut__icontains=empresa))
 
         return qs
 
 
-class OrdenServicioDetailView(DetailView):
+class OrdenServicioExportView(LoginRequiredMixin, OrdenServicioListView):
+    """
+    Exportación en streaming de las órdenes filtradas.
+
+    Acepta los mismos parámetros GET que OrdenServicioListView más 'formato'
+    (csv por defecto, o ndjson). Ejemplo: /ordenes/exportar/?estado=finalizada&formato=ndjson
+    """
+    chunk_size = 2000
+    query_budget = None
+    formatos = {
+        'csv': (generar_csv, 'text/csv; charset=utf-8'),
+        'ndjson': (generar_ndjson, 'application/x-ndjson; charset=utf-8'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        formato = request.GET.get('formato', 'csv')
+        if formato not in self.formatos:
+            formato = 'csv'
+        generar, content_type = self.formatos[formato]
+        # El streaming corre después de la vista: se fija ahora la base de lectura (core.db).
+        queryset = self.get_queryset()
+        filas = filas_exportacion(queryset.using(queryset.db), self.chunk_size)
+        response = StreamingHttpResponse(generar(filas), content_type=content_type)
+        nombre = f"ordenes_{timezone.localdate():%Y%m%d}.{formato}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+
+
+class OrdenServicioDetailView(CachedViewMixin, DetailView):
     model = OrdenServicio
+    cache_models = (OrdenServicio, Empresa, Profesional, Servicio)
     template_name = 'core/orden_detail.html'
+    query_budget = 6
+
+    def get_queryset(self):
+        """Carga empresa, profesional, servicios e historial de estados que muestra orden_detail.html."""
+        return (
+            super().get_queryset()
+            .select_related('empresa', 'profesional_asignado')
+            .prefetch_related(
+                'servicios_seleccionados',
+                Prefetch('transiciones', queryset=OrdenTransicion.objects.select_related('usuario')),
+            )
+        )
+
+
+class OrdenServicioArchivadaDetailView(OrdenServicioDetailView):
+    """Detalle de solo lectura de una orden archivada (misma plantilla, sin editar/eliminar)."""
+    model = OrdenServicioArchivada
+    cache_models = (OrdenServicioArchivada, Empresa, Profesional, Servicio)
+
+    def get_queryset(self):
+        return (
+            OrdenServicioArchivada.objects
+            .select_related('empresa', 'profesional_asignado')
+            .prefetch_related(
+                'servicios_seleccionados',
+                Prefetch('transiciones', queryset=OrdenTransicionArchivada.objects.select_related('usuario')),
+            )
+        )
 
 
 class OrdenServicioCreateView(LoginRequiredMixin, CreateView):
@@ -208,8 +400,163 @@ class OrdenServicioUpdateView(LoginRequiredMixin, UpdateView):
     template_name = 'core/orden_form.html'
     success_url = reverse_lazy('orden_list')
 
+    def form_valid(self, form):
+        # Usuario del registro OrdenTransicion si cambia el estado (core/signals.py).
+        form.instance._usuario_transicion = self.request.user
+        return super().form_valid(form)
+
+
+class OrdenTransicionView(LoginRequiredMixin, FormView):
+    """
+    Cambio de estado masivo: recibe los ids del textarea o de las casillas
+    del listado de órdenes (mismo nombre 'ids') y los aplica con
+    core.transiciones (una validación, un UPDATE por estado y el registro
+    en OrdenTransicion, en una transacción).
+    """
+    form_class = TransicionMasivaForm
+    template_name = 'core/orden_transicion.html'
+    success_url = reverse_lazy('orden_list')
+
+    def form_valid(self, form):
+        resultado = transiciones.transicionar_a(
+            form.cleaned_data['ids'], form.cleaned_data['estado'], self.request.user,
+        )
+        nivel = messages.WARNING if resultado.rechazadas or resultado.inexistentes else messages.SUCCESS
+        messages.add_message(self.request, nivel, resultado.mensaje())
+        return super().form_valid(form)
+
 
 class OrdenServicioDeleteView(LoginRequiredMixin, DeleteView):
     model = OrdenServicio
     template_name = 'core/orden_confirm_delete.html'
     success_url = reverse_lazy('orden_list')
+
+
+class DashboardView(CachedViewMixin, TemplateView):
+    """
+    Conteos de órdenes por estado, prioridad, mes y empresa.
+
+    Lee solo EstadisticaOrden (mantenida incrementalmente), por lo que su
+    costo no crece con la cantidad de órdenes.
+    """
+    template_name = 'core/dashboard.html'
+    cache_models = (OrdenServicio, Empresa)
+    query_budget = 6
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['estadisticas'] = estadisticas.resumen()
+        context['por_mes'] = estadisticas.por_mes(meses=12)
+        context['top_empresas'] = estadisticas.top_empresas(10)
+        return context
+
+
+class OrdenServicioExportJobView(LoginRequiredMixin, View):
+    """
+    POST: encola la exportación (job 'exportar_ordenes', core/tareas.py) con
+    los filtros GET del listado y 'formato', y redirige a su avance.
+    """
+    http_method_names = ['post']
+    query_budget = 3
+
+    def post(self, request, *args, **kwargs):
+        filtros = request.GET.copy()
+        filtros.pop('cursor', None)
+        formato = request.POST.get('formato', 'csv')
+        if formato not in OrdenServicioExportView.formatos:
+            formato = 'csv'
+        job = jobs.encolar(
+            'exportar_ordenes', {'formato': formato, 'filtros': filtros.urlencode()}, usuario=request.user,
+        )
+        return HttpResponseRedirect(reverse('job_detail', args=[job.pk]))
+
+
+class JobsDelUsuarioMixin(LoginRequiredMixin):
+    """Cada usuario ve sus jobs; el staff, todos."""
+    model = Job
+
+    def get_queryset(self):
+        qs = Job.objects.all()
+        if not self.request.user.is_staff:
+            qs = qs.filter(usuario=self.request.user)
+        return qs
+
+
+class JobListView(JobsDelUsuarioMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = ('-id',)
+    query_budget = 4
+    template_name = 'core/job_list.html'
+
+    def get_queryset(self):
+        return super().get_queryset().defer('parametros', 'resultado', 'error')
+
+
+class JobDetailView(JobsDelUsuarioMixin, DetailView):
+    """Estado del job; static/jobs.js consulta /api/jobs/<id>/ mientras no termina."""
+    query_budget = 3
+    template_name = 'core/job_detail.html'
+
+
+class JobDescargaView(JobsDelUsuarioMixin, DetailView):
+    """Archivo generado por un job completado (resultado['archivo'] en CORE_JOBS_DIR)."""
+    query_budget = 3
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        nombre = (job.resultado or {}).get('archivo') if job.estado == Job.COMPLETADO else None
+        ruta = Path(settings.CORE_JOBS_DIR) / nombre if nombre else None
+        if ruta is None or ruta.name != nombre or not ruta.is_file():
+            raise Http404('El job no tiene un archivo para descargar.')
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre)
+
+
+class ReporteMensualView(LoginRequiredMixin, View):
+    """
+    Reporte mensual por empresa (core/reportes.py) en CSV o JSON.
+
+    Parámetros GET: empresa (id, repetible; todas si no se indica), desde y
+    hasta (AAAA-MM), formato (csv por defecto, o json). Ejemplo:
+    /reportes/mensual/?empresa=3&desde=2025-01&formato=json
+    Los meses cerrados salen de sus snapshots; solo el mes en curso (y los
+    cerrados que aún no tienen snapshot) se calcula. Es de solo lectura: los
+    snapshots los guardan manage.py reporte_mensual y el job 'generar_reportes'.
+    """
+    query_budget = None
+    formatos = {
+        'csv': (reportes.generar_csv, 'text/csv; charset=utf-8'),
+        'json': (reportes.generar_json, 'application/json; charset=utf-8'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        formato = request.GET.get('formato', 'csv')
+        if formato not in self.formatos:
+            formato = 'csv'
+        try:
+            empresa_ids = [int(pk) for pk in request.GET.getlist('empresa') if pk] or None
+            desde, hasta = (
+                reportes.leer_mes(request.GET[nombre]) if request.GET.get(nombre) else None
+                for nombre in ('desde', 'hasta')
+            )
+        except ValueError as error:
+            return HttpResponseBadRequest(str(error))
+        resultado = reportes.generar(empresa_ids, desde, hasta, guardar=False)
+        generar, content_type = self.formatos[formato]
+        response = StreamingHttpResponse(generar(resultado), content_type=content_type)
+        nombre = f"reporte_mensual_{timezone.localdate():%Y%m%d}.{formato}"
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return response
+
+
+class MetricasView(UserPassesTestMixin, View):
+    """Métricas de las requests (core/metricas.py) en formato Prometheus. Solo staff o CORE_METRICAS_TOKEN."""
+    raise_exception = True
+    query_budget = 2
+
+    def test_func(self):
+        token = settings.CORE_METRICAS_TOKEN
+        if token and constant_time_compare(self.request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return True
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -89,7 +89,7 @@ else:
 if not OrdenServicio.objects.exists():
     orden = OrdenServicio.objects.create(
         empresa=empresa,
-        estado='pendiente',
+        estado='nueva',
         prioridad='media',
         descripcion_requerimiento='Modernización de sistemas legacy',
         profesional_asignado=profesional
@@ -108,6 +108,7 @@ print("Próximos pasos:")
 print("1. Ejecuta: python manage.py runserver")
 print("2. Abre: http://127.0.0.1:8000/")
 print("3. Login con: admin / admin123")
+print("4. (Opcional) Datos a escala: python manage.py seed --orders 100000 --empresas 1000")
 print()
 print("Resumen de datos creados:")
 print(f"  - Usuarios: {User.objects.count()}")
@@ -0,0 +1,17 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+"""
+Punto de entrada ASGI (uvicorn, daphne, hypercorn):
+
+    uvicorn project.asgi:application --workers 4
+
+Activa las vistas de lectura async de core (core/async_views.py) salvo que
+CORE_ASYNC_VIEWS=0.
+"""
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+os.environ.setdefault('CORE_ASYNC_VIEWS', '1')
+
+application = get_asgi_application()
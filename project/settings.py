@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -28,6 +29,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'project.urls'
@@ -57,6 +59,40 @@ DATABASES = {
     }
 }
 
+# Perfil SQLite de producción (DJANGO_DB_PRODUCCION=1): backend
+# core.backends.sqlite3 con WAL y PRAGMAs al conectar, BEGIN IMMEDIATE,
+# conexiones persistentes y el alias 'replica' (mismo archivo con mode=ro, o
+# DJANGO_DB_REPLICA) para las vistas de solo lectura (core/db.py).
+DB_PRODUCCION = os.environ.get('DJANGO_DB_PRODUCCION', '') == '1'
+if DB_PRODUCCION:
+    SQLITE_PRAGMAS = (
+        'PRAGMA journal_mode = WAL;'
+        'PRAGMA synchronous = NORMAL;'
+        'PRAGMA busy_timeout = 20000;'
+        'PRAGMA cache_size = -65536;'
+        'PRAGMA mmap_size = 268435456;'
+        'PRAGMA temp_store = MEMORY'
+    )
+    DATABASES['default'].update({
+        'ENGINE': 'core.backends.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE', 'init_command': SQLITE_PRAGMAS},
+    })
+    DATABASES['replica'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_REPLICA') or f"{DATABASES['default']['NAME'].as_uri()}?mode=ro",
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA busy_timeout = 20000; PRAGMA cache_size = -65536; PRAGMA mmap_size = 268435456',
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.LecturaRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -89,3 +125,73 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Presupuesto de consultas SQL por vista (core.middleware.QueryBudgetMiddleware).
+# QUERY_BUDGETS permite sobrescribir el query_budget de una vista por nombre de URL.
+# En modo estricto (tests) exceder el presupuesto lanza QueryBudgetExceeded;
+# en otro caso solo se registra un warning en el logger 'core.querybudget'.
+QUERY_BUDGETS = {}
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '') == '1'
+
+# Caché de vistas de core (core/cache.py). LocMemCache expulsa por LRU al
+# superar MAX_ENTRIES; con CACHE_DIR se usa FileBasedCache, compartida entre
+# procesos (descarta 1/CULL_FREQUENCY de las entradas al llenarse).
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+            'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 4},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'core-vistas',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+CORE_CACHE_ALIAS = 'default'
+CORE_CACHE_TIMEOUT = 300
+# Segundos que los changelists del admin reutilizan un conteo sobre 10.000 filas
+# (core.pagination.ConteoEstimadoPaginator).
+CORE_CONTEO_TIMEOUT = 600
+
+# Días sin cambios tras los que una orden finalizada o cancelada pasa a la
+# tabla archivada (manage.py archivar_ordenes, core/archivo.py).
+CORE_ARCHIVO_DIAS = int(os.environ.get('CORE_ARCHIVO_DIAS', 365))
+
+# Órdenes (activas + archivadas) sobre las que eliminar una empresa o un
+# profesional se hace en segundo plano y por lotes (core/eliminacion.py,
+# manage.py procesar_eliminaciones).
+CORE_ELIMINACION_UMBRAL = int(os.environ.get('CORE_ELIMINACION_UMBRAL', 1000))
+
+# Archivos generados por los jobs (exportaciones, reportes), core/tareas.py.
+CORE_JOBS_DIR = os.environ.get('CORE_JOBS_DIR', str(BASE_DIR / 'jobs'))
+
+# Métricas de /metrics (core/metricas.py). Las requests más lentas que
+# CORE_METRICAS_LENTAS_MS (0 = desactivado) se registran en el logger
+# 'core.metricas' con sus consultas más lentas. Con CORE_METRICAS_TOKEN,
+# /metrics también acepta 'Authorization: Bearer <token>' (para Prometheus).
+CORE_METRICAS_LENTAS_MS = int(os.environ.get('CORE_METRICAS_LENTAS_MS', 0))
+CORE_METRICAS_TOKEN = os.environ.get('CORE_METRICAS_TOKEN', '')
+
+# Modo de plantillas de producción (DJANGO_TEMPLATES_PRODUCCION=1): loader en
+# caché declarado explícitamente y caché de filas de las tablas de los
+# listados (core/templatetags/core_filas.py).
+TEMPLATES_PRODUCCION = os.environ.get('DJANGO_TEMPLATES_PRODUCCION', '') == '1'
+if TEMPLATES_PRODUCCION:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+CORE_CACHE_FILAS = TEMPLATES_PRODUCCION
+CORE_CACHE_FILAS_TIMEOUT = 3600
+
+# Vistas de lectura async (core/async_views.py): project/asgi.py las activa
+# por defecto; con WSGI se usan las vistas sync.
+CORE_ASYNC_VIEWS = os.environ.get('CORE_ASYNC_VIEWS', '') == '1'
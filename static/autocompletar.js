@@ -0,0 +1,93 @@
+/*
+ * Autocompletado para los <select data-autocompletar-url> de core.forms.
+ *
+ * El select solo trae las opciones seleccionadas; este script agrega un
+ * campo de búsqueda que consulta la URL (?q=) y agrega la opción elegida
+ * como seleccionada. En selects múltiples cada elegida se suma a las
+ * anteriores (se quitan desmarcándolas en el select).
+ *
+ * Con data-filtro-base (filtros del admin, core.admin.AutocompletarFilter)
+ * elegir una opción navega a esa URL con data-filtro-parametro=<id>.
+ */
+(function () {
+    'use strict';
+
+    var ESPERA_MS = 200;
+
+    function iniciar(select) {
+        var buscador = document.createElement('input');
+        buscador.type = 'search';
+        buscador.className = 'form-control form-control-sm mb-1';
+        buscador.placeholder = 'Buscar...';
+        buscador.autocomplete = 'off';
+
+        var lista = document.createElement('div');
+        lista.className = 'list-group mb-2';
+
+        select.parentNode.insertBefore(buscador, select);
+        select.parentNode.insertBefore(lista, select.nextSibling);
+
+        var temporizador = null;
+        var ultima = 0;
+
+        function elegir(item) {
+            if (select.dataset.filtroBase !== undefined) {
+                var base = select.dataset.filtroBase;
+                window.location.search = base + (base.length > 1 ? '&' : '') +
+                    encodeURIComponent(select.dataset.filtroParametro) + '=' + encodeURIComponent(item.id);
+                return;
+            }
+            var opcion = Array.prototype.find.call(select.options, function (o) {
+                return o.value === String(item.id);
+            });
+            if (!opcion) {
+                opcion = new Option(item.text, item.id);
+                select.add(opcion);
+            }
+            if (!select.multiple) {
+                select.value = String(item.id);
+            }
+            opcion.selected = true;
+            select.dispatchEvent(new Event('change', { bubbles: true }));
+            buscador.value = '';
+            lista.innerHTML = '';
+        }
+
+        function mostrar(resultados) {
+            lista.innerHTML = '';
+            resultados.forEach(function (item) {
+                var boton = document.createElement('button');
+                boton.type = 'button';
+                boton.className = 'list-group-item list-group-item-action py-1';
+                boton.textContent = item.text;
+                boton.addEventListener('click', function () { elegir(item); });
+                lista.appendChild(boton);
+            });
+        }
+
+        buscador.addEventListener('input', function () {
+            clearTimeout(temporizador);
+            var q = buscador.value.trim();
+            if (!q) {
+                lista.innerHTML = '';
+                return;
+            }
+            temporizador = setTimeout(function () {
+                var numero = ++ultima;
+                var url = select.dataset.autocompletarUrl + '?q=' + encodeURIComponent(q);
+                fetch(url, { credentials: 'same-origin' })
+                    .then(function (r) { return r.ok ? r.json() : { results: [] }; })
+                    .then(function (datos) {
+                        // Se ignoran respuestas de búsquedas anteriores que lleguen tarde.
+                        if (numero === ultima) {
+                            mostrar(datos.results);
+                        }
+                    });
+            }, ESPERA_MS);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocompletar-url]').forEach(iniciar);
+    });
+})();
@@ -0,0 +1,37 @@
+/*
+ * Avance de un job (core/templates/core/job_detail.html).
+ *
+ * Mientras el job no termina consulta data-estado-url (/api/jobs/<id>/)
+ * cada ESPERA_MS y actualiza estado, mensaje y barra de progreso; al
+ * terminar recarga la página para mostrar el resultado o el error.
+ */
+(function () {
+    'use strict';
+
+    var ESPERA_MS = 2000;
+    var NOMBRES = { pendiente: 'Pendiente', en_proceso: 'En proceso', completado: 'Completado', fallido: 'Fallido' };
+
+    function consultar(contenedor) {
+        fetch(contenedor.dataset.estadoUrl, { credentials: 'same-origin' })
+            .then(function (r) { return r.json(); })
+            .then(function (job) {
+                if (job.estado === 'completado' || job.estado === 'fallido') {
+                    window.location.reload();
+                    return;
+                }
+                contenedor.querySelector('[data-campo="estado"]').textContent = NOMBRES[job.estado] || job.estado;
+                contenedor.querySelector('[data-campo="mensaje"]').textContent = job.mensaje;
+                var barra = contenedor.querySelector('[data-campo="progreso"]');
+                barra.style.width = job.progreso + '%';
+                barra.textContent = job.progreso + '%';
+                setTimeout(function () { consultar(contenedor); }, ESPERA_MS);
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var contenedor = document.getElementById('job');
+        if (contenedor && contenedor.dataset.terminado !== '1') {
+            setTimeout(function () { consultar(contenedor); }, ESPERA_MS);
+        }
+    });
+})();